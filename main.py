@@ -6,27 +6,43 @@ out with password hashing and secure cookies. Logged in users may create blog
 posts, comment on posts, like other's posts, and delete or edit their own blog
 posts or comments.
 
+Handlers are named by their import path, so webapp2 only imports a
+handler's module (and the models, decorators and templates it uses) the
+first time one of its routes is requested. Every request is timed by the
+middleware in myapp/functions/instrumentation.py (see /admin/stats).
+
 """
 
 
 import webapp2
-from myapp.handlerz import (DeleteComment, DeletePost, LikePost, LogOut,
-                           MainPage, UnlikePost, EditComment, EditPost, Blog,
-                           Login, NewPost, PostPage, Signup)
-
-
-app = webapp2.WSGIApplication([("/", MainPage),
-                               ("/blog/signup", Signup),
-                               ("/blog/login", Login),
-                               ("/blog/logout", LogOut),
-                               ("/blog", Blog),
-                               ("/blog/newpost", NewPost),
-                               ("/blog/([0-9]+)", PostPage),
-                               ("/blog/unlike/([0-9]+)", UnlikePost),
-                               ("/blog/like/([0-9]+)", LikePost),
-                               ("/blog/edit/([0-9]+)", EditPost),
-                               ("/blog/editcomment/([0-9]+)", EditComment),
-                               ("/blog/deletecomment/([0-9]+)", DeleteComment),
-                               ("/blog/deletepost/([0-9]+)", DeletePost),
-                               ],
-                              debug=True)
+
+from myapp.functions import instrumentation
+
+
+HANDLERZ = "myapp.handlerz."
+
+app = instrumentation.Middleware(webapp2.WSGIApplication([
+    ("/", HANDLERZ + "mainpage.MainPage"),
+    ("/blog/signup", HANDLERZ + "signup.Signup"),
+    ("/blog/login", HANDLERZ + "login.Login"),
+    ("/blog/logout", HANDLERZ + "logout.LogOut"),
+    ("/blog", HANDLERZ + "blog.Blog"),
+    ("/blog/search", HANDLERZ + "search.Search"),
+    (r"/blog/feed\.(atom|rss)", HANDLERZ + "feed.Feed"),
+    ("/blog/author/([0-9]+)", HANDLERZ + "author.Author"),
+    (r"/blog/author/([0-9]+)/feed\.(atom|rss)", HANDLERZ + "feed.AuthorFeed"),
+    ("/blog/archive/([0-9]{4})/([0-9]{2})", HANDLERZ + "archive.Archive"),
+    ("/blog/newpost", HANDLERZ + "newpost.NewPost"),
+    ("/blog/([0-9]+)", HANDLERZ + "postpage.PostPage"),
+    ("/blog/([0-9]+)/comments", HANDLERZ + "postcomments.PostComments"),
+    ("/blog/unlike/([0-9]+)", HANDLERZ + "unlikepost.UnlikePost"),
+    ("/blog/like/([0-9]+)", HANDLERZ + "likepost.LikePost"),
+    ("/blog/edit/([0-9]+)", HANDLERZ + "editpost.EditPost"),
+    ("/blog/([0-9]+)/editcomment/([0-9]+)",
+     HANDLERZ + "editcomment.EditComment"),
+    ("/blog/([0-9]+)/deletecomment/([0-9]+)",
+     HANDLERZ + "deletecomment.DeleteComment"),
+    ("/blog/deletepost/([0-9]+)", HANDLERZ + "deletepost.DeletePost"),
+    ("/admin/migrate/([a-z_]+)", HANDLERZ + "migrate.Migrate"),
+    ("/admin/stats", HANDLERZ + "stats.Stats"),
+    ], debug=True))
@@ -5,7 +5,6 @@ import hmac
 import hashlib
 from string import letters
 import random
-from time import sleep
 
 
 # value to hash with cookie values to make them secure. (normally this would
@@ -43,11 +42,25 @@ def make_secure_val(s):
     return "%s|%s" % (s, hash_str(s))
 
 
+def constant_time_compare(a, b):
+    """Compare two strings in time that doesn't depend on where they differ."""
+    if isinstance(a, unicode):
+        a = a.encode("utf-8")
+    if isinstance(b, unicode):
+        b = b.encode("utf-8")
+    if len(a) != len(b):
+        return False
+    result = 0
+    for x, y in zip(a, b):
+        result |= ord(x) ^ ord(y)
+    return result == 0
+
+
 def check_secure_val(h):
     """Check whether the cookie value from the current webpage is valid."""
     if h:
         val = h.split("|")[0]
-        if h == make_secure_val(val):
+        if constant_time_compare(h, make_secure_val(val)):
             return val
 
 
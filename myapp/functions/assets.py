@@ -0,0 +1,46 @@
+"""URLs of the style sheets pages link to.
+
+tools/build_assets.py bundles the sources of each entry of BUNDLES into one
+minified file under static/build, named after a hash of its contents, and
+records the names in MANIFEST. app.yaml serves static/build with a
+far-future expiry: a changed bundle gets a new name, so browsers never need
+to revalidate. Templates call asset_urls(bundle); until the bundles have
+been built (e.g. on the development server) it returns the sources.
+
+"""
+import json
+import os
+
+
+APP_DIR = os.path.dirname(os.path.dirname(__file__))
+MANIFEST = os.path.join(APP_DIR, "assets_manifest.json")
+
+# The files in /static each bundle is built from, in the order pages load
+# them.
+BUNDLES = {
+    "blog.css": ["bootstrap.min.css", "main.css"],
+}
+
+
+def source_urls(bundle):
+    """Return the URLs of the bundle's source files."""
+    return ["/static/" + name for name in BUNDLES[bundle]]
+
+
+def load_manifest():
+    """Return the built bundles' URLs by bundle name, or {} if not built."""
+    try:
+        with open(MANIFEST) as f:
+            return json.load(f)
+    except IOError:
+        return {}
+
+
+_manifest = load_manifest()
+
+
+def asset_urls(bundle):
+    """Return the URLs of the built bundle, or of its sources if unbuilt."""
+    if bundle in _manifest:
+        return [_manifest[bundle]]
+    return source_urls(bundle)
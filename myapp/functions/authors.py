@@ -0,0 +1,117 @@
+"""Cached first pages of the author pages.
+
+An author page lists a user's posts and their most recent comments, each
+newest first with its own cursor. The first page of both is cached per
+author, with the time it was read or last changed, which is the page's
+Last-Modified time. The handlers that write posts and comments write the
+change through to the cached page of the post's or comment's author (see
+myapp/functions/writethrough.py), and those that change a post's 'Like'
+or comment count refresh the post on its author's page.
+
+"""
+from datetime import datetime
+
+from myapp.functions import writethrough
+from myapp.functions.cache import memcache
+
+
+CACHE_SECONDS = 60
+
+
+def _cache_key(creator):
+    return "author:%s" % creator
+
+
+def with_posts(repo, comments):
+    """Return (comment, post) pairs, leaving out comments on deleted posts."""
+    posts = repo.get_posts([comment.post_id for comment in comments])
+    return [(comment, post) for comment, post in zip(comments, posts)
+            if post]
+
+
+def _read(repo, creator):
+    posts, next_cursor = repo.author_posts(creator)
+    comments, next_comment_cursor = repo.author_comments(creator)
+    return (posts, next_cursor, with_posts(repo, comments),
+            next_comment_cursor, datetime.utcnow())
+
+
+def first_page(repo, creator):
+    """Return the user's first page of posts and of comments (with their
+    posts), each page's next cursor, and the time they were read."""
+    page = memcache.get(_cache_key(creator))
+    if page is None:
+        page = _read(repo, creator)
+        # Never overwrite a page a writer has stored since the read.
+        memcache.add(_cache_key(creator), page, time=CACHE_SECONDS)
+    return page
+
+
+def _change(creator, load, posts=None, comments=None):
+    """Write a change to the creator's posts or comments through to their
+    cached page; 'posts' and 'comments' each change one of its lists."""
+    def change(page):
+        (cached_posts, next_cursor, cached_comments, next_comment_cursor,
+         _) = page
+        if posts:
+            cached_posts = posts(cached_posts, next_cursor is None)
+        if comments:
+            cached_comments = comments(cached_comments,
+                                       next_comment_cursor is None)
+        if load and max(len(cached_posts), len(cached_comments)) > (
+                writethrough.MAX_ENTRIES):
+            (read_posts, next_cursor, read_comments, next_comment_cursor,
+             _) = load()
+            cached_posts = writethrough.catch_up(cached_posts, read_posts,
+                                                 next_cursor)
+            cached_comments = writethrough.catch_up(
+                cached_comments, read_comments, next_comment_cursor,
+                item=lambda pair: pair[0])
+        return (cached_posts, next_cursor, cached_comments,
+                next_comment_cursor, datetime.utcnow())
+    writethrough.update(_cache_key(creator), change, load, CACHE_SECONDS)
+
+
+def record_post(post, repo):
+    """Put a post that was created or changed on its author's page.
+
+    The page is read first if it isn't cached, so the post is on it however
+    soon it is next shown.
+
+    """
+    _change(post.creator, lambda: _read(repo, post.creator),
+            posts=lambda posts, last_page:
+            writethrough.replace(posts, post.id, post, last_page))
+
+
+def remove_post(post, repo):
+    """Take a deleted post off its author's page."""
+    _change(post.creator, lambda: _read(repo, post.creator),
+            posts=lambda posts, last_page:
+            writethrough.replace(posts, post.id))
+
+
+def refresh_post(post, repo):
+    """Put the current copy of a post whose counts changed on its author's
+    page, if it's cached; like frontpage.refresh_post(), the post is read
+    again for each attempt to store it."""
+    _change(post.creator, None, posts=lambda posts, last_page:
+            writethrough.replace(posts, post.id, repo.reload_post(post.id),
+                                 last_page))
+
+
+def record_comment(comment, post, repo):
+    """Put a comment (on post) that was created or changed on its author's
+    page."""
+    _change(comment.creator, lambda: _read(repo, comment.creator),
+            comments=lambda pairs, last_page:
+            writethrough.replace(pairs, comment.id, (comment, post),
+                                 last_page, item=lambda pair: pair[0]))
+
+
+def remove_comment(comment, repo):
+    """Take a deleted comment off its author's page."""
+    _change(comment.creator, lambda: _read(repo, comment.creator),
+            comments=lambda pairs, last_page:
+            writethrough.replace(pairs, comment.id,
+                                 item=lambda pair: pair[0]))
@@ -0,0 +1,130 @@
+"""Memcache, or an in-process stand-in for it when App Engine isn't there.
+
+Modules that cache values import 'memcache' from here rather than from the
+App Engine SDK. On App Engine (and under dev_appserver.py) it is the real
+memcache API; when the SDK can't be imported, such as when running pieces
+of the app from a plain Python shell or test, LocalCache provides the same
+calls backed by a dictionary in this process. Compare-and-set is done
+through a Client, as with the memcache API: memcache.Client().gets(key),
+then cas(key, value) on the same client.
+
+"""
+import threading
+from time import time as _now
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+
+class LocalCache(object):
+
+    """Implement the parts of the memcache API the app uses, in process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _live(self, key):
+        """Return the (pickled value, expiry) stored at key if not expired."""
+        item = self._values.get(key)
+        if item and item[1] and item[1] <= _now():
+            del self._values[key]
+            item = None
+        return item
+
+    def get(self, key):
+        """Return the value stored at key, or None."""
+        with self._lock:
+            item = self._live(key)
+        return pickle.loads(item[0]) if item else None
+
+    def set(self, key, value, time=0):
+        """Store value at key, expiring after 'time' seconds if given."""
+        expires = _now() + time if time else 0
+        pickled = pickle.dumps(value, -1)
+        with self._lock:
+            self._values[key] = (pickled, expires)
+        return True
+
+    def add(self, key, value, time=0):
+        """Store value at key only if nothing is stored there already."""
+        with self._lock:
+            if self._live(key):
+                return False
+        return self.set(key, value, time)
+
+    def delete(self, key):
+        """Remove the value stored at key."""
+        with self._lock:
+            self._values.pop(key, None)
+        return 2
+
+    def delete_multi(self, keys):
+        """Remove the values stored at each of keys."""
+        for key in keys:
+            self.delete(key)
+        return True
+
+    def incr(self, key, delta=1):
+        """Add delta to the integer stored at key, return the new value.
+
+        Return None if nothing, or something other than an integer, is
+        stored at key.
+
+        """
+        with self._lock:
+            item = self._live(key)
+            value = item and pickle.loads(item[0])
+            if not isinstance(value, (int, long)):
+                return None
+            value = max(value + delta, 0)
+            self._values[key] = (pickle.dumps(value, -1), item[1])
+        return value
+
+    def decr(self, key, delta=1):
+        """Subtract delta from the integer stored at key (not below 0)."""
+        return self.incr(key, -delta)
+
+    def Client(self):
+        """Return a client for compare-and-set on this cache."""
+        return _LocalClient(self)
+
+    def flush_all(self):
+        """Remove every stored value."""
+        with self._lock:
+            self._values.clear()
+        return True
+
+
+class _LocalClient(object):
+
+    """Implement a memcache Client's gets() and cas() on a LocalCache."""
+
+    def __init__(self, cache):
+        self._cache = cache
+        self._seen = {}
+
+    def gets(self, key):
+        """Return the value stored at key, or None, for a later cas()."""
+        with self._cache._lock:
+            item = self._cache._live(key)
+        self._seen[key] = item and item[0]
+        return pickle.loads(item[0]) if item else None
+
+    def cas(self, key, value, time=0):
+        """Store value at key only if it hasn't changed since gets(key)."""
+        seen = self._seen.pop(key, None)
+        pickled = pickle.dumps(value, -1)
+        with self._cache._lock:
+            item = self._cache._live(key)
+            if not item or item[0] != seen:
+                return False
+            self._cache._values[key] = (pickled, _now() + time if time else 0)
+        return True
+
+
+try:
+    from google.appengine.api import memcache
+except ImportError:
+    memcache = LocalCache()
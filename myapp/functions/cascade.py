@@ -0,0 +1,91 @@
+"""Deleting a post together with the comments and 'Likes' that belong to it.
+
+delete_post deletes the post, and queues delete_post_children in the same
+transaction, so the post can't disappear without its clean-up being queued.
+The task deletes the post's comments, then its 'Likes', BATCH_SIZE keys at
+a time, deferring itself with the query cursor after each full batch, and
+finally deletes the post's 'Like' counter. It only deletes, so it can be
+run again (or twice at once) safely.
+
+sweep_orphans (the 'orphans' migration job) deletes the comments, 'Likes'
+and counter shards of posts deleted before this clean-up existed.
+
+"""
+import logging
+
+from google.appengine.ext import db
+from myapp.functions import counters, tasks
+from myapp.modelz import Comment, LikeShard, Likez
+
+
+BATCH_SIZE = 100
+
+
+def delete_post(post):
+    """Delete the post, and queue the deletion of its comments and 'Likes'."""
+    def txn():
+        db.delete(post)
+        tasks.defer(delete_post_children, str(post.key().id()),
+                    _transactional=True)
+    db.run_in_transaction(txn)
+
+
+def _children(post_id, kind):
+    """Return a keys-only query for the post's entities of one kind."""
+    if kind == "Comment":
+        return Comment.all(keys_only=True).ancestor(
+            db.Key.from_path("Post", int(post_id)))
+    return Likez.all(keys_only=True).filter("post_id =", post_id)
+
+
+# The kinds delete_post_children works through, in order.
+CHILD_KINDS = ("Comment", "Likez")
+
+
+def delete_post_children(post_id, kind="Comment", cursor=None):
+    """Delete one batch of a deleted post's comments or 'Likes'."""
+    query = _children(post_id, kind)
+    if cursor:
+        query.with_cursor(cursor)
+    keys = query.fetch(BATCH_SIZE)
+    db.delete(keys)
+    logging.info("delete_post_children: post %s: deleted %d %s.", post_id,
+                 len(keys), kind)
+    if len(keys) == BATCH_SIZE:
+        tasks.defer(delete_post_children, post_id, kind, query.cursor())
+    elif kind != CHILD_KINDS[-1]:
+        tasks.defer(delete_post_children, post_id,
+                    CHILD_KINDS[CHILD_KINDS.index(kind) + 1])
+    else:
+        counters.delete_like_count(post_id)
+
+
+# The kinds sweep_orphans works through, in order.
+SWEPT_KINDS = (Comment, Likez, LikeShard)
+
+
+def sweep_orphans(kind_index=0, cursor=None):
+    """Delete one batch of comments, 'Likes' and shards whose post is gone.
+
+    Every entity of each kind in SWEPT_KINDS is checked against its post
+    (by its 'post_id'), a batch at a time, deferring itself with the query
+    cursor after each batch.
+
+    """
+    model = SWEPT_KINDS[kind_index]
+    query = model.all()
+    if cursor:
+        query.with_cursor(cursor)
+    batch = query.fetch(BATCH_SIZE)
+    post_keys = dict((entity.post_id, db.Key.from_path("Post",
+                                                       int(entity.post_id)))
+                     for entity in batch)
+    found = dict(zip(post_keys.keys(), db.get(post_keys.values())))
+    orphans = [entity for entity in batch if not found[entity.post_id]]
+    db.delete(orphans)
+    logging.info("sweep_orphans: deleted %d of %d %s.", len(orphans),
+                 len(batch), model.kind())
+    if len(batch) == BATCH_SIZE:
+        tasks.defer(sweep_orphans, kind_index, query.cursor())
+    elif kind_index + 1 < len(SWEPT_KINDS):
+        tasks.defer(sweep_orphans, kind_index + 1)
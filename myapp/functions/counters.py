@@ -0,0 +1,196 @@
+"""Sharded per-post 'Like' counters.
+
+Each post's count is spread over NUM_SHARDS LikeShard entities, so likes
+and unlikes can be written concurrently without contending on one entity
+group. Reading a count gets the post's shards by key (a fixed number of
+keys, however many 'Likes' exist) and the total is cached in memcache.
+A read seeds the cache key before reading the shards, and stores the total
+with compare-and-set. A change adjusts a cached total with compare-and-set
+too; one that finds no total to adjust (or only a read's seed) deletes the
+key, so a total read before the change is never cached.
+
+A change's shard is written in the same cross-group transaction as the
+'Like' it counts (see change_shard), so the two can't disagree.
+
+Each change also queues sync_like_count, which copies the total onto the
+Post's 'like_count' for listing pages. Changes made within SYNC_SECONDS of
+each other share one task.
+
+"""
+import random
+import time
+
+from google.appengine.ext import db
+from myapp import storage
+from myapp.functions import authors, frontpage, tasks
+from myapp.functions.cache import memcache
+from myapp.modelz import LikeShard, Post
+
+
+# At most 24, so a transaction can hold every shard and the post.
+NUM_SHARDS = 20
+CACHE_SECONDS = 60
+SYNC_SECONDS = 5
+CAS_RETRIES = 3
+# Held by the cache key while the shards are read.
+_READING = "reading"
+
+
+def _cache_key(post_id):
+    """Return the memcache key holding a post's total 'Like' count."""
+    return "likes:%s" % post_id
+
+
+def _shard_name(post_id, index):
+    """Return the key_name of one of a post's shards."""
+    return "%s-%d" % (post_id, index)
+
+
+def _shard_keys(post_id):
+    """Return the keys of all of a post's shards."""
+    return [db.Key.from_path("LikeShard", _shard_name(post_id, i))
+            for i in xrange(NUM_SHARDS)]
+
+
+def _shard_total(post_id):
+    """Return the sum of the post's shards, read from the datastore."""
+    return sum(shard.count for shard in db.get(_shard_keys(post_id))
+               if shard)
+
+
+def like_count(post_id):
+    """Return the number of 'Likes' on the post."""
+    return like_count_async(post_id)()
+
+
+def like_count_async(post_id):
+    """Start reading the number of 'Likes' on the post.
+
+    Return a function that returns the count, waiting for the post's
+    shards to be read if it wasn't cached.
+
+    """
+    key = _cache_key(post_id)
+    client = memcache.Client()
+    total = client.gets(key)
+    if total is None:
+        memcache.add(key, _READING, time=CACHE_SECONDS)
+        total = client.gets(key)
+    if isinstance(total, (int, long)):
+        return lambda: total
+    rpc = db.get_async(_shard_keys(post_id))
+
+    def count():
+        total = sum(shard.count for shard in rpc.get_result() if shard)
+        # Fails if a change deleted the key since it was seeded.
+        client.cas(key, total, time=CACHE_SECONDS)
+        return total
+    return count
+
+
+def change_shard(post_id, delta):
+    """Add 'delta' (1 for a like, -1 for an unlike) to a random shard.
+
+    Must be called inside the (cross-group) transaction that stores or
+    deletes the 'Like', and followed by likes_changed() once it commits.
+
+    """
+    name = _shard_name(post_id, random.randint(0, NUM_SHARDS - 1))
+    shard = LikeShard.get_by_key_name(name)
+    if shard is None:
+        shard = LikeShard(key_name=name, post_id=post_id)
+    shard.count += delta
+    shard.changes += 1
+    shard.put()
+
+
+def likes_changed(post_id, delta):
+    """Follow a committed change_shard() of 'delta' on the post."""
+    # Adjust the cached total in place, with compare-and-set. If there is
+    # none (or only a read's seed), a read may have summed the shards
+    # before this change: delete its seed, so it isn't cached and the next
+    # read sums them again.
+    key = _cache_key(post_id)
+    client = memcache.Client()
+    for _ in range(CAS_RETRIES):
+        total = client.gets(key)
+        if not isinstance(total, (int, long)):
+            memcache.delete(key)
+            break
+        if client.cas(key, total + delta, time=CACHE_SECONDS):
+            break
+    else:
+        memcache.delete(key)
+    _queue_sync(post_id)
+
+
+def _queue_sync(post_id):
+    """Queue sync_like_count for the post, unless it's already queued."""
+    window = int(time.time() / SYNC_SECONDS)
+    tasks.defer(sync_like_count, post_id, _countdown=SYNC_SECONDS,
+                _name="like-sync-%s-%d" % (post_id, window))
+
+
+def sync_like_count(post_id):
+    """Copy the post's sharded 'Like' total onto Post.like_count.
+
+    Safe to run any number of times: it always writes the current total.
+
+    """
+    total = _shard_total(post_id)
+
+    def txn():
+        post = Post.get_by_id(int(post_id))
+        if post and post.like_count != total:
+            post.like_count = total
+            post.put()
+            return post
+    post = db.run_in_transaction(txn)
+    if post:
+        repo = storage.repository()
+        frontpage.refresh_post(post.id, repo)
+        authors.refresh_post(post, repo)
+
+
+def shard_state(post_id):
+    """Return the count and number of changes of each of the post's shards
+    (None for those never written), to pass to set_like_count()."""
+    return [shard and (shard.count, shard.changes)
+            for shard in db.get(_shard_keys(post_id))]
+
+
+def set_like_count(post_id, total, state):
+    """Correct the post's shards to add up to 'total' (used by the backfill).
+
+    'total' must have been counted after shard_state() returned 'state'.
+    If a like or unlike has changed a shard since then, the count may or
+    may not include it, so nothing is written and False is returned.
+
+    Must be called inside a cross-group transaction, which reads every
+    shard, so a like or unlike committed before it commits makes it retry.
+    The difference is added to one shard. Call forget_like_count() once
+    the transaction commits.
+
+    """
+    shards = db.get(_shard_keys(post_id))
+    if [shard and (shard.count, shard.changes)
+            for shard in shards] != state:
+        return False
+    delta = total - sum(shard.count for shard in shards if shard)
+    if delta:
+        shard = shards[0] or LikeShard(key_name=_shard_name(post_id, 0),
+                                       post_id=post_id)
+        shard.count += delta
+        shard.put()
+    return True
+
+
+def forget_like_count(post_id):
+    """Drop the post's cached total, so the next read sums the shards."""
+    memcache.delete(_cache_key(post_id))
+
+
+def delete_like_count(post_id):
+    """Delete the counter of a post that has been deleted."""
+    db.delete(_shard_keys(post_id))
+    memcache.delete(_cache_key(post_id))
@@ -1,12 +1,7 @@
-from myapp.handlerz.handlerparent import Handler
-from google.appengine.ext import db
-from myapp.modelz import Comment, Post
-
-
 def user_logged_in(f):
     """Verify the user is logged in."""
     def wrapper(self, *a, **kw):
-        if self.read_secure_cookie("user_id"):
+        if self.session.user_id:
             return f(self, *a, **kw)
         else:
             return self.redirect("/blog/login")
@@ -14,24 +9,22 @@ def user_logged_in(f):
 
 
 def comment_exists(f):
-    """Verify the requested comment exists."""
-    def wrapper(self, post_id):
-        key = db.Key.from_path("Comment", int(post_id))
-        comment = db.get(key)
+    """Verify the requested comment exists, pass it on to the method."""
+    def wrapper(self, post_id, comm_id):
+        comment = self.repo.get_comment(post_id, comm_id)
         if comment:
-            return f(self, post_id)
+            return f(self, post_id, comm_id, comment)
         else:
             return self.error(404)
     return wrapper
 
 
 def post_exists(f):
-    """Verify the requested post exists."""
+    """Verify the requested post exists, pass it on to the method."""
     def wrapper(self, post_id):
-        key = db.Key.from_path("Post", int(post_id))
-        post = db.get(key)
+        post = self.repo.get_post(post_id)
         if post:
-            return f(self, post_id)
+            return f(self, post_id, post)
         else:
             return self.error(404)
     return wrapper
@@ -39,11 +32,9 @@ def post_exists(f):
 
 def user_owns_comment(f):
     """Verify the current user owns the current comment."""
-    def wrapper(self, post_id):
-        key = db.Key.from_path("Comment", int(post_id))
-        comment = db.get(key)
-        if self.read_secure_cookie("user_id") == comment.creator:
-            return f(self, post_id)
+    def wrapper(self, post_id, comm_id, comment):
+        if self.session.user_id == comment.creator:
+            return f(self, post_id, comm_id, comment)
         else:
             return self.redirect("/blog/login")
     return wrapper
@@ -51,11 +42,19 @@ def user_owns_comment(f):
 
 def user_owns_post(f):
     """Verify the current user owns the current post."""
-    def wrapper(self, post_id):
-        key = db.Key.from_path("Post", int(post_id))
-        post = db.get(key)
-        if self.read_secure_cookie("user_id") == post.creator:
-            return f(self, post_id)
+    def wrapper(self, post_id, post):
+        if self.session.user_id == post.creator:
+            return f(self, post_id, post)
         else:
             return self.redirect("/blog/login")
     return wrapper
+
+
+def admin_only(f):
+    """Verify the current user is an administrator of the app."""
+    def wrapper(self, *a, **kw):
+        if self.session.is_admin:
+            return f(self, *a, **kw)
+        else:
+            return self.error(403)
+    return wrapper
@@ -0,0 +1,180 @@
+"""Atom and RSS feeds of the most recent posts, for the blog and per author.
+
+A feed lists the FEED_SIZE most recent posts, newest first, as the main
+blog page does (the author feeds only their author's). The posts are
+cached with the time they were read or last changed, which is the feed's
+Last-Modified time. NewPost, EditPost and DeletePost call record_post() or
+remove_post() to write the change through to the cached posts of the
+blog's and the author's feeds, as they do for the front page (see
+myapp/functions/writethrough.py); CACHE_SECONDS is only a fallback.
+
+The feed document is generated an entry at a time and written to the
+response as it is, rather than built up as one string first. Once it has
+all been written it is cached, under the time its posts were read, so
+later requests for the same posts are served the cached copy.
+
+"""
+import calendar
+import functools
+from datetime import datetime
+from email.utils import formatdate
+from xml.sax.saxutils import escape, quoteattr
+
+from myapp.functions import rendering, writethrough
+from myapp.functions.cache import memcache
+
+
+FEED_SIZE = 20
+CACHE_SECONDS = 300
+CONTENT_TYPES = {
+    "atom": "application/atom+xml; charset=utf-8",
+    "rss": "application/rss+xml; charset=utf-8",
+}
+
+
+def _posts_key(creator):
+    """Return the memcache key of a feed's posts (the blog's if None)."""
+    return "feed:posts:%s" % (creator or "")
+
+
+def _read(repo, creator):
+    if creator:
+        posts = repo.author_posts(creator, limit=FEED_SIZE)[0]
+    else:
+        posts = repo.recent_posts(limit=FEED_SIZE)[0]
+    return posts, datetime.utcnow()
+
+
+def recent_posts(repo, creator=None):
+    """Return the most recent posts, of one author if creator is given,
+    and the time they were read."""
+    page = memcache.get(_posts_key(creator))
+    if page is None:
+        page = _read(repo, creator)
+        # Never overwrite posts a writer has stored since the read.
+        memcache.add(_posts_key(creator), page, time=CACHE_SECONDS)
+    return page
+
+
+def _change(post, written, repo):
+    """Write 'written' (the post, or None for its deletion) through to the
+    cached posts of the blog's feed and of the post's author's feed.
+
+    Each is read first if it isn't cached, so the write is in it however
+    soon the feed is next served.
+
+    """
+    def change(page):
+        posts = page[0]
+        # A feed that isn't full lists every post, however old.
+        posts = writethrough.replace(posts, post.id, written,
+                                     len(posts) < FEED_SIZE)
+        return posts[:FEED_SIZE], datetime.utcnow()
+    for creator in (None, post.creator):
+        writethrough.update(_posts_key(creator), change,
+                            functools.partial(_read, repo, creator),
+                            CACHE_SECONDS)
+
+
+def record_post(post, repo):
+    """Put a post that was created or changed in the feeds it's listed in."""
+    _change(post, post, repo)
+
+
+def remove_post(post, repo):
+    """Take a deleted post out of the feeds."""
+    _change(post, None, repo)
+
+
+def _rfc3339(when):
+    return when.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _rfc822(when):
+    return formatdate(calendar.timegm(when.utctimetuple()), usegmt=True)
+
+
+def _edited(post):
+    """Return when the post was last edited (or created).
+
+    Posts stored before 'edited' was added only have 'created'.
+    'last_modified' isn't used: it also moves when a post is liked or
+    commented on, which feed readers would show as an update.
+
+    """
+    return post.edited or post.created
+
+
+def _updated(posts, read):
+    """Return when the newest edit to any of the posts was made."""
+    return max([_edited(post) for post in posts] or [read])
+
+
+def _body(post):
+    """Return the HTML of the post's content."""
+    return post.content_html or rendering.body_html(post.content)
+
+
+def atom(posts, read, title, feed_url, site_url):
+    """Yield the chunks of an Atom feed of the posts."""
+    yield ('<?xml version="1.0" encoding="utf-8"?>\n'
+           '<feed xmlns="http://www.w3.org/2005/Atom">\n'
+           '<title>%s</title>\n<link href=%s/>\n'
+           '<link rel="self" href=%s/>\n<id>%s</id>\n<updated>%s</updated>\n'
+           % (escape(title), quoteattr(site_url), quoteattr(feed_url),
+              escape(feed_url), _rfc3339(_updated(posts, read))))
+    for post in posts:
+        url = "%s/blog/%s" % (site_url, post.id)
+        yield ('<entry>\n<title type="text">%s</title>\n<link href=%s/>\n'
+               '<id>%s</id>\n<published>%s</published>\n'
+               '<updated>%s</updated>\n<author><name>%s</name></author>\n'
+               '<content type="html">%s</content>\n</entry>\n'
+               % (escape(post.subject), quoteattr(url), escape(url),
+                  _rfc3339(post.created), _rfc3339(_edited(post)),
+                  escape(post.name or ""), escape(_body(post))))
+    yield "</feed>\n"
+
+
+def rss(posts, read, title, feed_url, site_url):
+    """Yield the chunks of an RSS 2.0 feed of the posts."""
+    yield ('<?xml version="1.0" encoding="utf-8"?>\n'
+           '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" '
+           'xmlns:dc="http://purl.org/dc/elements/1.1/">\n<channel>\n'
+           '<title>%s</title>\n<link>%s</link>\n<description>%s'
+           '</description>\n<atom:link rel="self" href=%s '
+           'type="application/rss+xml"/>\n<lastBuildDate>%s</lastBuildDate>\n'
+           % (escape(title), escape(site_url), escape(title),
+              quoteattr(feed_url), _rfc822(_updated(posts, read))))
+    for post in posts:
+        url = "%s/blog/%s" % (site_url, post.id)
+        yield ('<item>\n<title>%s</title>\n<link>%s</link>\n'
+               '<guid isPermaLink="true">%s</guid>\n<pubDate>%s</pubDate>\n'
+               '<dc:creator>%s</dc:creator>\n<description>%s</description>\n'
+               '</item>\n'
+               % (escape(post.subject), escape(url), escape(url),
+                  _rfc822(post.created), escape(post.name or ""),
+                  escape(_body(post))))
+    yield "</channel>\n</rss>\n"
+
+
+GENERATORS = {"atom": atom, "rss": rss}
+
+
+def stream(format, posts, read, title, feed_url, site_url):
+    """Yield the feed document as UTF-8 chunks.
+
+    Yield the cached document if there is one for these posts; otherwise
+    generate it, and cache it once the last chunk has been yielded.
+
+    """
+    cache_key = "feed:%s:%s" % (feed_url, read.isoformat())
+    document = memcache.get(cache_key)
+    if document is not None:
+        yield document
+        return
+    chunks = []
+    for chunk in GENERATORS[format](posts, read, title, feed_url, site_url):
+        chunk = chunk.encode("utf-8")
+        chunks.append(chunk)
+        yield chunk
+    memcache.set(cache_key, "".join(chunks), time=CACHE_SECONDS)
@@ -0,0 +1,103 @@
+"""Cached contents of the main blog page.
+
+The 10 most recent posts are cached for every visitor, and the fully
+rendered page is cached as well for visitors who aren't logged in (a
+logged in user's name appears in the page header, so their page is
+rendered from the cached posts). The handlers that write posts call
+record_post() or remove_post() to write the change through to the cached
+posts (see myapp/functions/writethrough.py), and those that change the
+'Like' and comment counts shown with them call refresh_post();
+CACHE_SECONDS is only a fallback.
+
+The cached posts are stored with the time they were read or last changed,
+which is the front page's Last-Modified time, and the rendered page with
+the time of the posts it was rendered from.
+
+"""
+from datetime import datetime
+
+from myapp.functions import writethrough
+from myapp.functions.cache import memcache
+
+
+CACHE_SECONDS = 300
+POSTS_KEY = "blog:front:posts"
+ANONYMOUS_PAGE_KEY = "blog:front:anonymous"
+
+
+def _read(repo):
+    posts, next_cursor = repo.recent_posts()
+    return posts, next_cursor, datetime.utcnow()
+
+
+def recent_posts(repo):
+    """Return the 10 most recent posts, the cursor of the next page, and
+    the time they were read."""
+    page = memcache.get(POSTS_KEY)
+    if page is None:
+        page = _read(repo)
+        # Never overwrite posts a writer has stored since the read.
+        memcache.add(POSTS_KEY, page, time=CACHE_SECONDS)
+    return page
+
+
+def anonymous_page(posts, next_cursor, updated, render):
+    """Return the page shown to visitors who aren't logged in.
+
+    'render' is called with the recent posts and the cursor of the next
+    page to build the page when it isn't cached, or was rendered from
+    posts other than those of 'updated'.
+
+    """
+    cached = memcache.get(ANONYMOUS_PAGE_KEY)
+    if cached and cached[0] == updated:
+        return cached[1]
+    html = render(posts, next_cursor)
+    memcache.set(ANONYMOUS_PAGE_KEY, (updated, html), time=CACHE_SECONDS)
+    return html
+
+
+def _change(post_id, written, load=None):
+    """Write the post that written() returns (or, if it's None, the post's
+    deletion) through to the cached posts."""
+    def change(page):
+        posts, next_cursor, _ = page
+        posts = writethrough.replace(posts, post_id, written(),
+                                     next_cursor is None)
+        if load and len(posts) > writethrough.MAX_ENTRIES:
+            read, next_cursor, _ = load()
+            posts = writethrough.catch_up(posts, read, next_cursor)
+        return posts, next_cursor, datetime.utcnow()
+    writethrough.update(POSTS_KEY, change, load, CACHE_SECONDS)
+
+
+def record_post(post, repo):
+    """Put a post that was created or changed on the cached posts.
+
+    The posts are read first if they aren't cached, so the post is on them
+    however soon the page is next shown.
+
+    """
+    _change(post.id, lambda: post, lambda: _read(repo))
+
+
+def remove_post(post_id, repo):
+    """Take a deleted post off the cached posts."""
+    _change(post_id, lambda: None, lambda: _read(repo))
+
+
+def refresh_post(post_id, repo):
+    """Put the current copy of a post whose counts changed on the cached
+    posts, if they're cached.
+
+    The post is read again for each attempt to store it, so when several
+    requests change its counts at once, the copy left cached is never
+    older than the last of their changes.
+
+    """
+    _change(post_id, lambda: repo.reload_post(post_id))
+
+
+def invalidate():
+    """Drop the cached posts and page after posts are changed in bulk."""
+    memcache.delete_multi([POSTS_KEY, ANONYMOUS_PAGE_KEY])
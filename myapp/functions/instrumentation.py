@@ -0,0 +1,327 @@
+"""Per-request timings, collected by WSGI middleware around main.app.
+
+For every request the middleware records its wall time (until the server
+has sent the response body and closed it), the time spent rendering
+templates (Handler.render_str), and the number and duration of the storage
+operations it made, split into gets, queries, puts and deletes. On App
+Engine those are the datastore RPCs (counted by API proxy hooks); on
+SQLite, the repository methods that read or write the database. The RPCs
+that begin, commit and roll back datastore transactions are counted apart,
+as "transaction", so a put in a transaction counts as one put.
+
+Each request is logged as one JSON line, and added to an in-memory window
+of the last WINDOW requests to its route. snapshot() summarizes the
+windows of this instance; /admin/stats serves it.
+
+"""
+import collections
+import contextlib
+import functools
+import json
+import logging
+import threading
+import time
+
+
+WINDOW = 1000
+# Upper bounds, in ms, of the wall time histogram's buckets.
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+KINDS = ("get", "query", "put", "delete", "transaction", "other")
+
+# Datastore RPCs by the kind of operation they're counted as.
+DATASTORE_CALLS = {
+    "Get": "get",
+    "RunQuery": "query",
+    "Next": "query",
+    "Put": "put",
+    "Delete": "delete",
+    "BeginTransaction": "transaction",
+    "Commit": "transaction",
+    "Rollback": "transaction",
+}
+
+_local = threading.local()
+
+
+class RequestStats(object):
+
+    """The timings of one request."""
+
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.route = None
+        self.status = None
+        self.wall = 0.0
+        self.render = 0.0
+        self.storage = dict((kind, [0, 0.0]) for kind in KINDS)
+        self.started = {}  # datastore RPCs in flight, by id, to their start
+        self._lock = threading.Lock()  # see bind()
+
+    def add(self, kind, seconds):
+        """Count one operation of kind ("render" or a storage KIND)."""
+        with self._lock:
+            if kind == "render":
+                self.render += seconds
+            else:
+                counted = self.storage[kind]
+                counted[0] += 1
+                counted[1] += seconds
+
+    @property
+    def storage_calls(self):
+        """Return the number of storage operations, not counting
+        transactions' begins, commits and rollbacks."""
+        return sum(calls for kind, (calls, _) in self.storage.iteritems()
+                   if kind != "transaction")
+
+    def log_line(self):
+        """Return the request's timings as a dict for a structured log."""
+        line = dict(method=self.method, path=self.path, route=self.route,
+                    status=self.status, wall_ms=_ms(self.wall),
+                    render_ms=_ms(self.render))
+        for kind, (calls, seconds) in self.storage.iteritems():
+            if calls:
+                line[kind] = calls
+                line[kind + "_ms"] = _ms(seconds)
+        return line
+
+
+class RouteStats(object):
+
+    """The timings of the last WINDOW requests to a route."""
+
+    def __init__(self):
+        self.requests = 0
+        self.recent = collections.deque(maxlen=WINDOW)
+
+    def add(self, stats):
+        self.requests += 1
+        self.recent.append((stats.wall, stats.render, stats.status,
+                            dict((kind, tuple(counted)) for kind, counted
+                                 in stats.storage.iteritems() if counted[0])))
+
+    def summary(self):
+        """Return percentiles, a histogram and averages of the window."""
+        recent = list(self.recent)
+        walls = sorted(wall for wall, _, _, _ in recent)
+        histogram = [0] * (len(BUCKETS) + 1)
+        for wall in walls:
+            histogram[_bucket(wall * 1000)] += 1
+        storage = {}
+        for _, _, _, counts in recent:
+            for kind, (calls, seconds) in counts.iteritems():
+                total = storage.setdefault(kind, [0, 0.0])
+                total[0] += calls
+                total[1] += seconds
+        n = float(len(recent)) or 1
+        return dict(
+            requests=self.requests,
+            window=len(recent),
+            errors=sum(1 for _, _, status, _ in recent if status >= 500),
+            p50_ms=_ms(percentile(walls, 50)),
+            p95_ms=_ms(percentile(walls, 95)),
+            p99_ms=_ms(percentile(walls, 99)),
+            # (upper bound in ms, or None for the last bucket, requests)
+            histogram=zip(BUCKETS + (None,), histogram),
+            render_ms=_ms(sum(r for _, r, _, _ in recent) / n),
+            storage=dict((kind, dict(calls=round(calls / n, 2),
+                                     ms=_ms(seconds / n)))
+                         for kind, (calls, seconds) in storage.iteritems()))
+
+
+_routes = {}
+_routes_lock = threading.Lock()
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def _bucket(ms):
+    for i, bound in enumerate(BUCKETS):
+        if ms <= bound:
+            return i
+    return len(BUCKETS)
+
+
+def percentile(ordered, p):
+    """Return the p'th percentile (nearest rank) of a sorted list, or 0.0
+    if it's empty."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100.0))]
+
+
+def current():
+    """Return the RequestStats of the request being handled, or None."""
+    return getattr(_local, "stats", None)
+
+
+def bind(function):
+    """Return function wrapped to count its operations as the current
+    request's, when it's called on another thread (e.g. a thread pool's).
+
+    Operations that overlap are each counted in full, so a request's
+    storage time can add up to more than its wall time.
+
+    """
+    stats = current()
+
+    @functools.wraps(function)
+    def wrapper(*a, **kw):
+        previous, _local.stats = current(), stats
+        try:
+            return function(*a, **kw)
+        finally:
+            _local.stats = previous
+    return wrapper
+
+
+def set_route(template):
+    """Name the route the current request was dispatched to."""
+    stats = current()
+    if stats:
+        # webapp2 anchors a route's template once it has matched a request.
+        stats.route = template.lstrip("^").rstrip("$")
+
+
+@contextlib.contextmanager
+def timer(kind):
+    """Count the time the with block takes as one operation of kind."""
+    start = time.time()
+    try:
+        yield
+    finally:
+        stats = current()
+        if stats:
+            stats.add(kind, time.time() - start)
+
+
+def timed(kind):
+    """Decorate a function to count each call as an operation of kind."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*a, **kw):
+            with timer(kind):
+                return function(*a, **kw)
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """Return the summary of every route's recent requests, by route."""
+    with _routes_lock:
+        routes = _routes.items()
+    return dict((route, route_stats.summary()) for route, route_stats
+                in routes)
+
+
+class Middleware(object):
+
+    """Wrap a WSGI app to time each of its requests.
+
+    Attributes the wrapper doesn't have (e.g. 'router') are the wrapped
+    app's, so it can stand in for the WSGIApplication.
+
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def __getattr__(self, name):
+        return getattr(self.app, name)
+
+    def __call__(self, environ, start_response):
+        stats = RequestStats(environ.get("REQUEST_METHOD"),
+                             environ.get("PATH_INFO"))
+        environ["blog.request_stats"] = stats
+
+        def recording_start_response(status, headers, exc_info=None):
+            stats.status = int(status.split(" ", 1)[0])
+            return start_response(status, headers, exc_info)
+
+        _local.stats = stats
+        start = time.time()
+        try:
+            app_iter = self.app(environ, recording_start_response)
+        except BaseException:
+            self._record(stats, start)
+            raise
+        finally:
+            _local.stats = None
+        return _ResponseBody(app_iter, stats,
+                             functools.partial(self._record, stats, start))
+
+    def _record(self, stats, start):
+        stats.wall = time.time() - start
+        route = stats.route or "(no route)"
+        with _routes_lock:
+            route_stats = _routes.get(route)
+            if route_stats is None:
+                route_stats = _routes[route] = RouteStats()
+            route_stats.add(stats)
+        logging.info("request_stats %s",
+                     json.dumps(stats.log_line(), sort_keys=True))
+
+
+class _ResponseBody(object):
+
+    """The body a wrapped app returned, which records its request once the
+    server has sent it.
+
+    Streamed bodies (such as the feeds) do their work while they're
+    iterated, so it's counted as the request's, and the request's wall time
+    runs until the server closes the body, as WSGI servers must.
+
+    """
+
+    def __init__(self, app_iter, stats, record):
+        self.app_iter = app_iter
+        self.stats = stats
+        self.record = record
+
+    def __iter__(self):
+        chunks = iter(self.app_iter)
+        while True:
+            previous, _local.stats = current(), self.stats
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                return
+            finally:
+                _local.stats = previous
+            yield chunk
+
+    def close(self):
+        try:
+            if hasattr(self.app_iter, "close"):
+                self.app_iter.close()
+        finally:
+            if self.record:
+                self.record()
+                self.record = None
+
+
+def _datastore_pre_call(service, call, request, response, rpc):
+    stats = current()
+    if stats:
+        stats.started[id(request)] = time.time()
+
+
+def _datastore_post_call(service, call, request, response, rpc, error):
+    stats = current()
+    if stats:
+        start = stats.started.pop(id(request), None)
+        if start is not None:
+            stats.add(DATASTORE_CALLS.get(call, "other"), time.time() - start)
+
+
+def install_datastore_hooks():
+    """Count the datastore RPCs made by requests (once per instance)."""
+    from google.appengine.api import apiproxy_stub_map
+    proxy = apiproxy_stub_map.apiproxy
+    proxy.GetPreCallHooks().Append("request_stats", _datastore_pre_call,
+                                   "datastore_v3")
+    proxy.GetPostCallHooks().Append("request_stats", _datastore_post_call,
+                                    "datastore_v3")
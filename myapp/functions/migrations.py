@@ -0,0 +1,245 @@
+"""Resumable batch jobs that move existing entities to their current layout.
+
+Each job works through one batch of entities, then defers itself with the
+query cursor of where it stopped, so a job interrupted part way through can
+simply be started again. Jobs are started from the '/admin/migrate/<name>'
+page (see the Migrate handler).
+
+"""
+import logging
+
+from google.appengine.ext import db
+from myapp.functions import (cascade, counters, frontpage, rendering,
+                             searchindex, tasks)
+from myapp.modelz import Comment, Credential, Likez, Post
+
+
+BATCH_SIZE = 100
+# Times a post's 'Likes' are counted again when they change while counted.
+COUNT_RETRIES = 3
+
+
+def migrate_credentials(cursor=None):
+    """Re-key legacy Credential rows by their username.
+
+    Credentials were originally stored with auto-allocated numeric ids, so
+    finding one meant scanning the entity. Copy each of those rows to a new
+    entity keyed by username, keeping the old numeric id as its 'user_id'
+    (posts, comments, 'Likes' and cookies all refer to it), then delete the
+    old row. Rows already keyed by username are skipped.
+
+    """
+    query = Credential.all()
+    if cursor:
+        query.with_cursor(cursor)
+    batch = query.fetch(BATCH_SIZE)
+    moved = 0
+    for legacy in batch:
+        if legacy.key().name():
+            continue
+        # Claim the username the same way Signup does, so a concurrent
+        # signup and the migration can't both take it.
+        if not Credential.reserve(legacy.username, rekeying=True,
+                                  email=legacy.email,
+                                  hashed_password=legacy.hashed_password,
+                                  user_id=legacy.key().id()):
+            copy = Credential.get_by_key_name(legacy.username)
+            if copy.user_id == legacy.key().id():
+                # Copied by an earlier, interrupted run of this batch.
+                legacy.delete()
+                continue
+            logging.warning("Credential %s: username %r is already taken, "
+                            "leaving the row in place.",
+                            legacy.key().id(), legacy.username)
+            continue
+        legacy.delete()
+        moved += 1
+    logging.info("migrate_credentials: moved %d credentials.", moved)
+    if len(batch) == BATCH_SIZE:
+        tasks.defer(migrate_credentials, query.cursor())
+
+
+def migrate_likes(cursor=None):
+    """Move legacy Likez rows onto keys derived from their post and user.
+
+    'Likes' were originally stored with auto-allocated ids, which allowed
+    duplicates. Each legacy row that still counts as a 'Like' is copied to
+    its (post, user) key unless that 'Like' already exists, and every legacy
+    row is then deleted, which drops the duplicates. Once all rows are
+    moved the 'Like' counts are repaired.
+
+    """
+    query = Likez.all()
+    if cursor:
+        query.with_cursor(cursor)
+    batch = query.fetch(BATCH_SIZE)
+    moved = 0
+    for legacy in batch:
+        if legacy.key().name():
+            continue
+        if legacy.does_like and Likez.add(legacy.post_id, legacy.creator,
+                                          legacy.name, created=legacy.created):
+            moved += 1
+        legacy.delete()
+    logging.info("migrate_likes: moved %d likes.", moved)
+    if len(batch) == BATCH_SIZE:
+        tasks.defer(migrate_likes, query.cursor())
+    else:
+        tasks.defer(repair_counts)
+
+
+def repair_counts(cursor=None):
+    """Recount every post's 'Likes' and comments from the source rows.
+
+    Posts are worked through in batches. Each post's sharded 'Like' counter
+    and its 'like_count' are corrected to a count of its Likez rows, and its
+    'comment_count' to a count of its comments, in one cross-group
+    transaction over the post and its shards, so the job can be re-run at
+    any time.
+
+    The Likez rows are counted with a global query, which can't run in the
+    transaction. So the shards are read before the count, and the
+    transaction only writes if no like or unlike has changed them since;
+    otherwise the post is counted again, and after COUNT_RETRIES attempts
+    it's left as it was. The count query is also only eventually
+    consistent: a 'Like' written just before the job reaches its post may
+    not be counted, so run the job while the blog isn't being liked for an
+    exact count.
+
+    """
+    query = Post.all(keys_only=True)
+    if cursor:
+        query.with_cursor(cursor)
+    batch = query.fetch(BATCH_SIZE)
+    for key in batch:
+        _repair_post_counts(key)
+    frontpage.invalidate()
+    logging.info("repair_counts: counted %d posts.", len(batch))
+    if len(batch) == BATCH_SIZE:
+        tasks.defer(repair_counts, query.cursor())
+
+
+def _repair_post_counts(key):
+    """Recount one post's 'Likes' and comments (see repair_counts)."""
+    post_id = str(key.id())
+    for _ in range(COUNT_RETRIES):
+        state = counters.shard_state(post_id)
+        likez = Likez.all(keys_only=True).filter("post_id =", post_id)
+        likez.filter("does_like =", True)
+        likes = likez.count(limit=None)
+        if db.run_in_transaction_options(
+                db.create_transaction_options(xg=True), _set_post_counts,
+                key, likes, state):
+            counters.forget_like_count(post_id)
+            return
+    logging.warning("repair_counts: post %s kept being liked while it was "
+                    "counted, leaving its counts as they were.", post_id)
+
+
+def _set_post_counts(key, likes, state):
+    """Store the post's 'Like' count and a fresh count of its comments,
+    return False if its shards have changed from 'state'."""
+    post = db.get(key)
+    if post:
+        if not counters.set_like_count(str(key.id()), likes, state):
+            return False
+        comments = Comment.all(keys_only=True).ancestor(key)
+        comments.filter("mod =", False)
+        post.like_count = likes
+        post.comment_count = comments.count(limit=None)
+        post.put()
+    return True
+
+
+def migrate_comments(cursor=None):
+    """Move root-level comments into their post's entity group.
+
+    PostPage reads a post's comments with an ancestor query, so each
+    comment written before comments were children of their Post is copied
+    under its post, keeping its id, then deleted. Copies get 'mod' set to
+    False if it was never set, since only those comments are displayed.
+    Re-running a batch writes the same keys again. Once all comments are
+    moved the counts are repaired, since repair_counts only counts the
+    comments under each post.
+
+    """
+    query = Comment.all()
+    if cursor:
+        query.with_cursor(cursor)
+    batch = query.fetch(BATCH_SIZE)
+    legacy = [comment for comment in batch if comment.parent_key() is None]
+    moved = []
+    for comment in legacy:
+        key = Comment.key_for(comment.post_id, comment.key().id())
+        # Stop the id being handed out again to a new comment on the post.
+        db.allocate_id_range(key, key.id(), key.id())
+        moved.append(Comment(key=key, content=comment.content,
+                             content_html=comment.content_html,
+                             created=comment.created,
+                             creator=comment.creator, name=comment.name,
+                             post_id=comment.post_id,
+                             mod=bool(comment.mod)))
+    db.put(moved)
+    db.delete(legacy)
+    logging.info("migrate_comments: moved %d comments.", len(moved))
+    if len(batch) == BATCH_SIZE:
+        tasks.defer(migrate_comments, query.cursor())
+    else:
+        tasks.defer(repair_counts)
+
+
+def render_bodies(kind="Post", cursor=None):
+    """Store the rendered HTML (and excerpt) of every post, then comment.
+
+    Posts and comments written before their HTML was stored are shown by
+    rendering their content on every request. Each one whose stored HTML
+    is missing or out of date is rendered and put again (which also moves
+    its 'last_modified' on); the rest are left alone, so the job can be
+    re-run, for instance after rendering.py changes.
+
+    """
+    model = Post if kind == "Post" else Comment
+    query = model.all()
+    if cursor:
+        query.with_cursor(cursor)
+    batch = query.fetch(BATCH_SIZE)
+    changed = []
+    for entity in batch:
+        fields = dict(content_html=rendering.body_html(entity.content))
+        if model is Post:
+            fields["excerpt"] = rendering.excerpt(entity.content)
+        if any(getattr(entity, name) != value
+               for name, value in fields.iteritems()):
+            for name, value in fields.iteritems():
+                setattr(entity, name, value)
+            changed.append(entity)
+    db.put(changed)
+    logging.info("render_bodies: rendered %d of %d %ss.", len(changed),
+                 len(batch), kind)
+    if len(batch) == BATCH_SIZE:
+        tasks.defer(render_bodies, kind, query.cursor())
+    elif model is Post:
+        tasks.defer(render_bodies, "Comment")
+    else:
+        frontpage.invalidate()
+
+
+# Jobs that can be started by name from the Migrate handler.
+JOBS = {
+    "comments": migrate_comments,
+    "counts": repair_counts,
+    "credentials": migrate_credentials,
+    "likes": migrate_likes,
+    "orphans": cascade.sweep_orphans,
+    "render": render_bodies,
+    "search": searchindex.rebuild,
+}
+
+
+def start(name):
+    """Queue the first batch of the named job, return False if unknown."""
+    job = JOBS.get(name)
+    if not job:
+        return False
+    tasks.defer(job)
+    return True
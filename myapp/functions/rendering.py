@@ -0,0 +1,148 @@
+"""HTML bodies and excerpts of posts and comments, rendered when written.
+
+Posts and comments are written as text that may contain some HTML. The
+repository stores, next to that source text, the HTML pages show:
+
+* body_html(text) keeps the tags in ALLOWED_TAGS (and of their
+  attributes, only those listed there, with links limited to http, https,
+  mailto and relative URLs), escapes everything else, closes tags left
+  open, and turns line breaks into <br>s.
+* excerpt(text) is the text without any markup, cut after at most
+  EXCERPT_LENGTH characters at a word boundary, and escaped.
+
+Both are plain strings that templates output as they are, so no page does
+any string work on a post or comment. The 'render' migration job fills
+them in for posts and comments written before they were stored.
+
+"""
+import htmlentitydefs
+import re
+from cgi import escape
+from HTMLParser import HTMLParseError, HTMLParser
+
+
+# Tags kept in bodies, and the attributes kept on each.
+ALLOWED_TAGS = {
+    "a": ("href", "title"),
+    "b": (), "strong": (), "i": (), "em": (), "u": (), "s": (),
+    "p": (), "br": (), "hr": (), "blockquote": (), "code": (), "pre": (),
+    "ul": (), "ol": (), "li": (), "h3": (), "h4": (), "h5": (),
+}
+VOID_TAGS = frozenset(["br", "hr"])
+# Tags whose content is dropped along with them.
+DROPPED_TAGS = frozenset(["script", "style"])
+EXCERPT_LENGTH = 400
+
+# Shown in place of a numeric reference to a character XML doesn't allow.
+REPLACEMENT_CHAR = 0xFFFD
+
+_SAFE_URL_RE = re.compile(r"^(?:https?:|mailto:|[^:]*$)", re.I)
+
+
+def _valid_xml_char(code):
+    """Return whether the code point is a character XML documents allow."""
+    return (code in (0x9, 0xA, 0xD) or 0x20 <= code <= 0xD7FF or
+            0xE000 <= code <= 0xFFFD or 0x10000 <= code <= 0x10FFFF)
+
+
+class _Renderer(HTMLParser):
+
+    """Collect the sanitized HTML, and the plain text, of a fragment."""
+
+    def __init__(self):
+        HTMLParser.__init__(self)
+        self.html, self.text, self.open = [], [], []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        kept = [(name, value) for name, value in attrs
+                if name in ALLOWED_TAGS[tag] and value is not None and
+                (name != "href" or _SAFE_URL_RE.match(value.strip()))]
+        if tag == "a":
+            kept.append(("rel", "nofollow"))
+        self.html.append("<%s%s>" % (tag, "".join(
+            ' %s="%s"' % (name, escape(value, True)) for name, value in kept)))
+        if tag not in VOID_TAGS:
+            self.open.append(tag)
+        self.text.append(" ")
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag in self.open[-1:] and tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping or tag not in self.open:
+            return
+        # Close anything left open inside the tag too.
+        while self.open:
+            inner = self.open.pop()
+            self.html.append("</%s>" % inner)
+            if inner == tag:
+                break
+        self.text.append(" ")
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        self.text.append(data)
+        data = escape(data)
+        if "pre" not in self.open:
+            data = data.replace("\n", "<br>\n")
+        self.html.append(data)
+
+    def handle_entityref(self, name):
+        if name in htmlentitydefs.name2codepoint:
+            self.handle_data(unichr(htmlentitydefs.name2codepoint[name]))
+        else:
+            # Show an unknown reference as it was written. HTMLParser
+            # doesn't say if it ended with a ';', so one is always kept.
+            self.handle_data("&%s;" % name)
+
+    def handle_charref(self, name):
+        if name[:1] in "xX":
+            code = int(name[1:], 16)
+        else:
+            code = int(name)
+        if not _valid_xml_char(code):
+            code = REPLACEMENT_CHAR
+        # unichr() only takes the BMP on narrow Python builds.
+        self.handle_data(("\\U%08x" % code).decode("unicode-escape"))
+
+    def close(self):
+        HTMLParser.close(self)
+        while self.open:
+            self.html.append("</%s>" % self.open.pop())
+
+
+def _render(text):
+    """Return the sanitized HTML and the plain text of text."""
+    text = (text or u"").replace("\r\n", "\n")
+    renderer = _Renderer()
+    try:
+        renderer.feed(text)
+        renderer.close()
+    except HTMLParseError:
+        # Too broken to make sense of as HTML: show it as text.
+        return escape(text).replace("\n", "<br>\n"), text
+    return u"".join(renderer.html), u"".join(renderer.text)
+
+
+def body_html(text):
+    """Return the sanitized HTML to show for a post's or comment's text."""
+    return _render(text)[0]
+
+
+def excerpt(text, length=EXCERPT_LENGTH):
+    """Return the escaped start of text's words, without any markup."""
+    words = u" ".join(_render(text)[1].split())
+    if len(words) > length:
+        words = words[:length + 1].rsplit(" ", 1)[0].rstrip() + u"..."
+    return escape(words)
@@ -0,0 +1,128 @@
+"""Full-text search over posts and their comments.
+
+Each post is indexed as one document made of its subject, its content and
+the text of its visible comments. A document's terms are the lowercased
+words of that text, without HTML tags and STOP_WORDS; each term's weight
+is the number of times it occurs, counting SUBJECT_WEIGHT for a word in
+the subject, CONTENT_WEIGHT in the content and COMMENT_WEIGHT in a
+comment.
+
+The storage backend keeps an inverted index: for each term, the posting
+list of (post id, weight) pairs of the documents it occurs in, stored so
+that one term's list is read without touching any other. A query reads
+the lists of its own terms only, and ranks the posts by how many of the
+terms they contain, then by the sum of each term's tf-idf score. The
+ranked ids are cached for CACHE_SECONDS, so paging through the results
+doesn't read the lists again; a page's cursor is the offset of its first
+result.
+
+The repository queues a post to be reindexed whenever it, or one of its
+comments, is written, and the 'search' migration job rebuilds the whole
+index.
+
+"""
+import math
+import re
+
+from myapp.functions.cache import memcache
+from myapp.storage import BadCursorError
+
+
+STOP_WORDS = frozenset("""
+a about after all also an and any are as at be been but by can could did do
+does for from had has have he her his how i if in into is it its just me my
+no not of on or our she so than that the their them then there these they
+this to too up us was we were what when which who will with would you your
+""".split())
+MAX_TERM_LENGTH = 40  # longer "words" are usually URLs or noise
+MAX_QUERY_TERMS = 8
+MAX_RESULTS = 1000
+PAGE_SIZE = 10
+CACHE_SECONDS = 60
+
+SUBJECT_WEIGHT = 5
+CONTENT_WEIGHT = 2
+COMMENT_WEIGHT = 1
+
+_TAG_RE = re.compile(r"<[^>]*>|&#?\w+;")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def terms(text):
+    """Return the indexed words of text, in order, with repeats."""
+    text = _TAG_RE.sub(" ", text or "").lower()
+    return [word for word in _WORD_RE.findall(text)
+            if word not in STOP_WORDS and len(word) <= MAX_TERM_LENGTH]
+
+
+def document(post, comments):
+    """Return the {term: weight} document of a post and its comments."""
+    weights = {}
+    for text, weight in ([(post.subject, SUBJECT_WEIGHT),
+                          (post.content, CONTENT_WEIGHT)] +
+                         [(comment.content, COMMENT_WEIGHT)
+                          for comment in comments]):
+        for term in terms(text):
+            weights[term] = weights.get(term, 0) + weight
+    return weights
+
+
+def query_terms(query):
+    """Return the distinct terms of a search query that will be looked up."""
+    return sorted(set(terms(query)))[:MAX_QUERY_TERMS]
+
+
+def rank(repo, words):
+    """Return the ids of the posts matching any of words, best first.
+
+    A post containing more of the words ranks higher; among posts with as
+    many, the one with the higher tf-idf score does, and then the newer.
+
+    """
+    total = max(repo.search_document_count(), 1)
+    scores, matched = {}, {}
+    for term in words:
+        postings = repo.postings(term)
+        if not postings:
+            continue
+        idf = math.log(1 + float(total) / len(postings))
+        for post_id, weight in postings:
+            scores[post_id] = (scores.get(post_id, 0) +
+                               (1 + math.log(weight)) * idf)
+            matched[post_id] = matched.get(post_id, 0) + 1
+    ranked = sorted(scores, key=lambda post_id: (-matched[post_id],
+                                                 -scores[post_id], -post_id))
+    return ranked[:MAX_RESULTS]
+
+
+def _decode_cursor(cursor):
+    """Return the offset a cursor starts at."""
+    if not cursor:
+        return 0
+    if not cursor.isdigit() or int(cursor) >= MAX_RESULTS:
+        raise BadCursorError(cursor)
+    return int(cursor)
+
+
+def search(repo, query, cursor=None, limit=PAGE_SIZE):
+    """Return a page of the posts matching query, and the next cursor.
+
+    Raise BadCursorError for a cursor that wasn't handed out.
+
+    """
+    offset = _decode_cursor(cursor)
+    words = query_terms(query)
+    if not words:
+        return [], None
+    cache_key = "search:" + " ".join(words)
+    ranked = memcache.get(cache_key)
+    if ranked is None:
+        ranked = rank(repo, words)
+        memcache.set(cache_key, ranked, time=CACHE_SECONDS)
+    # A post deleted since it was indexed is left out of its page.
+    posts = [post for post in repo.get_posts(ranked[offset:offset + limit])
+             if post]
+    next_cursor = None
+    if offset + limit < len(ranked):
+        next_cursor = str(offset + limit)
+    return posts, next_cursor
@@ -0,0 +1,132 @@
+"""The search index of posts, stored in the datastore (see search.py).
+
+Each (term, post) pair of the index is a SearchPosting entity with no
+properties, whose key_name is "<term>|<post id>|<weight>". A term's posting
+list is every key between "<term>|" and "<term>}", so looking a term up is
+a keys-only query over one contiguous range of keys, and reads no other
+term's postings. Each indexed post also has a SearchDocument listing its
+postings.
+
+Writing a post or one of its comments queues index_post, which reads the
+post and its comments and brings its postings up to date (deleting them
+if the post is gone). Writes to a post within INDEX_SECONDS of each other
+share one task, which runs after them. The 'search' migration job runs
+rebuild, which reindexes every post.
+
+"""
+import logging
+import time
+
+from google.appengine.ext import db
+from myapp.functions import search, tasks
+from myapp.functions.cache import memcache
+from myapp.modelz import Comment, Post, SearchDocument, SearchPosting
+
+
+BATCH_SIZE = 100
+PUT_BATCH_SIZE = 500  # the most entities one datastore call can write
+INDEX_SECONDS = 5
+COUNT_KEY = "search:documents"
+COUNT_SECONDS = 3600
+
+
+def postings(term):
+    """Return the (post id, weight) posting list of a term."""
+    query = SearchPosting.all(keys_only=True)
+    query.filter("__key__ >=", db.Key.from_path("SearchPosting", term + "|"))
+    query.filter("__key__ <", db.Key.from_path("SearchPosting", term + "}"))
+    found = []
+    for key in query.run(batch_size=1000):
+        _, post_id, weight = key.name().split("|")
+        found.append((int(post_id), int(weight)))
+    return found
+
+
+def document_count():
+    """Return the number of indexed posts (cached, so approximate)."""
+    count = memcache.get(COUNT_KEY)
+    if count is None:
+        count = SearchDocument.all(keys_only=True).count(limit=None)
+        memcache.set(COUNT_KEY, count, time=COUNT_SECONDS)
+    return count
+
+
+def queue_index(post_id):
+    """Queue index_post for the post, unless it's already queued."""
+    window = int(time.time() / INDEX_SECONDS)
+    tasks.defer(index_post, str(post_id), _countdown=INDEX_SECONDS,
+                _name="search-index-%s-%d" % (post_id, window))
+
+
+def _in_batches(write, entities):
+    for i in xrange(0, len(entities), PUT_BATCH_SIZE):
+        write(entities[i:i + PUT_BATCH_SIZE])
+
+
+def index_post(post_id):
+    """Bring the post's postings up to date with it and its comments.
+
+    The post's SearchDocument is written first listing both its old and
+    new postings, so if the task is interrupted the next run still finds
+    every posting it has to delete. Safe to run any number of times.
+
+    """
+    post = Post.get_by_id(int(post_id))
+    weights = {}
+    if post:
+        comments = Comment.all().ancestor(post.key()).run(batch_size=500)
+        weights = search.document(post, [comment for comment in comments
+                                         if not comment.mod])
+    new = set(SearchPosting.key_name_for(term, post_id, weight)
+              for term, weight in weights.iteritems())
+    document = SearchDocument.get_by_key_name(str(post_id))
+    old = set(document.postings) if document else set()
+    if new == old and (document or not post):
+        return
+    if new - old:
+        SearchDocument(key_name=str(post_id),
+                       postings=sorted(old | new)).put()
+    _in_batches(db.delete, [db.Key.from_path("SearchPosting", name)
+                            for name in sorted(old - new)])
+    _in_batches(db.put, [SearchPosting(key_name=name)
+                         for name in sorted(new - old)])
+    if post:
+        SearchDocument(key_name=str(post_id), postings=sorted(new)).put()
+        if not document:
+            memcache.incr(COUNT_KEY)
+    elif document:
+        document.delete()
+        memcache.decr(COUNT_KEY)
+
+
+def rebuild(kind="Post", cursor=None):
+    """Reindex one batch of posts, or delete one batch of stale documents.
+
+    Every post is reindexed first; then the documents of posts that no
+    longer exist are deleted with their postings. Defers itself with the
+    query cursor after each batch.
+
+    """
+    model = Post if kind == "Post" else SearchDocument
+    query = model.all(keys_only=True)
+    if cursor:
+        query.with_cursor(cursor)
+    batch = query.fetch(BATCH_SIZE)
+    if model is Post:
+        post_ids = [key.id() for key in batch]
+    else:
+        post_ids = [key.name() for key in batch]
+        posts = db.get([db.Key.from_path("Post", int(post_id))
+                        for post_id in post_ids])
+        post_ids = [post_id for post_id, post in zip(post_ids, posts)
+                    if not post]
+    for post_id in post_ids:
+        index_post(post_id)
+    logging.info("rebuild: indexed %d of %d %s.", len(post_ids), len(batch),
+                 kind)
+    if len(batch) == BATCH_SIZE:
+        tasks.defer(rebuild, kind, query.cursor())
+    elif model is Post:
+        tasks.defer(rebuild, "SearchDocument")
+    else:
+        memcache.delete(COUNT_KEY)
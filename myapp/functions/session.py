@@ -0,0 +1,58 @@
+"""The verified identity of the visitor making the current request."""
+import os
+
+from myapp import storage
+from myapp.functions import appfunctions
+
+
+# Off App Engine nobody is an administrator unless this is "1", as
+# tools/serve.py --admin sets for a server only its user can reach.
+LOCAL_ADMIN = os.environ.get("BLOG_LOCAL_ADMIN") == "1"
+
+
+class Session(object):
+
+    """Read and verify the 'user' and 'user_id' cookies of one request.
+
+    Each cookie's HMAC is checked the first time its value is needed, and
+    the result is kept for the rest of the request, so decorators and
+    handlers can ask for the user as often as they like.
+
+    """
+
+    def __init__(self, cookies):
+        self.cookies = cookies
+        self._verified = {}
+
+    def _read(self, name):
+        """Return the verified value of cookie 'name', or None."""
+        if name not in self._verified:
+            cookie_val = self.cookies.get(name)
+            self._verified[name] = (cookie_val and
+                                    appfunctions.check_secure_val(cookie_val)
+                                    or None)
+        return self._verified[name]
+
+    @property
+    def user_id(self):
+        """Return the logged in user's id (a string), or None."""
+        return self._read("user_id")
+
+    @property
+    def username(self):
+        """Return the logged in user's name, or None."""
+        return self._read("user")
+
+    @property
+    def is_admin(self):
+        """Return True if the visitor is an administrator of the app.
+
+        On App Engine that's a Google account signed in as an admin of the
+        project, whatever app.yaml requires of the URL; off it (on the
+        SQLite backend), every visitor if LOCAL_ADMIN is set, else nobody.
+
+        """
+        if storage.BACKEND == "sqlite":
+            return LOCAL_ADMIN
+        from google.appengine.api import users
+        return users.is_current_user_admin()
@@ -0,0 +1,32 @@
+"""Background tasks, or a synchronous stand-in when App Engine isn't there.
+
+Modules that run work in the background call defer() from here. On App
+Engine it queues the call with the deferred library (so the function and
+its arguments must be picklable, and it may run more than once). Without
+the SDK, such as on the SQLite backend, the call is simply made before
+defer() returns.
+
+Task options are passed as the deferred library's keyword arguments:
+_name, _countdown and _transactional. A named task is only queued once;
+defer() returns None if it has already been.
+
+"""
+try:
+    from google.appengine.api import taskqueue
+    from google.appengine.ext import deferred
+except ImportError:
+    deferred = None
+
+
+def defer(function, *args, **kwargs):
+    """Run function(*args, **kwargs) in the background."""
+    if deferred is None:
+        kwargs = dict((k, v) for k, v in kwargs.iteritems()
+                      if not k.startswith("_"))
+        function(*args, **kwargs)
+        return None
+    try:
+        return deferred.defer(function, *args, **kwargs)
+    except (taskqueue.TaskAlreadyExistsError,
+            taskqueue.TombstonedTaskError):
+        return None
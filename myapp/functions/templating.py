@@ -0,0 +1,57 @@
+"""The Jinja2 environment all pages are rendered with.
+
+In production, templates are loaded from modules precompiled by
+tools/compile_templates.py, so a new instance doesn't lex, parse and
+compile every template on first use. On the development server, or when
+the precompiled modules haven't been built, templates are loaded from
+myapp/templates and reloaded whenever they change. Likewise, pages link to
+the bundled style sheets built by tools/build_assets.py in production, and
+to their sources in development (see assets.py).
+
+"""
+import os
+import urllib
+
+import jinja2
+
+from myapp.functions import assets, rendering
+
+
+APP_DIR = os.path.dirname(os.path.dirname(__file__))
+TEMPLATE_DIR = os.path.join(APP_DIR, "templates")
+COMPILED_DIR = os.path.join(APP_DIR, "templates_compiled")
+
+# App Engine sets SERVER_SOFTWARE to "Google App Engine/..." in production,
+# and to "Development/..." on the development server.
+DEVELOPMENT = not os.environ.get("SERVER_SOFTWARE",
+                                 "").startswith("Google App Engine")
+
+
+def _urlencode(value):
+    """Quote a string for use in a URL's query string."""
+    return urllib.quote_plus(unicode(value).encode("utf-8"))
+
+
+def environment(loader, auto_reload=True):
+    """Return a Jinja2 environment with the settings every page needs."""
+    env = jinja2.Environment(loader=loader, autoescape=True,
+                             auto_reload=auto_reload)
+    env.globals["asset_urls"] = (assets.source_urls if DEVELOPMENT
+                                 else assets.asset_urls)
+    # Jinja2 2.6, the version on App Engine, has no urlencode filter.
+    env.filters["urlencode"] = _urlencode
+    # For posts and comments stored before their HTML was (see
+    # rendering.py).
+    env.filters["body_html"] = rendering.body_html
+    env.filters["excerpt"] = rendering.excerpt
+    return env
+
+
+def default_loader():
+    """Return the precompiled module loader if it can be used."""
+    if not DEVELOPMENT and os.path.isdir(COMPILED_DIR):
+        return jinja2.ModuleLoader(COMPILED_DIR)
+    return jinja2.FileSystemLoader(TEMPLATE_DIR)
+
+
+jinja_env = environment(default_loader(), auto_reload=DEVELOPMENT)
@@ -0,0 +1,76 @@
+"""Write changes through to cached first pages of newest-first lists.
+
+The front page and the author pages are read with global queries, which
+are only eventually consistent: one run just after a post or comment is
+written may not return it yet. So writes never leave those pages to be
+read again. update() applies the written entity to the cached page with
+compare-and-set (reading the page first if it isn't cached), and
+replace() is the change for one entity.
+
+A page can grow past its usual length as entities are added to it. Its
+next cursor still follows the oldest entity on it, so nothing is skipped
+between it and the next page. Once it grows past MAX_ENTRIES, its writer
+reads it again and catch_up() keeps only the written entities the read
+doesn't show yet, so a busy author's page doesn't keep growing (and
+getting slower to store) for as long as it stays cached.
+
+"""
+from myapp.functions.cache import memcache
+
+
+CAS_RETRIES = 3
+MAX_ENTRIES = 20  # twice the length of the pages the repositories read
+
+
+def update(key, change, load=None, time=0):
+    """Store change(page) in place of the page cached at key.
+
+    When nothing is cached, the page is read with load() and changed, or
+    left unread if load is None (the next read of it will see the write).
+    If other writers keep changing the page first, it is dropped instead.
+
+    """
+    client = memcache.Client()
+    for _ in range(CAS_RETRIES):
+        page = client.gets(key)
+        if page is None:
+            if load is None or memcache.add(key, change(load()), time=time):
+                return
+        elif client.cas(key, change(page), time=time):
+            return
+    memcache.delete(key)
+
+
+def replace(entries, entry_id, entry=None, last_page=False,
+            item=lambda entry: entry):
+    """Return entries, newest first, with the one whose id is entry_id
+    replaced by entry, or removed if entry is None.
+
+    item(entry) is the post or comment an entry shows. An entry that is
+    older than every entry on the page is only added to the last page; on
+    any other it belongs to a later page.
+
+    """
+    kept = [e for e in entries if int(item(e).id) != int(entry_id)]
+    if entry is not None and (
+            last_page or not entries or
+            item(entry).created >= item(entries[-1]).created):
+        kept.append(entry)
+        kept.sort(key=lambda e: item(e).created, reverse=True)
+    return kept
+
+
+def catch_up(entries, read, next_cursor, item=lambda entry: entry):
+    """Return the entries of a page that was just read (with next_cursor),
+    newest first, and those of the cached entries it doesn't show yet.
+
+    Cached entries older than every entry read belong to a later page,
+    unless the read is of the last page.
+
+    """
+    read_ids = set(int(item(e).id) for e in read)
+    missing = [e for e in entries if int(item(e).id) not in read_ids and (
+        next_cursor is None or not read or
+        item(e).created >= item(read[-1]).created)]
+    return sorted(read + missing, key=lambda e: item(e).created,
+                  reverse=True)
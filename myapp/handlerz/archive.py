@@ -0,0 +1,28 @@
+from datetime import datetime
+from handlerparent import Handler
+from myapp.storage import BadCursorError
+
+
+class Archive(Handler):
+
+    """Display the posts created in one month, 10 per page."""
+
+    def get(self, year, month):
+        """Render the page of the month's posts that starts at 'cursor'."""
+        year, month = int(year), int(month)
+        if not 1 <= month <= 12 or year < 1900:
+            return self.error(404)
+        since = datetime(year, month, 1)
+        if month == 12:
+            before = datetime(year + 1, 1, 1)
+        else:
+            before = datetime(year, month + 1, 1)
+        try:
+            posts, next_cursor = self.repo.recent_posts(
+                self.request.get("cursor"), since=since, before=before)
+        except BadCursorError:
+            return self.error(400)
+        self.render("blog.html", posts=posts, next_cursor=next_cursor,
+                    page_url="/blog/archive/%04d/%02d" % (year, month),
+                    heading=since.strftime("Posts from %B %Y"),
+                    uname=self.identify())
@@ -0,0 +1,43 @@
+from blog import page_state
+from handlerparent import Handler
+from myapp.functions import authors
+from myapp.storage import BadCursorError
+
+
+class Author(Handler):
+
+    """Display one user's posts and most recent comments, 10 per page."""
+
+    def get(self, creator):
+        """Render the user's posts from 'cursor' and comments from
+        'comment_cursor'.
+
+        The first page of both comes from the author page cache. Respond
+        404 if the user has neither posts nor comments.
+
+        """
+        cursor = self.request.get("cursor")
+        comment_cursor = self.request.get("comment_cursor")
+        if cursor or comment_cursor:
+            try:
+                posts, next_cursor = self.repo.author_posts(creator, cursor)
+                comments, next_comment_cursor = self.repo.author_comments(
+                    creator, comment_cursor)
+            except BadCursorError:
+                return self.error(400)
+            comments = authors.with_posts(self.repo, comments)
+            read = None
+        else:
+            (posts, next_cursor, comments, next_comment_cursor,
+             read) = authors.first_page(self.repo, creator)
+            if not posts and not comments:
+                return self.error(404)
+        if self.not_modified(read, next_comment_cursor,
+                             [(c.id, c.last_modified) for c, _ in comments],
+                             *page_state(posts, next_cursor)):
+            return
+        name = posts[0].name if posts else comments and comments[0][0].name
+        self.render("author.html", posts=posts, next_cursor=next_cursor,
+                    comments=comments, next_comment_cursor=next_comment_cursor,
+                    creator=creator, name=name, cursor=cursor,
+                    comment_cursor=comment_cursor, uname=self.identify())
@@ -1,23 +1,52 @@
 from handlerparent import Handler
-from myapp.modelz import Post
+from myapp.functions import frontpage
+from myapp.storage import BadCursorError
+
+
+def page_state(posts, next_cursor):
+    """Return what changes a page of posts, for its ETag."""
+    return next_cursor, [(p.id, p.last_modified, p.like_count,
+                          p.comment_count) for p in posts]
 
 
 class Blog(Handler):
 
-    """Display 10 most recent posts from Post entity on main blog page."""
+    """Display the most recent posts, 10 per page, on main blog page."""
 
     def render_fpage(self):
         """Display the main blog page.
 
-        Query the Post entity for the 10 most recent blog posts and display
-        them in descending order of their creation date / time, along with
-        their author and when they were first posted.
+        Display the 10 most recent blog posts in descending order of their
+        creation date / time, along with their author and when they were
+        first posted. The posts, and for visitors who aren't logged in the
+        whole page, come from the front page cache. Nothing is rendered if
+        the client's copy of the page is current.
 
         """
-        posts = Post.all().order("-created").fetch(limit=10)
+        posts, next_cursor, updated = frontpage.recent_posts(self.repo)
+        if self.not_modified(updated, *page_state(posts, next_cursor)):
+            return
         uname = self.identify()
-        self.render("blog.html", posts=posts, uname=uname)
+        if uname:
+            self.render("blog.html", posts=posts, next_cursor=next_cursor,
+                        page_url="/blog", uname=uname)
+        else:
+            self.write(frontpage.anonymous_page(
+                posts, next_cursor, updated,
+                lambda posts, next_cursor: self.render_str(
+                    "blog.html", posts=posts, next_cursor=next_cursor,
+                    page_url="/blog")))
 
     def get(self):
-        """Call function that renders the main blog page."""
-        self.render_fpage()
+        """Render the main blog page, or the older posts at 'cursor'."""
+        cursor = self.request.get("cursor")
+        if not cursor:
+            return self.render_fpage()
+        try:
+            posts, next_cursor = self.repo.recent_posts(cursor)
+        except BadCursorError:
+            return self.error(400)
+        if self.not_modified(None, *page_state(posts, next_cursor)):
+            return
+        self.render("blog.html", posts=posts, next_cursor=next_cursor,
+                    page_url="/blog", uname=self.identify())
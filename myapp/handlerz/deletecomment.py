@@ -1,6 +1,5 @@
 from handlerparent import Handler
-from google.appengine.ext import db
-from time import sleep
+from myapp.functions import authors, frontpage
 from myapp.functions.decorators import (user_logged_in, comment_exists,
                                         user_owns_comment)
 
@@ -12,11 +11,15 @@ class DeleteComment(Handler):
     @user_logged_in
     @comment_exists
     @user_owns_comment
-    def get(self, comm_id):
+    def get(self, post_id, comm_id, comment):
         """Delete comment if it exists, and logged in user was its creator."""
-        key = db.Key.from_path("Comment", int(comm_id))
-        comment = db.get(key)
-        post = comment.post_id
-        db.delete(key)
-        sleep(.2)
-        self.redirect("/blog/%s" % str(post))
+        if not self.repo.delete_comment(comment):
+            # Its post was deleted, and the comment will be too.
+            return self.error(404)
+        authors.remove_comment(comment, self.repo)
+        # The post's comment count changed.
+        post = self.repo.get_post(post_id)
+        if post:
+            frontpage.refresh_post(post_id, self.repo)
+            authors.refresh_post(post, self.repo)
+        self.redirect("/blog/%s" % str(post_id))
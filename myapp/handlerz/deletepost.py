@@ -1,6 +1,5 @@
 from handlerparent import Handler
-from google.appengine.ext import db
-from time import sleep
+from myapp.functions import authors, feeds, frontpage
 from myapp.functions.decorators import (user_logged_in, post_exists,
                                         user_owns_post)
 
@@ -12,9 +11,10 @@ class DeletePost(Handler):
     @user_logged_in
     @post_exists
     @user_owns_post
-    def get(self, post_id):
+    def get(self, post_id, post):
         """Delete post if it exists, and logged in user was its creator."""
-        key = db.Key.from_path("Post", int(post_id))
-        db.delete(key)
-        sleep(.2)
+        self.repo.delete_post(post)
+        frontpage.remove_post(post.id, self.repo)
+        feeds.remove_post(post, self.repo)
+        authors.remove_post(post, self.repo)
         self.redirect("/blog")
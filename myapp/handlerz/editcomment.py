@@ -1,7 +1,5 @@
 from handlerparent import Handler
-from google.appengine.ext import db
-from time import sleep
-from myapp.modelz import Comment
+from myapp.functions import authors
 from myapp.functions.decorators import (user_logged_in, comment_exists,
                                         user_owns_comment)
 
@@ -13,24 +11,21 @@ class EditComment(Handler):
     @user_logged_in
     @comment_exists
     @user_owns_comment
-    def get(self, post_id):
+    def get(self, post_id, comm_id, comment):
         """Render comment editing page."""
         uname = self.identify()
-        # Retrieve object key with entity name and attribute id number
-        key = db.Key.from_path("Comment", int(post_id))
-        comment = db.get(key)
         self.render("editcomment.html", comment=comment, uname=uname)
 
     @user_logged_in
     @comment_exists
     @user_owns_comment
-    def post(self, post_id):
+    def post(self, post_id, comm_id, comment):
         """Update stored comment value with user input."""
-        key = db.Key.from_path("Comment", int(post_id))
-        comment = db.get(key)
         update_c_text = self.request.get("comment_update")
         if update_c_text:
-            comment.content = update_c_text
-            comment.put()  # sends updated Post object "post" to GAE datastore
-            sleep(.2)
-        self.redirect("/blog/%s" % str(comment.post_id))
+            if not self.repo.update_comment(comment, update_c_text):
+                # Its post was deleted, and the comment will be too.
+                return self.error(404)
+            authors.record_comment(comment, self.repo.get_post(post_id),
+                                   self.repo)
+        self.redirect("/blog/%s" % str(post_id))
@@ -1,7 +1,5 @@
 from handlerparent import Handler
-from google.appengine.ext import db
-from time import sleep
-from myapp.modelz import Post
+from myapp.functions import authors, feeds, frontpage
 from myapp.functions.decorators import (user_logged_in, post_exists,
                                         user_owns_post)
 
@@ -13,18 +11,15 @@ class EditPost(Handler):
     @user_logged_in
     @post_exists
     @user_owns_post
-    def get(self, post_id):
+    def get(self, post_id, post):
         """Render page where a poster can edit post, post_id passed in URL."""
         uname = self.identify()
-        # Retrieve object key with entity name and attribute id number
-        key = db.Key.from_path("Post", int(post_id))
-        post = db.get(key)
         self.render("edit.html", post=post, uname=uname)
 
     @user_logged_in
     @post_exists
     @user_owns_post
-    def post(self, post_id):
+    def post(self, post_id, post):
         """Accept user input and save or cancel editing accordingly.
 
         Receive an update request from server when user pushes the submit
@@ -36,12 +31,10 @@ class EditPost(Handler):
         and redirect the user to the post's main display page.
 
         """
-        # Retrieve object key with entity name and attribute id number
-        key = db.Key.from_path("Post", int(post_id))
-        post = db.get(key)
         update_p_text = self.request.get("post_update")
         if update_p_text:
-            post.content = update_p_text
-            post.put()  # sends updated Post object "post" to GAE datastore
-            sleep(.2)
+            self.repo.update_post(post, update_p_text)
+            frontpage.record_post(post, self.repo)
+            feeds.record_post(post, self.repo)
+            authors.record_post(post, self.repo)
         self.redirect("/blog/%s" % str(post_id))
@@ -0,0 +1,42 @@
+from handlerparent import Handler
+from myapp.functions import feeds
+
+
+BLOG_TITLE = "Matt's Blog"
+
+
+class Feed(Handler):
+
+    """Serve the Atom or RSS feed of the most recent posts."""
+
+    def serve_feed(self, format, posts, read, title):
+        """Stream the feed of the posts, unless the client's copy is current.
+
+        The document is written as it's generated (see functions/feeds.py),
+        so it's never held in memory as a whole before being sent.
+
+        """
+        if self.not_modified(read, format):
+            return
+        self.response.headers["Content-Type"] = feeds.CONTENT_TYPES[format]
+        self.response.app_iter = feeds.stream(
+            format, posts, read, title, self.request.path_url,
+            self.request.host_url)
+
+    def get(self, format):
+        """Serve the feed of the whole blog, in 'atom' or 'rss' format."""
+        posts, read = feeds.recent_posts(self.repo)
+        self.serve_feed(format, posts, read, BLOG_TITLE)
+
+
+class AuthorFeed(Feed):
+
+    """Serve the Atom or RSS feed of one user's most recent posts."""
+
+    def get(self, creator, format):
+        """Serve the feed of the user's posts, or 404 if they have none."""
+        posts, read = feeds.recent_posts(self.repo, creator)
+        if not posts:
+            return self.error(404)
+        self.serve_feed(format, posts, read,
+                        "%s: posts by %s" % (BLOG_TITLE, posts[0].name))
@@ -1,28 +1,41 @@
-import webapp2
-import jinja2
+import hashlib
 import os
 
-from google.appengine.ext import db
-from myapp.functions import appfunctions
+import webapp2
+from webob.datetime_utils import UTC
+
+from myapp import storage
+from myapp.functions import appfunctions, instrumentation
+from myapp.functions.session import Session
+from myapp.functions.templating import jinja_env
 
 
-template_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates')
-jinja_env = jinja2.Environment(loader=jinja2.FileSystemLoader(template_dir),
-                               autoescape=True)
+# Seconds an edge cache may serve a page to visitors who aren't logged in.
+EDGE_CACHE_SECONDS = 60
+# Part of every ETag, so a new deployment (e.g. of changed templates)
+# doesn't leave clients with pages rendered by the old one.
+APP_VERSION = os.environ.get("CURRENT_VERSION_ID", "")
 
 
 class Handler(webapp2.RequestHandler):
 
     """Handle user interaction. (Parent Handler of all other Handlers.)"""
 
+    def initialize(self, *a, **kw):
+        """Set up the request, and the repository it reads and writes."""
+        super(Handler, self).initialize(*a, **kw)
+        instrumentation.set_route(self.request.route.template)
+        self.repo = storage.repository()
+
     def write(self, *a, **kw):
         """Write text/elements to HTML page"""
         self.response.out.write(*a, **kw)
 
     def render_str(self, template, **params):
         """Create jinja template object with input parameters"""
-        t = jinja_env.get_template(template)
-        return t.render(params)
+        with instrumentation.timer("render"):
+            t = jinja_env.get_template(template)
+            return t.render(params)
 
     def render(self, template, **kw):
         """Display HTML page, pass parameters to template object"""
@@ -34,14 +47,52 @@ class Handler(webapp2.RequestHandler):
         self.response.headers.add_header("Set-Cookie",
                                          "%s=%s; Path=/" % (name, cookie_val))
 
-    def read_secure_cookie(self, name):
-        """Verify that inputed cookie is secure/ hasn't been modified."""
-        cookie_val = self.request.cookies.get(name)
-        return cookie_val and appfunctions.check_secure_val(cookie_val)
+    def not_modified(self, last_modified, *state):
+        """Set the page's cache validators, return True if it's unchanged.
+
+        Call this before rendering a page, with the time it last changed (or
+        None if that isn't known) and everything shown on it that can change
+        without changing that time. The ETag is a hash of both, and of the
+        viewer. If the client's copy is current the response is made a 304
+        Not Modified, and the caller should return without rendering. As in
+        RFC 7232, If-Modified-Since is only used when If-None-Match isn't
+        sent.
+
+        Pages are public for visitors who aren't logged in, so an edge cache
+        may serve them for EDGE_CACHE_SECONDS; logged in users' pages are
+        private and revalidated every time.
+
+        """
+        user_id = self.session.user_id
+        response = self.response
+        response.etag = hashlib.sha1(
+            repr((APP_VERSION, user_id, last_modified) + state)).hexdigest()
+        response.vary = ("Cookie",)
+        if user_id:
+            response.cache_control = "private, no-cache"
+        else:
+            response.cache_control = "public, max-age=%d" % EDGE_CACHE_SECONDS
+        if last_modified:
+            last_modified = last_modified.replace(microsecond=0, tzinfo=UTC)
+            response.last_modified = last_modified
+        if self.request.if_none_match:
+            unchanged = self.response.etag in self.request.if_none_match
+        else:
+            since = self.request.if_modified_since
+            unchanged = bool(last_modified and since and
+                             last_modified <= since)
+        if unchanged:
+            response.status = 304
+        return unchanged
+
+    @webapp2.cached_property
+    def session(self):
+        """Return the request's Session, which verifies the user's cookies."""
+        return Session(self.request.cookies)
 
     def login(self, user):
         """Create and set secure cookie 'user_id' upon login or signup"""
-        self.set_secure_cookie("user_id", str(user.key().id()))
+        self.set_secure_cookie("user_id", str(user.uid))
 
     def logout(self):
         """Reset 'user_id' cookie to = '' upon logout"""
@@ -61,8 +112,4 @@ class Handler(webapp2.RequestHandler):
         them to login or register.
 
         """
-        if self.read_secure_cookie("user"):
-            uname = self.read_secure_cookie("user").split("|")[0]
-        else:
-            uname = None
-        return uname
+        return self.session.username
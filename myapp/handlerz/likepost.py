@@ -1,7 +1,4 @@
 from handlerparent import Handler
-from google.appengine.ext import db
-from time import sleep
-from myapp.modelz import Likez
 from myapp.functions.decorators import user_logged_in, post_exists
 
 
@@ -11,27 +8,17 @@ class LikePost(Handler):
 
     @user_logged_in
     @post_exists
-    def get(self, post_id):
+    def get(self, post_id, post):
         """Add a like to the 'Likez' database associated with the post.
 
-        Verify that the user is logged in, that the post exists, that they
-        aren't the post creator, and that the user hasn't liked the post
-        previously before allowing the database to update to the new value.
+        Verify that the user is logged in, that the post exists, and that
+        they aren't the post creator before storing the 'Like'. The 'Like' is
+        keyed by post and user, so a user who has liked the post previously
+        can't "re-like" it.
 
         """
-        key = db.Key.from_path("Post", int(post_id))
-        post = db.get(key)
-        current_user = (self.request.cookies.get("user_id")).split("|")[0]
-        # Prevents users who've previously liked the post from "re-liking" it.
-        likez = db.GqlQuery("SELECT * FROM Likez ORDER BY created DESC")
-        for li in likez:
-            if (li.post_id == post_id and li.creator == current_user and
-                            li.does_like):
-                self.redirect("/blog/%s" % str(post_id))
-        if self.read_secure_cookie("user_id") != post.creator:
-            current_name = (self.request.cookies.get("user")).split("|")[0]
-            l = Likez(creator=current_user, name=current_name,
-                      post_id=post_id, does_like=True)
-            l.put()  # sends Likez object "l" to the GAE datastore
-            sleep(.2)
+        current_user = self.session.user_id
+        if current_user != post.creator:
+            current_name = self.session.username
+            self.repo.like(post_id, current_user, current_name)
         self.redirect("/blog/%s" % str(post_id))
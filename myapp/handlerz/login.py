@@ -1,5 +1,4 @@
 from handlerparent import Handler
-from myapp.modelz import Credential
 from myapp.functions import appfunctions
 
 
@@ -15,30 +14,25 @@ class Login(Handler):
     def post(self):
         """Accept login credentials, conditionally log user in.
 
-        Check user input to against the Credential entity, and log them in if
-        the user is found. The hash of the entered password is compared with
-        the stored hash to determine validity. Upon successful login set
-        secure cookies 'user' and 'user_id'. If login is unsuccessful display
-        error message.
+        Look up the Credential stored under the entered username, and log
+        the user in if it is found. The hash of the entered password is
+        compared with the stored hash to determine validity. Upon successful
+        login set secure cookies 'user' and 'user_id'. If login is
+        unsuccessful display error message.
 
         """
         uname = self.identify()
         username = self.request.get("username")
         password = self.request.get("password")
-        proceed = False
-        # Query the Google App Engine (GAE) datastore, Credential entity
-        self.query = Credential.all()
-        for self.credential in self.query:
-            if (self.credential.username == username and
-                            appfunctions.valid_pw(username,
-                            password, self.credential.hashed_password)):
-                self.response.headers.add_header("Set-Cookie",
-                           ("user=%s; Path=/" %
-                           str(appfunctions.make_secure_val(username))))
-                u = self.credential
-                self.login(u)  # set secure "user_id" cookie
-                proceed = True
-                self.redirect("/blog")
-        if not proceed:
+        # Credentials are keyed by username, so this is a single lookup.
+        credential = self.repo.credential_by_name(username)
+        if credential and appfunctions.valid_pw(username, password,
+                                                credential.hashed_password):
+            self.response.headers.add_header("Set-Cookie",
+                       ("user=%s; Path=/" %
+                       str(appfunctions.make_secure_val(username))))
+            self.login(credential)  # set secure "user_id" cookie
+            self.redirect("/blog")
+        else:
             self.render("login.html", error_login="Login Invalid",
                         uname=uname)
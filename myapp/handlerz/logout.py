@@ -7,7 +7,6 @@ class LogOut(Handler):
 
     def get(self):
         """Log user out by setting cookie values to ''."""
-        usn = self.request.cookies.get("user")
         self.response.headers.add_header("Set-Cookie",
                                          "user=%s; Path=/" % (""))
         self.logout()  # Reset the "user_id" cookie to ""
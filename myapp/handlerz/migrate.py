@@ -0,0 +1,15 @@
+from handlerparent import Handler
+from myapp.functions.decorators import admin_only
+
+
+class Migrate(Handler):
+
+    """Start a data migration job. (Admin only, see app.yaml)."""
+
+    @admin_only
+    def get(self, name):
+        """Queue the first batch of the named migration job."""
+        if self.repo.start_migration(name):
+            self.write("Migration '%s' started." % name)
+        else:
+            self.error(404)
@@ -1,7 +1,5 @@
 from handlerparent import Handler
-from google.appengine.ext import db
-from time import sleep
-from myapp.modelz import Post
+from myapp.functions import authors, feeds, frontpage
 from myapp.functions.decorators import user_logged_in
 
 
@@ -35,13 +33,13 @@ class NewPost(Handler):
         subject = self.request.get("subject")
         content = self.request.get("content")
         if subject and content:
-            name = (self.request.cookies.get("user")).split("|")[0]
-            creator = (self.request.cookies.get("user_id")).split("|")[0]
-            p = Post(subject=subject, content=content, creator=creator,
-                     name=name)
-            p.put()  # sends Post object "p" to the GAE datastore
-            sleep(.2)
-            self.redirect("/blog/%s" % str(p.key().id()))
+            name = self.session.username
+            creator = self.session.user_id
+            p = self.repo.create_post(subject, content, creator, name)
+            frontpage.record_post(p, self.repo)
+            feeds.record_post(p, self.repo)
+            authors.record_post(p, self.repo)
+            self.redirect("/blog/%s" % str(p.id))
         else:
             error = ("You need to enter both a Subject and Content to create "
                      "a new post.")
@@ -0,0 +1,21 @@
+from handlerparent import Handler
+from myapp.storage import BadCursorError
+from myapp.functions.decorators import post_exists
+
+
+class PostComments(Handler):
+
+    """Return the next page of a post's comments. ('Load more' button)."""
+
+    @post_exists
+    def get(self, post_id, post):
+        """Render the page of comments that starts at the 'cursor' param."""
+        current_user = self.session.user_id
+        try:
+            comments, next_cursor = self.repo.post_comments(
+                post_id, self.request.get("cursor"))
+        except BadCursorError:
+            return self.error(400)
+        self.render("comments.html", comments=comments,
+                    next_cursor=next_cursor, current_user=current_user,
+                    cur_post_id=post_id)
@@ -1,7 +1,5 @@
 from handlerparent import Handler
-from google.appengine.ext import db
-from time import sleep
-from myapp.modelz import Post, Comment, Likez
+from myapp.functions import authors, frontpage
 from myapp.functions.decorators import user_logged_in, post_exists
 
 
@@ -9,16 +7,18 @@ class PostPage(Handler):
 
     """Display individual posts with corresponding comments & 'Likes'."""
 
-    @post_exists
     def get(self, post_id):
         """Display individual blog posts and all related content.
 
         Display individual blog posts corresponding to the id in the url
         (will match the id in the Post entity), and corresponding 'Likes',
-        comments, and editing options based on user permissions. Retrieve
-        these objects by querying the Post, Likez, and Comment entities
-        respectively. Display only the objects that match the current post's
-        Post id.
+        comments, and editing options based on user permissions. The post,
+        its 'Like' count, the current user's own 'Like' and the first page
+        of its comments are fetched from the repository concurrently; the
+        rest of the comments are loaded a page at a time by the
+        PostComments handler. Nothing is rendered if the client's copy of
+        the page is current: writing a comment marks the post as modified,
+        and the 'Like' count and button are part of the page's ETag.
 
         If the visitor is not logged in they will only see the post, 'Likes'
         and comments, but not the editing options.
@@ -33,32 +33,23 @@ class PostPage(Handler):
         creators.
 
         """
-        # Retrieve object key with entity name and attribute id number
-        key = db.Key.from_path("Post", int(post_id))
-        post = db.get(key)
         uname = self.identify()
-        if self.read_secure_cookie("user_id"):
-            current_user = (self.request.cookies.get("user_id")).split("|")[0]
-        else:
-            current_user = None
-        likez = db.GqlQuery("SELECT * FROM Likez ORDER BY created DESC")
-        count = 0  # Count the number of likes for post from the database.
-        for likey in likez:
-            if likey.does_like and likey.post_id == post_id:
-                count = count + 1
-        display = "like"
-        for li in likez:
-            if (li.post_id == post_id and li.creator == current_user and
-                            li.does_like):
-                display = "unlike"
-        self.query = Comment.all().order("-created")
+        current_user = self.session.user_id
+        post, count, likes, (comments, next_cursor) = self.repo.post_page(
+            post_id, current_user)
+        if not post:
+            return self.error(404)
+        display = "unlike" if likes else "like"
+        if self.not_modified(post.last_modified, post.id, count, display):
+            return
         self.render("permalink.html", post=post, current_user=current_user,
-                    comments=self.query, cur_post_id=post_id, count=count,
-                    likez=likez, display=display, uname=uname)
+                    comments=comments, next_cursor=next_cursor,
+                    cur_post_id=post_id, count=count,
+                    display=display, uname=uname)
 
     @user_logged_in
     @post_exists
-    def post(self, post_id):
+    def post(self, post_id, post):
         """Allow user to comment and Like posts, and edit their contributions.
 
         Take user input and conditionally allow them to make contributions,
@@ -79,16 +70,18 @@ class PostPage(Handler):
         matches the post/comment creator id.
 
         """
-        # Retrieve object key with entity name and attribute id number
-        key = db.Key.from_path("Post", int(post_id))
-        post = db.get(key)
         comment = self.request.get("comment")
-        current_user = (self.request.cookies.get("user_id")).split("|")[0]
-        current_name = (self.request.cookies.get("user")).split("|")[0]
+        current_user = self.session.user_id
+        current_name = self.session.username
         if comment:
             # User submitted new comment, save it in the Comment entity
-            c = Comment(content=comment, name=current_name,
-                        creator=current_user, post_id=post_id)
-            c.put()  # sends Comment object "c" to the GAE datastore
-            sleep(.2)
+            added = self.repo.add_comment(post_id, comment, current_user,
+                                          current_name)
+            if not added:
+                # The post was deleted since it was read.
+                return self.error(404)
+            authors.record_comment(added, post, self.repo)
+            # The post's comment count changed.
+            frontpage.refresh_post(post_id, self.repo)
+            authors.refresh_post(post, self.repo)
         self.redirect("/blog/%s" % str(post_id))
@@ -0,0 +1,24 @@
+from handlerparent import Handler
+from myapp.functions import search
+from myapp.storage import BadCursorError
+
+
+class Search(Handler):
+
+    """Display the posts matching a search query, 10 per page."""
+
+    def get(self):
+        """Render the page of results for 'q' that starts at 'cursor'.
+
+        Posts are ranked by how many of the query's words they (or their
+        comments) contain, then by relevance (see functions/search.py).
+
+        """
+        query = self.request.get("q")
+        try:
+            posts, next_cursor = search.search(self.repo, query,
+                                               self.request.get("cursor"))
+        except BadCursorError:
+            return self.error(400)
+        self.render("search.html", posts=posts, next_cursor=next_cursor,
+                    query=query, uname=self.identify())
@@ -1,6 +1,4 @@
 from handlerparent import Handler
-from google.appengine.ext import db
-from myapp.modelz import Credential
 from myapp.functions import appfunctions
 
 
@@ -18,7 +16,8 @@ class Signup(Handler):
 
         Verify that all inputs meet the established criteria, if not render
         appropriate error message and ask for new input. Upon valid input
-        create a new object in the Credential entity for the registered user,
+        reserve the username by creating its Credential in a transaction
+        (so only one of several concurrent signups for a name can succeed),
         and set 2 cookies: 'user' and 'user_id'.
 
         """
@@ -33,6 +32,11 @@ class Signup(Handler):
         if not appfunctions.valid_username(username):
             params["error_username"] = "That's not a valid username."
             have_error = True
+        # Credentials are keyed by username, so one lookup finds a duplicate.
+        elif self.repo.credential_by_name(username):
+            params["error_username"] = ("That username already exists. "
+                                        "Choose another and try again.")
+            have_error = True
         if not appfunctions.valid_password(password):
             params["error_password"] = "That wasn't a valid password."
             have_error = True
@@ -43,19 +47,18 @@ class Signup(Handler):
             if not appfunctions.valid_email(email):
                 params["error_email"] = "That's not a valid email."
                 have_error = True
-        # GQL query the Google App Engine (GAE) datastore, Credential entity
-        credentials = db.GqlQuery("SELECT * FROM Credential")
-        for cr in credentials:
-            if cr.username == username:
+        if not have_error:
+            c = self.repo.reserve_credential(
+                username, email,
+                appfunctions.make_pw_hash(username, verify))
+            if not c:
+                # Another signup claimed the username since it was checked.
                 params["error_username"] = ("That username already exists. "
                                             "Choose another and try again.")
                 have_error = True
         if have_error:
             self.render("register.html", **params)
         else:
-            c = Credential(username=username, email=email,
-                           hashed_password=appfunctions.make_pw_hash(username, verify))
-            c.put()  # sends Credential object "c" to the GAE datastore
             self.response.headers.add_header("Set-Cookie", "user=%s; Path=/"
                                              % str(appfunctions.make_secure_val(username)))
             self.login(c)  # set secure cookie "user_id"
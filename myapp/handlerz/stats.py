@@ -0,0 +1,17 @@
+import json
+
+from handlerparent import Handler
+from myapp.functions import instrumentation
+from myapp.functions.decorators import admin_only
+
+
+class Stats(Handler):
+
+    """Show the request timings of this instance. (Admin only, see app.yaml)."""
+
+    @admin_only
+    def get(self):
+        """Write the summary of each route's recent requests as JSON."""
+        self.response.headers["Content-Type"] = "application/json"
+        self.write(json.dumps(instrumentation.snapshot(), indent=2,
+                              sort_keys=True))
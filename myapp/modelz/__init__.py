@@ -2,3 +2,6 @@ from post import Post
 from likez import Likez
 from comment import Comment
 from credential import Credential
+from likeshard import LikeShard
+from searchdocument import SearchDocument
+from searchposting import SearchPosting
@@ -3,12 +3,138 @@ from google.appengine.ext import db
 
 class Comment(db.Model):
 
-    """Store all attributes of comments (written on blog posts)."""
+    """Store all attributes of comments (written on blog posts).
+
+    Comments are stored as children of their Post, so the post's comments
+    can be read with an ancestor query, which (unlike a global query) always
+    sees writes that have already been committed. 'content_html' is
+    rendered from 'content' whenever it is written (see
+    myapp/functions/rendering.py).
+
+    """
 
     content = db.TextProperty(required=True)
+    content_html = db.TextProperty()
     created = db.DateTimeProperty(auto_now_add=True)
     last_modified = db.DateTimeProperty(auto_now=True)
     creator = db.StringProperty(required=True)
     name = db.StringProperty(required=False)
     post_id = db.StringProperty(required=True)
-    mod = db.BooleanProperty(required=False)
+    mod = db.BooleanProperty(required=False, default=False)
+
+    @property
+    def id(self):
+        """Return the numeric id of this entity's key."""
+        return self.key().id()
+
+    @staticmethod
+    def key_for(post_id, comment_id):
+        """Return the key of a comment on a post."""
+        return db.Key.from_path("Post", int(post_id), "Comment",
+                                int(comment_id))
+
+    @classmethod
+    def add(cls, post_id, **kw):
+        """Store a new comment on the post and count it, return the comment.
+
+        Return None, storing nothing, if the post has been deleted.
+
+        """
+        post_key = db.Key.from_path("Post", int(post_id))
+
+        def txn():
+            post = db.get(post_key)
+            if post is None:
+                return None
+            comment = cls(parent=post_key, post_id=post_id, **kw)
+            post.comment_count = (post.comment_count or 0) + 1
+            db.put([comment, post])
+            return comment
+        return db.run_in_transaction(txn)
+
+    @classmethod
+    def edit(cls, comment, content, content_html):
+        """Replace the comment's content, and mark its post as modified.
+
+        Return False, changing nothing, if the post has been deleted (its
+        comments are deleted after it, see cascade.py).
+
+        """
+        def txn():
+            post = db.get(comment.parent_key())
+            if post is None:
+                return False
+            comment.content = content
+            comment.content_html = content_html
+            db.put([comment, post])  # sets both last_modified times
+            return True
+        return db.run_in_transaction(txn)
+
+    @classmethod
+    def remove(cls, comment):
+        """Delete the comment and take it off its post's count.
+
+        Return False, leaving the comment to be deleted with the post, if
+        the post has been deleted.
+
+        """
+        def txn():
+            post = db.get(comment.parent_key())
+            if post is None:
+                return False
+            post.comment_count = max((post.comment_count or 0) - 1, 0)
+            db.delete(comment)
+            post.put()
+            return True
+        return db.run_in_transaction(txn)
+
+    @classmethod
+    def page_for_post(cls, post_id, cursor=None, limit=10):
+        """Return one page of a post's visible comments, newest first.
+
+        Return a (comments, next_cursor) pair; next_cursor is None when this
+        is the last page. Uses the composite ancestor index on mod and
+        created in index.yaml.
+
+        """
+        return cls.page_for_post_async(post_id, cursor, limit)()
+
+    @classmethod
+    def page_for_post_async(cls, post_id, cursor=None, limit=10):
+        """Start the query for one page of a post's visible comments.
+
+        Return a function that returns the page as page_for_post does,
+        waiting for the query to finish if it hasn't yet.
+
+        """
+        query = cls.all().ancestor(db.Key.from_path("Post", int(post_id)))
+        query.filter("mod =", False)
+        query.order("-created")
+        if cursor:
+            query.with_cursor(cursor)
+        # run() sends the query's first batch (all of it) right away.
+        results = query.run(limit=limit, batch_size=limit)
+
+        def page():
+            comments = list(results)
+            next_cursor = query.cursor() if len(comments) == limit else None
+            return comments, next_cursor
+        return page
+
+    @classmethod
+    def page_by_creator(cls, creator, cursor=None, limit=10):
+        """Return one page of a user's visible comments, newest first.
+
+        Return a (comments, next_cursor) pair, as page_for_post does. Uses
+        the composite index on creator and created in index.yaml. Hidden
+        ('mod') comments are dropped from the page after it's fetched, so
+        a page can have fewer than 'limit' comments.
+
+        """
+        query = cls.all().filter("creator =", creator)
+        query.order("-created")
+        if cursor:
+            query.with_cursor(cursor)
+        comments = query.fetch(limit)
+        next_cursor = query.cursor() if len(comments) == limit else None
+        return [c for c in comments if not c.mod], next_cursor
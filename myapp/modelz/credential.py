@@ -1,10 +1,81 @@
+import os
+
 from google.appengine.ext import db
 
 
+# Whether to also look up credentials that the 'credentials' migration
+# hasn't re-keyed yet. Set in app.yaml until the migration has run.
+LEGACY_LOOKUP = os.environ.get("BLOG_LEGACY_CREDENTIALS") == "1"
+
+
 class Credential(db.Model):
 
-    """Store all attributes of user login credentials in this entity."""
+    """Store all attributes of user login credentials in this entity.
+
+    Credentials are keyed by username (the entity's key_name), so a login
+    is a single datastore get instead of a scan of the whole entity. The
+    numeric 'user_id' is what gets stored in cookies and in the 'creator'
+    attribute of posts, comments and 'Likes'.
+
+    """
 
     username = db.StringProperty(required=True)
     email = db.StringProperty(required=False)
     hashed_password = db.TextProperty(required=True)
+    user_id = db.IntegerProperty(required=False)
+
+    @classmethod
+    def by_name(cls, username):
+        """Return the Credential stored under 'username', or None.
+
+        While LEGACY_LOOKUP is set, rows that haven't been re-keyed by the
+        'credentials' migration yet are found with an indexed query on
+        'username' instead.
+
+        """
+        if not username:
+            return None
+        credential = cls.get_by_key_name(username)
+        if credential is None and LEGACY_LOOKUP:
+            credential = cls.all().filter("username =", username).get()
+        return credential
+
+    @classmethod
+    def legacy_exists(cls, username):
+        """Return whether a row not yet re-keyed holds 'username'."""
+        query = cls.all(keys_only=True).filter("username =", username)
+        return any(not key.name() for key in query.fetch(2))
+
+    @classmethod
+    def reserve(cls, username, rekeying=False, **kw):
+        """Atomically claim 'username', return the new Credential or None.
+
+        The check and the put run in one transaction on the username's
+        entity group, so of several concurrent signups for the same name
+        exactly one succeeds. Returns None if the name is already taken,
+        including (while LEGACY_LOOKUP is set) by a row the 'credentials'
+        migration hasn't re-keyed yet, unless 'rekeying' says the call is
+        the migration re-keying that row.
+
+        """
+        if LEGACY_LOOKUP and not rekeying and cls.legacy_exists(username):
+            return None
+
+        def txn():
+            if cls.get_by_key_name(username):
+                return None
+            credential = cls(key_name=username, username=username, **kw)
+            credential.put()
+            return credential
+        return db.run_in_transaction(txn)
+
+    @property
+    def uid(self):
+        """Return the numeric id that identifies this user everywhere."""
+        return self.user_id or self.key().id()
+
+    @classmethod
+    def allocate_user_id(cls):
+        """Reserve a numeric user_id that no existing Credential uses."""
+        start, end = db.allocate_ids(db.Key.from_path(cls.kind(), 1), 1)
+        return start
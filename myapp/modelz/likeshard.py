@@ -0,0 +1,17 @@
+from google.appengine.ext import db
+
+
+class LikeShard(db.Model):
+
+    """Store one shard of a post's 'Like' count.
+
+    A post's count is split over several shards (see counters.py) so that
+    concurrent likes and unlikes land on different entity groups.
+    'changes' counts the likes and unlikes written to the shard, so the
+    count repair can tell that a shard changed even if its count didn't.
+
+    """
+
+    post_id = db.StringProperty(required=True)
+    count = db.IntegerProperty(required=True, default=0)
+    changes = db.IntegerProperty(required=True, default=0)
@@ -3,7 +3,16 @@ from google.appengine.ext import db
 
 class Likez(db.Model):
 
-    """Store all attributes of 'Likes' for blog posts."""
+    """Store all attributes of 'Likes' for blog posts.
+
+    Each 'Like' is keyed by its post and user (see key_name_for), so a user
+    can only ever have one 'Like' per post, and finding, adding or removing
+    it is a single keyed operation. Adding or removing one reads its post in
+    the same (cross-group) transaction, and does nothing if the post has
+    been deleted, so a 'Like' can't outlive the deletion of its post's
+    'Likes' (see cascade.py).
+
+    """
 
     does_like = db.BooleanProperty(required=True)
     created = db.DateTimeProperty(auto_now_add=True)
@@ -11,3 +20,74 @@ class Likez(db.Model):
     creator = db.StringProperty(required=True)
     name = db.StringProperty(required=False)
     post_id = db.StringProperty(required=True)
+
+    @staticmethod
+    def key_name_for(post_id, user_id):
+        """Return the key_name of a user's 'Like' of a post."""
+        return "%s:%s" % (post_id, user_id)
+
+    @classmethod
+    def by_post_and_user(cls, post_id, user_id):
+        """Return the user's 'Like' of the post, or None."""
+        return cls.get_by_key_name(cls.key_name_for(post_id, user_id))
+
+    @classmethod
+    def by_post_and_user_async(cls, post_id, user_id):
+        """Start getting the user's 'Like' of the post; return the RPC,
+        whose get_result() is the 'Like' or None."""
+        return db.get_async(db.Key.from_path(
+            cls.kind(), cls.key_name_for(post_id, user_id)))
+
+    @staticmethod
+    def _run(post_id, txn, on_change):
+        """Run txn if the post exists, and on_change() in the same
+        transaction if txn changed anything. on_change may write to one
+        other entity group. Return False if the post has been deleted."""
+        post_key = db.Key.from_path("Post", int(post_id))
+
+        def checked():
+            if db.get(post_key) is None:
+                return False
+            changed = txn()
+            if changed and on_change:
+                on_change()
+            return changed
+        return db.run_in_transaction_options(
+            db.create_transaction_options(xg=True), checked)
+
+    @classmethod
+    def add(cls, post_id, user_id, name, on_change=None, **kw):
+        """Store the user's 'Like' of the post, return False if it exists
+        or the post has been deleted.
+
+        on_change, if given, is called inside the transaction once the
+        'Like' is stored, so what it writes commits with the 'Like'.
+
+        """
+        key_name = cls.key_name_for(post_id, user_id)
+
+        def txn():
+            if cls.get_by_key_name(key_name):
+                return False
+            cls(key_name=key_name, creator=user_id, name=name,
+                post_id=post_id, does_like=True, **kw).put()
+            return True
+        return cls._run(post_id, txn, on_change)
+
+    @classmethod
+    def remove(cls, post_id, user_id, on_change=None):
+        """Delete the user's 'Like' of the post, return False if there's none
+        or the post has been deleted.
+
+        on_change is called inside the transaction, as it is by add().
+
+        """
+        key_name = cls.key_name_for(post_id, user_id)
+
+        def txn():
+            like = cls.get_by_key_name(key_name)
+            if not like:
+                return False
+            like.delete()
+            return True
+        return cls._run(post_id, txn, on_change)
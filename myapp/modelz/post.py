@@ -3,11 +3,64 @@ from google.appengine.ext import db
 
 class Post(db.Model):
 
-    """Store all attributes of blog posts in this entity."""
+    """Store all attributes of blog posts in this entity.
+
+    'comment_count' is updated in the same transaction as the comment it
+    counts (comments are in the post's entity group). 'like_count' is copied
+    from the post's sharded 'Like' counter by a background task shortly
+    after each like or unlike (see counters.sync_like_count), so likes don't
+    contend on the post.
+
+    'content_html' and 'excerpt' are rendered from 'content' whenever it
+    is written (see myapp/functions/rendering.py). 'edited' is the time the
+    post itself was created or last edited; unlike 'last_modified' it
+    doesn't move when the post is liked or commented on.
+
+    """
 
     subject = db.StringProperty(required=True)
     content = db.TextProperty(required=True)
+    content_html = db.TextProperty()
+    excerpt = db.TextProperty()
     created = db.DateTimeProperty(auto_now_add=True)
     last_modified = db.DateTimeProperty(auto_now=True)
+    edited = db.DateTimeProperty()
     creator = db.StringProperty(required=False)
     name = db.StringProperty(required=False)
+    like_count = db.IntegerProperty(default=0)
+    comment_count = db.IntegerProperty(default=0)
+
+    @property
+    def id(self):
+        """Return the numeric id of this entity's key."""
+        return self.key().id()
+
+    @classmethod
+    def page(cls, cursor=None, since=None, before=None, limit=10,
+             creator=None):
+        """Return one page of posts, newest first.
+
+        Return a (posts, next_cursor) pair; next_cursor is None when this is
+        the last page. 'since' and 'before' limit the page to posts created
+        in that range of datetimes. Every page costs the same, however far
+        back it is, as it continues from the cursor using the built-in index
+        on 'created'. Given a 'creator', only that user's posts are listed,
+        using the composite index on creator and created in index.yaml.
+
+        The query only supplies keys; getting the posts by key means a post
+        that was just edited or deleted is never shown stale.
+
+        """
+        query = cls.all(keys_only=True)
+        if creator:
+            query.filter("creator =", creator)
+        if since:
+            query.filter("created >=", since)
+        if before:
+            query.filter("created <", before)
+        query.order("-created")
+        if cursor:
+            query.with_cursor(cursor)
+        keys = query.fetch(limit)
+        next_cursor = query.cursor() if len(keys) == limit else None
+        return [post for post in db.get(keys) if post], next_cursor
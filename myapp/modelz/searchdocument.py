@@ -0,0 +1,14 @@
+from google.appengine.ext import db
+
+
+class SearchDocument(db.Model):
+
+    """Record which search postings a post has (see searchindex.py).
+
+    Keyed by the post's id. 'postings' holds the key_names of the post's
+    SearchPosting entities, so reindexing the post knows which to delete
+    without querying for them.
+
+    """
+
+    postings = db.StringListProperty(indexed=False)
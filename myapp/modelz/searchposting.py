@@ -0,0 +1,17 @@
+from google.appengine.ext import db
+
+
+class SearchPosting(db.Model):
+
+    """Record that a search term occurs in a post, with its weight.
+
+    Everything is in the key_name, "<term>|<post id>|<weight>", and there
+    are no properties: a term's posting list is read with a keys-only query
+    on the range of keys that start with "<term>|" (see searchindex.py).
+
+    """
+
+    @staticmethod
+    def key_name_for(term, post_id, weight):
+        """Return the key_name of a term's posting for a post."""
+        return "%s|%d|%d" % (term, int(post_id), weight)
@@ -0,0 +1,29 @@
+"""Where the blog's posts, comments, 'Likes' and credentials are stored.
+
+Handlers only talk to a Repository (see base.py), never to a database
+directly. Which backend the Repository uses is chosen by the BLOG_STORAGE
+environment variable:
+
+    datastore   the App Engine datastore (the default)
+    sqlite      a SQLite database at BLOG_SQLITE_PATH (default ':memory:'),
+                for running the app off App Engine
+
+Backend modules are only imported when first used, so running on SQLite
+never imports the App Engine SDK.
+
+"""
+import os
+
+from myapp.storage.base import BadCursorError, Repository
+
+
+BACKEND = os.environ.get("BLOG_STORAGE", "datastore")
+
+
+def repository():
+    """Return a new Repository, for one request, on the configured backend."""
+    if BACKEND == "sqlite":
+        from myapp.storage.sqlite import SqliteRepository
+        return SqliteRepository()
+    from myapp.storage.datastore import DatastoreRepository
+    return DatastoreRepository()
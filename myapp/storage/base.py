@@ -0,0 +1,198 @@
+"""The interface every storage backend implements."""
+
+
+class BadCursorError(ValueError):
+
+    """Raised when a page is requested with a cursor that isn't valid."""
+
+
+class Repository(object):
+
+    """Store and fetch the blog's data for the duration of one request.
+
+    Posts and comments fetched by id are remembered, so each is read from
+    the backend at most once per request (the decorators, which check a
+    post exists and who owns it, and the handler method share them).
+
+    Every entity returned has the attributes of its model in myapp/modelz,
+    plus an 'id'. Ids in arguments may be strings or integers. Methods
+    returning a page of results return a (results, next_cursor) pair, where
+    next_cursor is None on the last page and BadCursorError is raised for a
+    cursor the backend didn't hand out.
+
+    Writing a post or a comment also queues the post to be reindexed for
+    search (see myapp/functions/search.py). Posts and comments are stored
+    with their HTML, and posts with an excerpt, rendered from their content
+    as it is written (see myapp/functions/rendering.py).
+
+    """
+
+    def __init__(self):
+        self.entities = {}
+
+    def _remember(self, key, load):
+        """Return the entity cached under key, calling load() on a miss."""
+        if key not in self.entities:
+            self.entities[key] = load()
+        return self.entities[key]
+
+    def get_post(self, post_id):
+        """Return the post, or None."""
+        return self._remember(("Post", int(post_id)),
+                              lambda: self._get_post(post_id))
+
+    def get_posts(self, post_ids):
+        """Return the posts with the given ids, in order (None for any
+        that don't exist), reading the ones not yet fetched together."""
+        post_ids = [int(post_id) for post_id in post_ids]
+        missing = [post_id for post_id in post_ids
+                   if ("Post", post_id) not in self.entities]
+        if missing:
+            for post_id, post in zip(missing, self._get_posts(missing)):
+                self.entities[("Post", post_id)] = post
+        return [self.entities[("Post", post_id)] for post_id in post_ids]
+
+    def reload_post(self, post_id):
+        """Read the post again, in place of any copy already fetched, and
+        return it (or None)."""
+        self.entities.pop(("Post", int(post_id)), None)
+        return self.get_post(post_id)
+
+    def get_comment(self, post_id, comment_id):
+        """Return the comment on the post, or None."""
+        return self._remember(("Comment", int(post_id), int(comment_id)),
+                              lambda: self._get_comment(post_id, comment_id))
+
+    def _get_post(self, post_id):
+        raise NotImplementedError
+
+    def _get_posts(self, post_ids):
+        return [self._get_post(post_id) for post_id in post_ids]
+
+    def _get_comment(self, post_id, comment_id):
+        raise NotImplementedError
+
+    # Credentials
+
+    def credential_by_name(self, username):
+        """Return the credential of the user called username, or None."""
+        raise NotImplementedError
+
+    def reserve_credential(self, username, email, hashed_password):
+        """Atomically create the user's credential with a new user id.
+
+        Return None, without creating anything, if the username is taken.
+
+        """
+        raise NotImplementedError
+
+    # Posts
+
+    def recent_posts(self, cursor=None, since=None, before=None, limit=10):
+        """Return a page of posts, newest first, optionally created between
+        the datetimes since (inclusive) and before (exclusive)."""
+        raise NotImplementedError
+
+    def author_posts(self, creator, cursor=None, limit=10):
+        """Return a page of the posts of the user whose id is creator,
+        newest first."""
+        raise NotImplementedError
+
+    def create_post(self, subject, content, creator, name):
+        """Store and return a new post."""
+        raise NotImplementedError
+
+    def update_post(self, post, content):
+        """Replace the post's content, and set its 'edited' time."""
+        raise NotImplementedError
+
+    def delete_post(self, post):
+        """Delete the post, and queue the deletion of its comments and
+        'Likes' (see myapp/functions/tasks.py)."""
+        raise NotImplementedError
+
+    # Comments
+
+    def post_comments(self, post_id, cursor=None, limit=10):
+        """Return a page of the post's visible comments, newest first."""
+        raise NotImplementedError
+
+    def author_comments(self, creator, cursor=None, limit=10):
+        """Return a page of the visible comments of the user whose id is
+        creator, on any post, newest first."""
+        raise NotImplementedError
+
+    def add_comment(self, post_id, content, creator, name):
+        """Store and return a new comment on the post, counting it on the
+        post, or return None, storing nothing, if the post is gone.
+
+        Adding, updating and deleting a comment all update its post's
+        last_modified time, which the post's page uses as its own. A
+        deleted post's comments are deleted after it, so until they are,
+        updating or deleting one returns False and changes nothing.
+
+        """
+        raise NotImplementedError
+
+    def update_comment(self, comment, content):
+        """Replace the comment's content, and mark its post as modified;
+        return False if the post is gone."""
+        raise NotImplementedError
+
+    def delete_comment(self, comment):
+        """Delete the comment, taking it off its post's count; return False
+        if the post is gone."""
+        raise NotImplementedError
+
+    # 'Likes'
+
+    def like_count(self, post_id):
+        """Return the number of 'Likes' on the post."""
+        raise NotImplementedError
+
+    def user_likes(self, post_id, user_id):
+        """Return True if the user has liked the post."""
+        raise NotImplementedError
+
+    def like(self, post_id, user_id, name):
+        """Store the user's 'Like' of the post, return False if it exists
+        or the post has been deleted."""
+        raise NotImplementedError
+
+    def unlike(self, post_id, user_id):
+        """Delete the user's 'Like' of the post, return False if none (or,
+        on backends that count 'Likes' apart from the post, if the post has
+        been deleted)."""
+        raise NotImplementedError
+
+    # Pages
+
+    def post_page(self, post_id, user_id):
+        """Return what a post's page shows: the post (or None), its 'Like'
+        count, whether user_id (if given) likes it, and the first page of
+        its comments.
+
+        Backends fetch these concurrently where they can, so the page
+        waits for the slowest of them rather than for each in turn.
+
+        """
+        return (self.get_post(post_id), self.like_count(post_id),
+                bool(user_id) and self.user_likes(post_id, user_id),
+                self.post_comments(post_id))
+
+    # Search
+
+    def postings(self, term):
+        """Return the search term's posting list, as (post id, weight)
+        pairs, reading no other term's."""
+        raise NotImplementedError
+
+    def search_document_count(self):
+        """Return the number of posts in the search index."""
+        raise NotImplementedError
+
+    # Administration
+
+    def start_migration(self, name):
+        """Start the named data migration, return False if there's none."""
+        return False
@@ -0,0 +1,144 @@
+"""Repository backed by the App Engine datastore (the models in myapp/modelz)."""
+import functools
+from datetime import datetime
+
+from google.appengine.ext import db
+from myapp.functions import (cascade, counters, instrumentation, migrations,
+                             rendering, searchindex)
+from myapp.modelz import Comment, Credential, Likez, Post
+from myapp.storage.base import BadCursorError, Repository
+
+
+instrumentation.install_datastore_hooks()
+
+
+def _paged(query_page, *a, **kw):
+    """Call a model's paging method, translating a bad cursor's errors."""
+    try:
+        return query_page(*a, **kw)
+    except (db.BadRequestError, db.BadValueError):
+        raise BadCursorError(kw.get("cursor"))
+
+
+class DatastoreRepository(Repository):
+
+    """Store the blog's data in the App Engine datastore."""
+
+    def _get_post(self, post_id):
+        return Post.get_by_id(int(post_id))
+
+    def _get_posts(self, post_ids):
+        return Post.get_by_id(post_ids)
+
+    def _get_comment(self, post_id, comment_id):
+        return db.get(Comment.key_for(post_id, comment_id))
+
+    def credential_by_name(self, username):
+        return Credential.by_name(username)
+
+    def reserve_credential(self, username, email, hashed_password):
+        return Credential.reserve(username, email=email,
+                                  hashed_password=hashed_password,
+                                  user_id=Credential.allocate_user_id())
+
+    def recent_posts(self, cursor=None, since=None, before=None, limit=10):
+        return _paged(Post.page, cursor=cursor, since=since, before=before,
+                      limit=limit)
+
+    def author_posts(self, creator, cursor=None, limit=10):
+        return _paged(Post.page, cursor=cursor, creator=str(creator),
+                      limit=limit)
+
+    def create_post(self, subject, content, creator, name):
+        post = Post(subject=subject, content=content,
+                    content_html=rendering.body_html(content),
+                    excerpt=rendering.excerpt(content),
+                    edited=datetime.utcnow(), creator=creator, name=name)
+        post.put()
+        searchindex.queue_index(post.id)
+        return post
+
+    def update_post(self, post, content):
+        post.content = content
+        post.content_html = rendering.body_html(content)
+        post.excerpt = rendering.excerpt(content)
+        post.edited = datetime.utcnow()
+        post.put()
+        searchindex.queue_index(post.id)
+
+    def delete_post(self, post):
+        cascade.delete_post(post)
+        searchindex.queue_index(post.id)
+
+    def post_comments(self, post_id, cursor=None, limit=10):
+        return _paged(Comment.page_for_post, post_id, cursor=cursor,
+                      limit=limit)
+
+    def author_comments(self, creator, cursor=None, limit=10):
+        return _paged(Comment.page_by_creator, str(creator), cursor=cursor,
+                      limit=limit)
+
+    def add_comment(self, post_id, content, creator, name):
+        comment = Comment.add(str(post_id), content=content,
+                              content_html=rendering.body_html(content),
+                              creator=creator, name=name)
+        if comment:
+            searchindex.queue_index(post_id)
+        return comment
+
+    def update_comment(self, comment, content):
+        if not Comment.edit(comment, content, rendering.body_html(content)):
+            return False
+        searchindex.queue_index(comment.post_id)
+        return True
+
+    def delete_comment(self, comment):
+        if not Comment.remove(comment):
+            return False
+        searchindex.queue_index(comment.post_id)
+        return True
+
+    def like_count(self, post_id):
+        return counters.like_count(str(post_id))
+
+    def user_likes(self, post_id, user_id):
+        return bool(Likez.by_post_and_user(post_id, user_id))
+
+    def like(self, post_id, user_id, name):
+        post_id = str(post_id)
+        if not Likez.add(post_id, user_id, name, on_change=functools.partial(
+                counters.change_shard, post_id, 1)):
+            return False
+        counters.likes_changed(post_id, 1)
+        return True
+
+    def unlike(self, post_id, user_id):
+        post_id = str(post_id)
+        if not Likez.remove(post_id, user_id, on_change=functools.partial(
+                counters.change_shard, post_id, -1)):
+            return False
+        counters.likes_changed(post_id, -1)
+        return True
+
+    def post_page(self, post_id, user_id):
+        # Start every RPC before waiting for any of them.
+        key = ("Post", int(post_id))
+        post_rpc = None
+        if key not in self.entities:
+            post_rpc = db.get_async(db.Key.from_path(*key))
+        likes_rpc = user_id and Likez.by_post_and_user_async(post_id, user_id)
+        comments = Comment.page_for_post_async(post_id)
+        # This checks memcache first, so it's started after the others.
+        like_count = counters.like_count_async(str(post_id))
+        post = self._remember(key, post_rpc and post_rpc.get_result)
+        return (post, like_count(),
+                bool(likes_rpc and likes_rpc.get_result()), comments())
+
+    def postings(self, term):
+        return searchindex.postings(term)
+
+    def search_document_count(self):
+        return searchindex.document_count()
+
+    def start_migration(self, name):
+        return migrations.start(name)
@@ -0,0 +1,733 @@
+"""Repository backed by SQLite, for running the blog off App Engine.
+
+The database at BLOG_SQLITE_PATH (default ':memory:') is created on first
+use. Every statement the repository runs on its tables is listed in
+QUERIES and is served by an index, except for the few in FULL_SCANS that
+deliberately read whole tables; tools/check_query_plans.py verifies that
+with EXPLAIN QUERY PLAN.
+Pages are keyset paginated: a cursor holds the 'created' time and id of the
+last row on its page, so every page costs the same however deep it is.
+
+The search index's postings are clustered by term (search_posting has no
+rowid), so a term's posting list is one contiguous range of its primary
+key. search_document holds each indexed post's terms and weights, so
+reindexing a post knows which postings to delete.
+
+"""
+import base64
+import contextlib
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from multiprocessing.pool import ThreadPool
+
+from myapp.functions import (authors, frontpage, instrumentation,
+                              rendering, search, tasks)
+from myapp.functions.instrumentation import timed
+from myapp.storage.base import BadCursorError, Repository
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS credential (
+    username TEXT PRIMARY KEY,
+    email TEXT,
+    hashed_password TEXT NOT NULL,
+    user_id INTEGER NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS post (
+    id INTEGER PRIMARY KEY,
+    subject TEXT NOT NULL,
+    content TEXT NOT NULL,
+    content_html TEXT,
+    excerpt TEXT,
+    created TIMESTAMP NOT NULL,
+    last_modified TIMESTAMP NOT NULL,
+    edited TIMESTAMP,
+    creator TEXT,
+    name TEXT,
+    like_count INTEGER NOT NULL DEFAULT 0,
+    comment_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS post_by_created ON post (created, id);
+CREATE INDEX IF NOT EXISTS post_by_creator ON post (creator, created, id);
+CREATE TABLE IF NOT EXISTS comment (
+    id INTEGER PRIMARY KEY,
+    post_id INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    content_html TEXT,
+    created TIMESTAMP NOT NULL,
+    last_modified TIMESTAMP NOT NULL,
+    creator TEXT NOT NULL,
+    name TEXT,
+    mod INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS comment_by_post
+    ON comment (post_id, mod, created, id);
+CREATE INDEX IF NOT EXISTS comment_by_creator
+    ON comment (creator, created, id);
+CREATE TABLE IF NOT EXISTS likez (
+    post_id INTEGER NOT NULL,
+    creator TEXT NOT NULL,
+    name TEXT,
+    created TIMESTAMP NOT NULL,
+    last_modified TIMESTAMP NOT NULL,
+    PRIMARY KEY (post_id, creator)
+);
+CREATE TABLE IF NOT EXISTS search_posting (
+    term TEXT NOT NULL,
+    post_id INTEGER NOT NULL,
+    weight INTEGER NOT NULL,
+    PRIMARY KEY (term, post_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS search_document (
+    post_id INTEGER PRIMARY KEY,
+    terms TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS search_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    documents INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO search_stats (id, documents) VALUES (0, 0);
+"""
+
+# Columns added to tables after they were first created: databases created
+# before then have them added when opened. Their rows have NULLs in them
+# until the 'render' job fills them in.
+ADDED_COLUMNS = [
+    ("post", "content_html", "TEXT"),
+    ("post", "excerpt", "TEXT"),
+    ("comment", "content_html", "TEXT"),
+    ("post", "edited", "TIMESTAMP"),
+]
+
+# Rows after a cursor's (created, created, id), newest first. The cursor's
+# row is always before the page's upper bound, so it replaces that bound.
+_AFTER_CURSOR = "created <= ? AND (created < ? OR id < ?) "
+
+QUERIES = {
+    "credential_by_name":
+        "SELECT * FROM credential WHERE username = ?",
+    # The next user id is one more than the largest yet.
+    "reserve_credential":
+        "INSERT OR IGNORE INTO credential "
+        "(username, email, hashed_password, user_id) "
+        "SELECT ?, ?, ?, COALESCE(MAX(user_id), 0) + 1 FROM credential",
+    "get_post":
+        "SELECT * FROM post WHERE id = ?",
+    "post_exists":
+        "SELECT 1 FROM post WHERE id = ?",
+    "insert_post":
+        "INSERT INTO post (subject, content, content_html, excerpt, "
+        "created, last_modified, edited, creator, name) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "update_post":
+        "UPDATE post SET content = ?, content_html = ?, excerpt = ?, "
+        "last_modified = ?, edited = ? WHERE id = ?",
+    "delete_post":
+        "DELETE FROM post WHERE id = ?",
+    "touch_post":
+        "UPDATE post SET last_modified = ? WHERE id = ?",
+    "count_comment":
+        "UPDATE post SET comment_count = comment_count + 1, "
+        "last_modified = ? WHERE id = ?",
+    "uncount_comment":
+        "UPDATE post SET comment_count = MAX(comment_count - 1, 0), "
+        "last_modified = ? WHERE id = ?",
+    "count_like":
+        "UPDATE post SET like_count = like_count + 1, last_modified = ? "
+        "WHERE id = ?",
+    "uncount_like":
+        "UPDATE post SET like_count = MAX(like_count - 1, 0), "
+        "last_modified = ? WHERE id = ?",
+    "render_post":
+        "UPDATE post SET content_html = ?, excerpt = ? WHERE id = ?",
+    "recent_posts":
+        "SELECT * FROM post WHERE created >= ? AND created < ? "
+        "ORDER BY created DESC, id DESC LIMIT ?",
+    "recent_posts_after":
+        "SELECT * FROM post WHERE created >= ? AND "
+        + _AFTER_CURSOR + "ORDER BY created DESC, id DESC LIMIT ?",
+    "author_posts":
+        "SELECT * FROM post WHERE creator = ? "
+        "ORDER BY created DESC, id DESC LIMIT ?",
+    "author_posts_after":
+        "SELECT * FROM post WHERE creator = ? AND "
+        + _AFTER_CURSOR + "ORDER BY created DESC, id DESC LIMIT ?",
+    "get_comment":
+        "SELECT * FROM comment WHERE id = ? AND post_id = ?",
+    "insert_comment":
+        "INSERT INTO comment (post_id, content, content_html, created, "
+        "last_modified, creator, name) VALUES (?, ?, ?, ?, ?, ?, ?)",
+    "update_comment":
+        "UPDATE comment SET content = ?, content_html = ?, "
+        "last_modified = ? WHERE id = ?",
+    "delete_comment":
+        "DELETE FROM comment WHERE id = ?",
+    "render_comment":
+        "UPDATE comment SET content_html = ? WHERE id = ?",
+    "post_comments":
+        "SELECT * FROM comment WHERE post_id = ? AND mod = 0 "
+        "ORDER BY created DESC, id DESC LIMIT ?",
+    "post_comments_after":
+        "SELECT * FROM comment WHERE post_id = ? AND mod = 0 AND "
+        + _AFTER_CURSOR + "ORDER BY created DESC, id DESC LIMIT ?",
+    "author_comments":
+        "SELECT * FROM comment WHERE creator = ? AND mod = 0 "
+        "ORDER BY created DESC, id DESC LIMIT ?",
+    "author_comments_after":
+        "SELECT * FROM comment WHERE creator = ? AND mod = 0 AND "
+        + _AFTER_CURSOR + "ORDER BY created DESC, id DESC LIMIT ?",
+    "like_count":
+        "SELECT like_count FROM post WHERE id = ?",
+    "user_likes":
+        "SELECT 1 FROM likez WHERE post_id = ? AND creator = ?",
+    "insert_like":
+        "INSERT OR IGNORE INTO likez (post_id, creator, name, created, "
+        "last_modified) VALUES (?, ?, ?, ?, ?)",
+    "delete_like":
+        "DELETE FROM likez WHERE post_id = ? AND creator = ?",
+    "post_comment_texts":
+        "SELECT content FROM comment WHERE post_id = ? AND mod = 0",
+    "postings":
+        "SELECT post_id, weight FROM search_posting WHERE term = ?",
+    "delete_posting":
+        "DELETE FROM search_posting WHERE term = ? AND post_id = ?",
+    "put_posting":
+        "INSERT OR REPLACE INTO search_posting (term, post_id, weight) "
+        "VALUES (?, ?, ?)",
+    "search_document":
+        "SELECT terms FROM search_document WHERE post_id = ?",
+    "put_search_document":
+        "INSERT OR REPLACE INTO search_document (post_id, terms) "
+        "VALUES (?, ?)",
+    "delete_search_document":
+        "DELETE FROM search_document WHERE post_id = ?",
+    "search_document_count":
+        "SELECT documents FROM search_stats WHERE id = 0",
+    "count_search_documents":
+        "UPDATE search_stats SET documents = documents + ? WHERE id = 0",
+    # Every post that is, or was, in the search index (the 'search' job).
+    "search_reindexed":
+        "SELECT id FROM post UNION SELECT post_id FROM search_document",
+    "post_contents":
+        "SELECT id, content FROM post WHERE id > ? ORDER BY id LIMIT ?",
+    "comment_contents":
+        "SELECT id, content FROM comment WHERE id > ? ORDER BY id LIMIT ?",
+    "delete_post_comments":
+        "DELETE FROM comment WHERE id IN "
+        "(SELECT id FROM comment WHERE post_id = ? LIMIT ?)",
+    "delete_post_likes":
+        "DELETE FROM likez WHERE rowid IN "
+        "(SELECT rowid FROM likez WHERE post_id = ? LIMIT ?)",
+    # Delete the rows of posts that no longer exist (the 'orphans' job).
+    "sweep_orphan_comments":
+        "DELETE FROM comment WHERE post_id NOT IN (SELECT id FROM post)",
+    "sweep_orphan_likes":
+        "DELETE FROM likez WHERE post_id NOT IN (SELECT id FROM post)",
+}
+
+# The statements in QUERIES that read whole tables on purpose: the batch jobs
+# that work through every row.
+FULL_SCANS = frozenset([
+    "search_reindexed",
+    "sweep_orphan_comments",
+    "sweep_orphan_likes",
+])
+
+# Rows deleted per transaction when a post's comments and 'Likes' are.
+BATCH_SIZE = 100
+
+# Far enough apart to cover every post when a page has no date range.
+EARLIEST = datetime(1, 1, 1)
+LATEST = datetime(9999, 12, 31)
+
+_CURSOR_RE = re.compile(r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d(?:\.\d+)?)\|(\d+)$")
+
+
+class Record(object):
+
+    """One row of a table, with its columns as attributes."""
+
+    def __init__(self, row):
+        self.__dict__.update(zip(row.keys(), row))
+
+
+class CredentialRecord(Record):
+
+    """A row of the credential table."""
+
+    @property
+    def uid(self):
+        """Return the numeric id that identifies this user everywhere."""
+        return self.user_id
+
+
+class PostRecord(Record):
+
+    """A row of the post table."""
+
+
+class CommentRecord(Record):
+
+    """A row of the comment table."""
+
+    def __init__(self, row):
+        super(CommentRecord, self).__init__(row)
+        self.post_id = str(self.post_id)
+        self.mod = bool(self.mod)
+
+
+class Database(object):
+
+    """Hand out connections to one SQLite database.
+
+    A file database gets a connection per thread. An in-memory database
+    only exists within its connection, so it has a single connection that
+    threads take turns to use.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self._local = threading.local()
+        self._shared = self._connect() if path == ":memory:" else None
+        with self.transaction() as conn:
+            conn.executescript(SCHEMA)
+            for table, column, type_ in ADDED_COLUMNS:
+                columns = [row["name"] for row in
+                           conn.execute("PRAGMA table_info(%s)" % table)]
+                if column not in columns:
+                    conn.execute("ALTER TABLE %s ADD COLUMN %s %s"
+                                 % (table, column, type_))
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30,
+                               detect_types=sqlite3.PARSE_DECLTYPES,
+                               check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def connection(self):
+        """Return the connection for the current thread."""
+        if self._shared:
+            return self._shared
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def query(self, sql, params=()):
+        """Return all rows of a SELECT statement."""
+        if self._shared:
+            with self.lock:
+                return self._shared.execute(sql, params).fetchall()
+        return self.connection().execute(sql, params).fetchall()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """Run the statements of a with block in one transaction.
+
+        Writers also take turns within this process, so a transaction's
+        reads can't be invalidated by another thread before it commits.
+
+        """
+        with self.lock:
+            conn = self.connection()
+            with conn:
+                yield conn
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def database():
+    """Return the Database at BLOG_SQLITE_PATH, creating it on first use."""
+    global _database
+    with _database_lock:
+        if _database is None:
+            _database = Database(os.environ.get("BLOG_SQLITE_PATH",
+                                                ":memory:"))
+    return _database
+
+
+# Threads that run a page's independent reads at the same time.
+FETCH_THREADS = 4
+
+_fetch_pool = None
+
+
+def fetch_pool():
+    """Return the thread pool for concurrent reads, creating it first."""
+    global _fetch_pool
+    with _database_lock:
+        if _fetch_pool is None:
+            _fetch_pool = ThreadPool(FETCH_THREADS)
+    return _fetch_pool
+
+
+def delete_post_children(post_id):
+    """Delete a deleted post's comments, then its 'Likes', in batches."""
+    db = database()
+    for query in ("delete_post_comments", "delete_post_likes"):
+        deleted = BATCH_SIZE
+        while deleted == BATCH_SIZE:
+            with db.transaction() as conn:
+                deleted = conn.execute(QUERIES[query],
+                                       (post_id, BATCH_SIZE)).rowcount
+
+
+def sweep_orphans():
+    """Delete the comments and 'Likes' of posts that no longer exist."""
+    with database().transaction() as conn:
+        for query in ("sweep_orphan_comments", "sweep_orphan_likes"):
+            conn.execute(QUERIES[query])
+
+
+def render_bodies():
+    """Store the rendered HTML of every post and comment, and each post's
+    excerpt, a batch of rows at a time (the 'render' job)."""
+    db = database()
+    for table, query in (("post", "post_contents"),
+                         ("comment", "comment_contents")):
+        after = 0
+        while True:
+            rows = db.query(QUERIES[query], (after, BATCH_SIZE))
+            if not rows:
+                break
+            with db.transaction() as conn:
+                if table == "post":
+                    conn.executemany(
+                        QUERIES["render_post"],
+                        [(rendering.body_html(row["content"]),
+                          rendering.excerpt(row["content"]), row["id"])
+                         for row in rows])
+                else:
+                    conn.executemany(
+                        QUERIES["render_comment"],
+                        [(rendering.body_html(row["content"]), row["id"])
+                         for row in rows])
+            after = rows[-1]["id"]
+
+
+def _format_terms(weights):
+    return " ".join("%s:%d" % item for item in sorted(weights.iteritems()))
+
+
+def _parse_terms(terms):
+    return dict((term, int(weight)) for term, weight in
+                (item.split(":") for item in terms.split()))
+
+
+def index_post(post_id):
+    """Bring the post's postings up to date with it and its comments.
+
+    A post that no longer exists has its postings deleted. Only the
+    postings whose weight changed are written.
+
+    """
+    post_id = int(post_id)
+    with database().transaction() as conn:
+        post = conn.execute(QUERIES["get_post"], (post_id,)).fetchone()
+        weights = {}
+        if post:
+            comments = conn.execute(QUERIES["post_comment_texts"], (post_id,))
+            weights = search.document(PostRecord(post),
+                                      [Record(row) for row in comments])
+        document = conn.execute(QUERIES["search_document"],
+                                (post_id,)).fetchone()
+        old = _parse_terms(document[0]) if document else {}
+        conn.executemany(
+            QUERIES["delete_posting"],
+            [(term, post_id) for term in old if term not in weights])
+        conn.executemany(
+            QUERIES["put_posting"],
+            [(term, post_id, weight) for term, weight in weights.iteritems()
+             if old.get(term) != weight])
+        if post:
+            conn.execute(QUERIES["put_search_document"],
+                         (post_id, _format_terms(weights)))
+        elif document:
+            conn.execute(QUERIES["delete_search_document"], (post_id,))
+        if bool(post) != bool(document):
+            conn.execute(QUERIES["count_search_documents"],
+                         (1 if post else -1,))
+
+
+def rebuild_search_index():
+    """Reindex every post, and drop the postings of deleted ones."""
+    for row in database().query(QUERIES["search_reindexed"]):
+        index_post(row[0])
+
+
+# Jobs that can be started by name with start_migration.
+JOBS = {
+    "orphans": sweep_orphans,
+    "render": render_bodies,
+    "search": rebuild_search_index,
+}
+
+
+def _encode_cursor(row):
+    return base64.urlsafe_b64encode("%s|%d" % (row.created, row.id))
+
+
+def _decode_cursor(cursor):
+    """Return the (created, id) a cursor points after."""
+    try:
+        match = _CURSOR_RE.match(base64.urlsafe_b64decode(str(cursor)))
+    except (TypeError, ValueError):
+        match = None
+    if not match:
+        raise BadCursorError(cursor)
+    return match.group(1), int(match.group(2))
+
+
+def _created(created):
+    """Return a datetime as it is stored, for comparing with 'created'."""
+    return str(created)
+
+
+class SqliteRepository(Repository):
+
+    """Store the blog's data in a SQLite database.
+
+    Each call of a method that reads or writes the database is counted by
+    the request instrumentation as one get, query, put or delete.
+
+    """
+
+    def __init__(self):
+        super(SqliteRepository, self).__init__()
+        self.db = database()
+
+    def _one(self, record, query, *params):
+        rows = self.db.query(QUERIES[query], params)
+        return record(rows[0]) if rows else None
+
+    def _page(self, record, query, params, limit):
+        """Run a paged query, return its records and the next cursor."""
+        records = [record(row)
+                   for row in self.db.query(QUERIES[query], params + [limit])]
+        next_cursor = None
+        if len(records) == limit:
+            next_cursor = _encode_cursor(records[-1])
+        return records, next_cursor
+
+    @timed("get")
+    def _get_post(self, post_id):
+        return self._one(PostRecord, "get_post", int(post_id))
+
+    @timed("get")
+    def _get_comment(self, post_id, comment_id):
+        return self._one(CommentRecord, "get_comment", int(comment_id),
+                         int(post_id))
+
+    @timed("get")
+    def credential_by_name(self, username):
+        return self._one(CredentialRecord, "credential_by_name", username)
+
+    @timed("put")
+    def reserve_credential(self, username, email, hashed_password):
+        with self.db.transaction() as conn:
+            inserted = conn.execute(QUERIES["reserve_credential"],
+                                    (username, email, hashed_password))
+        if inserted.rowcount:
+            return self.credential_by_name(username)
+
+    @timed("query")
+    def recent_posts(self, cursor=None, since=None, before=None, limit=10):
+        since = _created(since or EARLIEST)
+        if cursor:
+            created, last_id = _decode_cursor(cursor)
+            return self._page(PostRecord, "recent_posts_after",
+                              [since, created, created, last_id], limit)
+        return self._page(PostRecord, "recent_posts",
+                          [since, _created(before or LATEST)], limit)
+
+    @timed("query")
+    def author_posts(self, creator, cursor=None, limit=10):
+        if cursor:
+            created, last_id = _decode_cursor(cursor)
+            return self._page(PostRecord, "author_posts_after",
+                              [str(creator), created, created, last_id],
+                              limit)
+        return self._page(PostRecord, "author_posts", [str(creator)], limit)
+
+    @timed("put")
+    def create_post(self, subject, content, creator, name):
+        now = datetime.utcnow()
+        with self.db.transaction() as conn:
+            post_id = conn.execute(
+                QUERIES["insert_post"],
+                (subject, content, rendering.body_html(content),
+                 rendering.excerpt(content), now, now, now, creator,
+                 name)).lastrowid
+        tasks.defer(index_post, post_id)
+        return self.get_post(post_id)
+
+    @timed("put")
+    def update_post(self, post, content):
+        post.content = content
+        post.content_html = rendering.body_html(content)
+        post.excerpt = rendering.excerpt(content)
+        post.last_modified = post.edited = datetime.utcnow()
+        with self.db.transaction() as conn:
+            conn.execute(QUERIES["update_post"],
+                         (content, post.content_html, post.excerpt,
+                          post.last_modified, post.edited, post.id))
+        tasks.defer(index_post, post.id)
+
+    @timed("delete")
+    def delete_post(self, post):
+        with self.db.transaction() as conn:
+            conn.execute(QUERIES["delete_post"], (post.id,))
+        tasks.defer(delete_post_children, post.id)
+        tasks.defer(index_post, post.id)
+
+    @timed("query")
+    def post_comments(self, post_id, cursor=None, limit=10):
+        if cursor:
+            created, last_id = _decode_cursor(cursor)
+            return self._page(CommentRecord, "post_comments_after",
+                              [int(post_id), created, created, last_id],
+                              limit)
+        return self._page(CommentRecord, "post_comments", [int(post_id)],
+                          limit)
+
+    @timed("query")
+    def author_comments(self, creator, cursor=None, limit=10):
+        if cursor:
+            created, last_id = _decode_cursor(cursor)
+            return self._page(CommentRecord, "author_comments_after",
+                              [str(creator), created, created, last_id],
+                              limit)
+        return self._page(CommentRecord, "author_comments", [str(creator)],
+                          limit)
+
+    @timed("put")
+    def add_comment(self, post_id, content, creator, name):
+        now = datetime.utcnow()
+        with self.db.transaction() as conn:
+            counted = conn.execute(QUERIES["count_comment"],
+                                   (now, int(post_id)))
+            if not counted.rowcount:
+                return None
+            comment_id = conn.execute(
+                QUERIES["insert_comment"],
+                (int(post_id), content, rendering.body_html(content), now,
+                 now, creator, name)).lastrowid
+        tasks.defer(index_post, post_id)
+        return self.get_comment(post_id, comment_id)
+
+    @timed("put")
+    def update_comment(self, comment, content):
+        content_html = rendering.body_html(content)
+        now = datetime.utcnow()
+        with self.db.transaction() as conn:
+            touched = conn.execute(QUERIES["touch_post"],
+                                   (now, int(comment.post_id)))
+            if not touched.rowcount:
+                return False
+            conn.execute(QUERIES["update_comment"],
+                         (content, content_html, now, comment.id))
+        comment.content = content
+        comment.content_html = content_html
+        comment.last_modified = now
+        tasks.defer(index_post, comment.post_id)
+        return True
+
+    @timed("delete")
+    def delete_comment(self, comment):
+        with self.db.transaction() as conn:
+            if not conn.execute(QUERIES["post_exists"],
+                                (int(comment.post_id),)).fetchone():
+                return False
+            deleted = conn.execute(QUERIES["delete_comment"], (comment.id,))
+            if deleted.rowcount:
+                conn.execute(QUERIES["uncount_comment"],
+                             (datetime.utcnow(), int(comment.post_id)))
+        tasks.defer(index_post, comment.post_id)
+        return True
+
+    @timed("get")
+    def like_count(self, post_id):
+        rows = self.db.query(QUERIES["like_count"], (int(post_id),))
+        return rows[0][0] if rows else 0
+
+    @timed("get")
+    def user_likes(self, post_id, user_id):
+        return bool(self.db.query(QUERIES["user_likes"],
+                                  (int(post_id), user_id)))
+
+    def like(self, post_id, user_id, name):
+        if not self._like(post_id, user_id, name):
+            return False
+        self._likes_changed(post_id)
+        return True
+
+    def unlike(self, post_id, user_id):
+        if not self._unlike(post_id, user_id):
+            return False
+        self._likes_changed(post_id)
+        return True
+
+    def _likes_changed(self, post_id):
+        """Put the post's new 'Like' count on the cached pages showing it."""
+        post = self.get_post(post_id)
+        if post:
+            frontpage.refresh_post(post_id, self)
+            authors.refresh_post(post, self)
+
+    @timed("put")
+    def _like(self, post_id, user_id, name):
+        now = datetime.utcnow()
+        with self.db.transaction() as conn:
+            # A deleted post's 'Likes' may already have been deleted.
+            if not conn.execute(QUERIES["post_exists"],
+                                (int(post_id),)).fetchone():
+                return False
+            inserted = conn.execute(QUERIES["insert_like"],
+                                    (int(post_id), user_id, name, now, now))
+            if inserted.rowcount:
+                conn.execute(QUERIES["count_like"], (now, int(post_id)))
+        return bool(inserted.rowcount)
+
+    @timed("delete")
+    def _unlike(self, post_id, user_id):
+        with self.db.transaction() as conn:
+            deleted = conn.execute(QUERIES["delete_like"],
+                                   (int(post_id), user_id))
+            if deleted.rowcount:
+                conn.execute(QUERIES["uncount_like"],
+                             (datetime.utcnow(), int(post_id)))
+        return bool(deleted.rowcount)
+
+    def post_page(self, post_id, user_id):
+        # A file database gives each pool thread its own connection, so
+        # the reads run concurrently; an in-memory one takes turns.
+        reads = [lambda: self.get_post(post_id),
+                 lambda: self.like_count(post_id),
+                 lambda: bool(user_id) and self.user_likes(post_id, user_id),
+                 lambda: self.post_comments(post_id)]
+        return tuple(fetch_pool().map(
+            instrumentation.bind(lambda read: read()), reads))
+
+    @timed("query")
+    def postings(self, term):
+        return [tuple(row) for row in
+                self.db.query(QUERIES["postings"], (term,))]
+
+    @timed("get")
+    def search_document_count(self):
+        return self.db.query(QUERIES["search_document_count"])[0][0]
+
+    def start_migration(self, name):
+        job = JOBS.get(name)
+        if not job:
+            return False
+        tasks.defer(job)
+        return True
@@ -0,0 +1,117 @@
+"""A TestCase that sends requests through main.app on a fresh SQLite database.
+
+Imported by every test module before anything from the app, so the app
+stores its data in an in-memory SQLite database (see tools/seeding.py).
+
+When the App Engine SDK is on the path (its directory, which holds
+dev_appserver.py), the app uses the SDK's memcache and deferred library
+rather than their stand-ins (see cache.py and tasks.py), so each test runs
+against the SDK's testbed stubs; run_tasks() runs the tasks it queued. The
+datastore tests (DatastoreTestCase) are skipped without the SDK.
+
+"""
+import base64
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "tools"))
+
+try:
+    import dev_appserver
+except ImportError:
+    testbed = None
+else:
+    dev_appserver.fix_sys_path()
+    from google.appengine.ext import deferred, testbed
+
+import seeding
+
+seeding.use_sqlite()
+
+import webapp2
+
+import main
+
+
+class AppTestCase(unittest.TestCase):
+
+    """Give each test an empty database and cache, and a way to send
+    requests to the app as one of its seeded users."""
+
+    def setUp(self):
+        if testbed:
+            self.testbed = testbed.Testbed()
+            self.testbed.activate()
+            self.addCleanup(self.testbed.deactivate)
+            self.init_stubs()
+        self.repo = seeding.reset()
+
+    def init_stubs(self):
+        """Start the testbed stubs of the services the app calls."""
+        self.testbed.init_memcache_stub()
+        self.testbed.init_taskqueue_stub()
+
+    def run_tasks(self):
+        """Run the queued tasks, and those they queue, until none are left.
+
+        Tasks already run synchronously without the SDK.
+
+        """
+        if not testbed:
+            return
+        queue = self.testbed.get_stub(testbed.TASKQUEUE_SERVICE_NAME)
+        while True:
+            queued = queue.GetTasks("default")
+            if not queued:
+                return
+            queue.FlushQueue("default")
+            for task in queued:
+                deferred.run(base64.b64decode(task["body"]))
+
+    def send(self, path, post=None, user=None, headers=None):
+        """Send a request (a POST if 'post' is given), return the response
+        and the request's RequestStats (see instrumentation.py).
+
+        'user' is a (name, user id) pair to send the request as.
+
+        """
+        if post is None:
+            request = webapp2.Request.blank(path)
+        else:
+            request = webapp2.Request.blank(path, POST=post)
+        if user:
+            request.headers["Cookie"] = seeding.cookie(*user)
+        request.headers.update(headers or {})
+        response = request.get_response(main.app)
+        return response, request.environ["blog.request_stats"]
+
+    def request(self, path, post=None, user=None, headers=None):
+        """Send a request as send() does, return the response."""
+        return self.send(path, post, user, headers)[0]
+
+
+@unittest.skipIf(testbed is None, "needs the App Engine SDK on the path")
+class DatastoreTestCase(AppTestCase):
+
+    """Run the app on the datastore backend, in the testbed's datastore.
+
+    Its global queries see every write at once, so batch jobs work through
+    all that a test has written.
+
+    """
+
+    def setUp(self):
+        super(DatastoreTestCase, self).setUp()
+        from myapp import storage
+        self.addCleanup(setattr, storage, "BACKEND", storage.BACKEND)
+        storage.BACKEND = "datastore"
+        self.repo = storage.repository()
+
+    def init_stubs(self):
+        super(DatastoreTestCase, self).init_stubs()
+        from google.appengine.datastore.datastore_stub_util import (
+            PseudoRandomHRConsistencyPolicy)
+        self.testbed.init_datastore_v3_stub(
+            consistency_policy=PseudoRandomHRConsistencyPolicy(probability=1))
@@ -0,0 +1,67 @@
+"""The /admin pages check for an administrator themselves."""
+import unittest
+
+import apptest
+import seeding
+from myapp.functions import session
+
+
+class AdminTest(apptest.AppTestCase):
+
+    def setUp(self):
+        super(AdminTest, self).setUp()
+        self.user = seeding.seed_users(self.repo, 1)[0]
+
+    def local_admin(self):
+        """Let every visitor in, as tools/serve.py --admin does."""
+        self.addCleanup(setattr, session, "LOCAL_ADMIN", session.LOCAL_ADMIN)
+        session.LOCAL_ADMIN = True
+
+    def assertStatus(self, path, status, user=None):
+        self.assertEqual(self.request(path, user=user).status_int, status,
+                         path)
+
+    def test_migrate_refused(self):
+        for job in ["orphans", "render", "nonsense"]:
+            self.assertStatus("/admin/migrate/%s" % job, 403)
+            self.assertStatus("/admin/migrate/%s" % job, 403, self.user)
+
+    def test_migrate_with_local_admin(self):
+        self.local_admin()
+        self.assertStatus("/admin/migrate/orphans", 200)
+        self.assertStatus("/admin/migrate/nonsense", 404)
+
+    def test_stats(self):
+        self.assertStatus("/admin/stats", 403)
+        self.assertStatus("/admin/stats", 403, self.user)
+        self.local_admin()
+        response = self.request("/admin/stats")
+        self.assertEqual(response.status_int, 200)
+        self.assertEqual(response.content_type, "application/json")
+
+
+class AppEngineAdminTest(apptest.DatastoreTestCase):
+
+    def sign_in_as_admin(self):
+        self.testbed.setup_env(user_email="admin@example.com", user_id="1",
+                               user_is_admin="1", overwrite=True)
+
+    def test_migrate(self):
+        # LOCAL_ADMIN is only for running off App Engine.
+        self.addCleanup(setattr, session, "LOCAL_ADMIN", session.LOCAL_ADMIN)
+        session.LOCAL_ADMIN = True
+        self.assertEqual(self.request("/admin/migrate/orphans").status_int,
+                         403)
+        self.sign_in_as_admin()
+        response = self.request("/admin/migrate/orphans")
+        self.assertEqual(response.status_int, 200)
+        self.assertIn("started", response.body)
+
+    def test_stats(self):
+        self.assertEqual(self.request("/admin/stats").status_int, 403)
+        self.sign_in_as_admin()
+        self.assertEqual(self.request("/admin/stats").status_int, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""Deleting a post on the datastore deletes its comments and 'Likes' too."""
+import unittest
+
+import apptest
+import seeding
+
+
+class DeleteCascadeTest(apptest.DatastoreTestCase):
+
+    def setUp(self):
+        super(DeleteCascadeTest, self).setUp()
+        from myapp.functions import cascade
+        # Small batches, so the clean-up also resumes from a cursor.
+        self.addCleanup(setattr, cascade, "BATCH_SIZE", cascade.BATCH_SIZE)
+        cascade.BATCH_SIZE = 2
+        self.users = seeding.seed_users(self.repo, 3)
+        self.post, self.kept = [
+            self.repo.create_post("Post %d" % i, "Some words.",
+                                  self.users[0][1], self.users[0][0])
+            for i in range(2)]
+        for post in [self.post, self.kept]:
+            for name, uid in self.users:
+                self.repo.add_comment(post.id, "A comment.", uid, name)
+                self.repo.like(post.id, uid, name)
+        self.run_tasks()
+
+    def children(self, post):
+        """Return how many comments, 'Likes' and 'Like' shards the post has."""
+        from google.appengine.ext import db
+        from myapp.functions import counters
+        from myapp.modelz import Comment, Likez
+        return (Comment.all().ancestor(post.key()).count(),
+                Likez.all().filter("post_id =", str(post.id)).count(),
+                len(filter(None, db.get(counters._shard_keys(
+                    str(post.id))))))
+
+    def test_delete_post(self):
+        self.assertEqual(self.children(self.post)[:2], (3, 3))
+        self.assertGreater(self.children(self.post)[2], 0)
+        self.repo.delete_post(self.post)
+        # The post is gone at once; its clean-up is queued with it.
+        self.assertIsNone(self.repo.reload_post(self.post.id))
+        self.run_tasks()
+        self.assertEqual(self.children(self.post), (0, 0, 0))
+        self.assertEqual(self.repo.like_count(self.post.id), 0)
+        self.assertEqual(self.repo.postings("words"), [(self.kept.id, 2)])
+        # The other post keeps its own.
+        self.assertEqual(self.children(self.kept)[:2], (3, 3))
+        self.assertEqual(self.repo.like_count(self.kept.id), 3)
+
+    def test_delete_post_again(self):
+        # Running the clean-up twice (as a retried task would) is harmless.
+        from myapp.functions import cascade
+        self.repo.delete_post(self.post)
+        self.run_tasks()
+        cascade.delete_post_children(str(self.post.id))
+        self.run_tasks()
+        self.assertEqual(self.children(self.post), (0, 0, 0))
+        self.assertEqual(self.children(self.kept)[:2], (3, 3))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""The sharded 'Like' counters count likes and unlikes on the datastore."""
+import unittest
+
+import apptest
+import seeding
+
+
+class LikeCounterTest(apptest.DatastoreTestCase):
+
+    def setUp(self):
+        super(LikeCounterTest, self).setUp()
+        from myapp.functions import counters
+        self.counters = counters
+        self.users = seeding.seed_users(self.repo, 5)
+        self.post = self.repo.create_post("A post", "Some words.",
+                                          self.users[0][1], self.users[0][0])
+        self.post_id = str(self.post.id)
+
+    def assertCount(self, count):
+        from myapp.functions.cache import memcache
+        self.assertEqual(self.counters.like_count(self.post_id), count)
+        # The shards add up to it without the cached total, too.
+        memcache.flush_all()
+        self.assertEqual(self.counters.like_count(self.post_id), count)
+        self.assertEqual(self.counters._shard_total(self.post_id), count)
+
+    def test_increment_and_decrement(self):
+        self.assertCount(0)
+        for name, uid in self.users:
+            self.assertTrue(self.repo.like(self.post.id, uid, name))
+        self.assertCount(5)
+        self.assertFalse(self.repo.like(self.post.id, self.users[0][1],
+                                        self.users[0][0]))
+        for name, uid in self.users[:2]:
+            self.assertTrue(self.repo.unlike(self.post.id, uid))
+        self.assertFalse(self.repo.unlike(self.post.id, self.users[0][1]))
+        self.assertCount(3)
+
+    def test_cached_total_follows_changes(self):
+        name, uid = self.users[0]
+        self.assertEqual(self.counters.like_count(self.post_id), 0)
+        self.repo.like(self.post.id, uid, name)
+        self.assertEqual(self.counters.like_count(self.post_id), 1)
+        self.repo.unlike(self.post.id, uid)
+        self.assertEqual(self.counters.like_count(self.post_id), 0)
+
+    def test_total_read_during_a_change_isnt_cached(self):
+        # The like deletes the seed of a read started before it, so
+        # whatever total the read sums, it isn't cached.
+        from myapp.functions.cache import memcache
+        name, uid = self.users[0]
+
+        def incr(*args, **kwargs):
+            self.fail("incremented a read's seed")
+        # The like mustn't increment the seed, which isn't a number (the
+        # SDK's memcache logs an error for each that is).
+        for method in ["incr", "decr"]:
+            self.addCleanup(setattr, memcache, method,
+                            getattr(memcache, method))
+            setattr(memcache, method, incr)
+        count = self.counters.like_count_async(self.post_id)
+        self.repo.like(self.post.id, uid, name)
+        count()
+        self.assertIsNone(memcache.get(self.counters._cache_key(
+            self.post_id)))
+        self.assertEqual(self.counters.like_count(self.post_id), 1)
+
+    def test_like_and_its_shard_commit_together(self):
+        from myapp.modelz import LikeShard
+        name, uid = self.users[0]
+
+        def fail(*args, **kwargs):
+            raise RuntimeError("put failed")
+        LikeShard.put = fail
+        try:
+            self.assertRaises(RuntimeError, self.repo.like, self.post.id,
+                              uid, name)
+        finally:
+            del LikeShard.put  # back to db.Model.put
+        self.assertFalse(self.repo.user_likes(self.post.id, uid))
+        self.assertCount(0)
+
+    def test_sync_like_count(self):
+        for name, uid in self.users[:2]:
+            self.repo.like(self.post.id, uid, name)
+        self.request("/blog")  # cache the front page's posts
+        self.run_tasks()
+        self.assertEqual(self.repo.reload_post(self.post.id).like_count, 2)
+        self.assertIn("Likes: 2", self.request("/blog").body)
+
+
+if __name__ == "__main__":
+    unittest.main()
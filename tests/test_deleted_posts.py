@@ -0,0 +1,61 @@
+"""Writing a comment or 'Like' on a post that was just deleted is a 404,
+not a 500.
+
+A deleted post's comments and 'Likes' are deleted after it, in the
+background, so for a while they can still be edited and deleted; the
+writes find the post gone and change nothing. Nor can a 'Like' be added
+after its post's 'Likes' have been deleted.
+
+"""
+import unittest
+
+import apptest
+import seeding
+
+
+class DeletedPostTest(apptest.AppTestCase):
+
+    def setUp(self):
+        super(DeletedPostTest, self).setUp()
+        self.users = owner, commenter = seeding.seed_users(self.repo, 2)
+        self.post = self.repo.create_post("A post", "Some words.",
+                                          owner[1], owner[0])
+        self.comment = self.repo.add_comment(self.post.id, "A comment.",
+                                             commenter[1], commenter[0])
+        self.repo.delete_post(self.post)
+
+    def assertNotFound(self, path, post=None):
+        response = self.request(path, post, user=self.users[1])
+        self.assertEqual(response.status_int, 404, path)
+
+    def test_add_comment(self):
+        name, uid = self.users[1]
+        self.assertIsNone(self.repo.add_comment(self.post.id, "Late.", uid,
+                                                name))
+        self.assertNotFound("/blog/%s" % self.post.id, {"comment": "Late."})
+
+    def test_edit_comment(self):
+        self.assertFalse(self.repo.update_comment(self.comment, "Edited."))
+        self.assertNotFound("/blog/%s/editcomment/%s" % (
+            self.post.id, self.comment.id), {"comment_update": "Edited."})
+
+    def test_delete_comment(self):
+        self.assertFalse(self.repo.delete_comment(self.comment))
+        self.assertNotFound("/blog/%s/deletecomment/%s" % (
+            self.post.id, self.comment.id))
+
+    def test_like(self):
+        name, uid = self.users[1]
+        self.assertFalse(self.repo.like(self.post.id, uid, name))
+        self.assertFalse(self.repo.user_likes(self.post.id, uid))
+        self.assertEqual(self.repo.like_count(self.post.id), 0)
+        self.assertNotFound("/blog/like/%s" % self.post.id)
+
+
+class DatastoreDeletedPostTest(DeletedPostTest, apptest.DatastoreTestCase):
+
+    pass
+
+
+if __name__ == "__main__":
+    unittest.main()
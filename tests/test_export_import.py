@@ -0,0 +1,96 @@
+"""tools/export_import.py moves every row, in batches, and can resume."""
+import gzip
+import os
+import shutil
+import tempfile
+import unittest
+
+import apptest
+
+import export_import
+from myapp.storage import sqlite
+
+
+ENTITIES = 500
+BATCH = 40
+
+
+class Interrupted(Exception):
+    pass
+
+
+class ExportImportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="blog-export-test-")
+        self.addCleanup(shutil.rmtree, self.workdir)
+        self.export_dir = os.path.join(self.workdir, "export")
+        self.source = self.database("source")
+        export_import.seed(self.source, ENTITIES, BATCH)
+
+    def database(self, name):
+        return sqlite.Database(os.path.join(self.workdir,
+                                            name + ".sqlite3"))
+
+    def interrupt(self, name, after):
+        """Make export_import.<name> raise Interrupted on its call after
+        'after' calls, until the test ends."""
+        original = getattr(export_import, name)
+        self.addCleanup(setattr, export_import, name, original)
+        calls = []
+
+        def wrapper(*args, **kwargs):
+            calls.append(None)
+            if len(calls) > after:
+                raise Interrupted()
+            return original(*args, **kwargs)
+        setattr(export_import, name, wrapper)
+        return lambda: setattr(export_import, name, original)
+
+    def assertSameRows(self, target):
+        for kind, key in export_import.KINDS:
+            before = export_import.checksum(self.source, kind, key, BATCH)
+            self.assertTrue(before[0], kind)
+            self.assertEqual(export_import.checksum(target, kind, key, BATCH),
+                             before, kind)
+
+    def assertExportedOnce(self):
+        """Each kind's file holds each of its rows exactly once."""
+        for kind, key in export_import.KINDS:
+            with gzip.open(export_import._path(self.export_dir, kind)) as f:
+                lines = f.readlines()
+            self.assertEqual(len(lines), len(set(lines)), kind)
+            self.assertEqual(len(lines), export_import.checksum(
+                self.source, kind, key, BATCH)[0], kind)
+
+    def test_roundtrip(self):
+        self.assertTrue(export_import.roundtrip(ENTITIES, BATCH))
+
+    def test_export_and_import(self):
+        export_import.export(self.source, self.export_dir, BATCH)
+        self.assertExportedOnce()
+        target = self.database("target")
+        export_import.import_(target, self.export_dir, BATCH)
+        self.assertSameRows(target)
+
+    def test_resume_interrupted_export_and_import(self):
+        # Stop part way through writing the posts' third batch.
+        resume = self.interrupt("_line", 100)
+        self.assertRaises(Interrupted, export_import.export, self.source,
+                          self.export_dir, BATCH)
+        resume()
+        export_import.export(self.source, self.export_dir, BATCH,
+                             resume=True)
+        self.assertExportedOnce()
+        target = self.database("target")
+        # Stop at the posts' last batch.
+        resume = self.interrupt("_import_batch", 3)
+        self.assertRaises(Interrupted, export_import.import_, target,
+                          self.export_dir, BATCH)
+        resume()
+        export_import.import_(target, self.export_dir, BATCH, resume=True)
+        self.assertSameRows(target)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+"""The middleware times a streamed response until it has been sent."""
+import time
+import unittest
+
+import apptest
+
+
+class StreamedResponseTest(unittest.TestCase):
+
+    def setUp(self):
+        from myapp.functions import instrumentation
+        self.instrumentation = instrumentation
+
+    def app(self, environ, start_response):
+        """A WSGI app that does its work as its body is iterated."""
+        self.instrumentation.set_route("/streamed")
+        start_response("200 OK", [("Content-Type", "text/plain")])
+
+        def body():
+            for chunk in ["one", "two"]:
+                with self.instrumentation.timer("get"):
+                    time.sleep(0.01)
+                yield chunk
+        return body()
+
+    def test_stats_recorded_once_body_is_closed(self):
+        environ = {"REQUEST_METHOD": "GET", "PATH_INFO": "/streamed"}
+        body = self.instrumentation.Middleware(self.app)(
+            environ, lambda status, headers, exc_info=None: None)
+        stats = environ["blog.request_stats"]
+        self.assertEqual(stats.wall, 0.0)
+        self.assertEqual(list(body), ["one", "two"])
+        body.close()
+        self.assertEqual(stats.storage["get"][0], 2)
+        self.assertGreaterEqual(stats.wall, 0.02)
+        self.assertEqual(
+            self.instrumentation.snapshot()["/streamed"]["window"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
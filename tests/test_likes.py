@@ -0,0 +1,78 @@
+"""'Like' counts stay exact under many concurrent likes and unlikes."""
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+
+import apptest
+import seeding
+
+
+USERS = 20
+ROUNDS = 10
+
+
+class LikeLoadTest(apptest.AppTestCase):
+
+    def setUp(self):
+        super(LikeLoadTest, self).setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.repo = seeding.reset(os.path.join(directory, "blog.sqlite3"))
+        self.addCleanup(seeding.reset)
+        self.users = seeding.seed_users(self.repo, USERS + 1)
+        owner = self.users.pop()
+        self.post = self.repo.create_post("A post", "Some words.", owner[1],
+                                          owner[0])
+        self.request("/blog")  # cache the front page's posts
+
+    def run_users(self, paths):
+        """Have every user request paths(user index) in turn, all users at
+        once, each from its own thread."""
+        start = threading.Event()
+        failures = []
+
+        def run(i):
+            start.wait()
+            for path in paths(i):
+                status = self.request(path, user=self.users[i]).status_int
+                if status != 302:
+                    failures.append((path, status))
+        threads = [threading.Thread(target=run, args=(i,))
+                   for i in range(USERS)]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+
+    def assertLikes(self, count):
+        self.assertEqual(self.repo.like_count(self.post.id), count)
+        self.assertEqual(self.repo.reload_post(self.post.id).like_count,
+                         count)
+        for page in ["/blog", "/blog/%s" % self.post.id]:
+            shown = re.search(r"Likes: (\d+)", self.request(page).body)
+            self.assertEqual(int(shown.group(1)), count, page)
+
+    def test_repeated_likes_count_once(self):
+        like = "/blog/like/%s" % self.post.id
+        self.run_users(lambda i: [like] * ROUNDS)
+        self.assertLikes(USERS)
+
+    def test_likes_and_unlikes(self):
+        like = "/blog/like/%s" % self.post.id
+        unlike = "/blog/unlike/%s" % self.post.id
+        # Every user toggles at random, and the odd-numbered ones finish
+        # with a like.
+        ends = dict((i, [unlike, like][i % 2]) for i in range(USERS))
+        self.run_users(lambda i: [random.choice([like, unlike])
+                                  for _ in range(ROUNDS)] + [ends[i]])
+        self.assertLikes(USERS // 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
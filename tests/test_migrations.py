@@ -0,0 +1,192 @@
+"""Each migration job works through its batches on the datastore."""
+import unittest
+
+import apptest
+import seeding
+
+
+class MigrationJobsTest(apptest.DatastoreTestCase):
+
+    def setUp(self):
+        super(MigrationJobsTest, self).setUp()
+        from myapp.functions import cascade, migrations, searchindex
+        # Small batches, so each job also resumes from a cursor.
+        for module in [cascade, migrations, searchindex]:
+            self.addCleanup(setattr, module, "BATCH_SIZE", module.BATCH_SIZE)
+            module.BATCH_SIZE = 2
+        self.users = seeding.seed_users(self.repo, 2)
+        self.posts = [self.repo.create_post("Post %d" % i, "Some words.",
+                                            self.users[0][1],
+                                            self.users[0][0])
+                      for i in range(3)]
+        self.post_id = str(self.posts[0].id)
+        self.run_tasks()
+
+    def run_job(self, name):
+        self.assertTrue(self.repo.start_migration(name))
+        self.run_tasks()
+
+    def assertCounts(self, likes, comments):
+        post = self.repo.reload_post(self.post_id)
+        self.assertEqual((post.like_count, post.comment_count),
+                         (likes, comments))
+        self.assertEqual(self.repo.like_count(self.post_id), likes)
+
+    def test_comments(self):
+        from myapp.modelz import Comment
+        # Comments written before they were children of their post.
+        legacy = [Comment(content="Old %d." % i, creator=self.users[1][1],
+                          post_id=self.post_id) for i in range(3)]
+        for comment in legacy:
+            comment.put()
+        legacy[0].mod = None
+        legacy[0].put()
+        self.run_job("comments")
+        self.assertEqual(Comment.all().filter("post_id =", self.post_id)
+                         .count(), 3)
+        for comment in legacy:
+            moved = self.repo.get_comment(self.post_id, comment.key().id())
+            self.assertEqual(moved.content, comment.content)
+            self.assertIs(moved.mod, False)
+        self.assertEqual(len(self.repo.post_comments(self.post_id)[0]), 3)
+        self.assertCounts(0, 3)
+
+    def test_counts(self):
+        from myapp.functions.cache import memcache
+        from myapp.modelz import LikeShard
+        name, uid = self.users[1]
+        self.repo.like(self.post_id, uid, name)
+        self.repo.add_comment(self.post_id, "A comment.", uid, name)
+        self.run_tasks()
+        # Counts that have gone wrong.
+        post = self.repo.reload_post(self.post_id)
+        post.like_count = post.comment_count = 7
+        post.put()
+        LikeShard(key_name="%s-0" % self.post_id, post_id=self.post_id,
+                  count=6).put()
+        memcache.flush_all()
+        self.run_job("counts")
+        self.assertCounts(1, 1)
+        # The shards were corrected by adjusting one, and add up again.
+        self.assertEqual(sum(shard.count for shard in LikeShard.all()), 1)
+
+    def test_counts_with_a_like_during_the_count(self):
+        from myapp.functions import counters
+        name, uid = self.users[1]
+        shard_state = counters.shard_state
+        self.addCleanup(setattr, counters, "shard_state", shard_state)
+
+        def like_after_reading(post_id):
+            # The first time, a like lands just after the shards are read.
+            counters.shard_state = shard_state
+            state = shard_state(post_id)
+            self.repo.like(post_id, uid, name)
+            liked.append(post_id)
+            return state
+        liked = []
+        counters.shard_state = like_after_reading
+        self.run_job("counts")
+        self.post_id = liked[0]
+        self.assertCounts(1, 0)
+
+    def test_credentials(self):
+        from myapp.modelz import Credential
+        # Rows keyed by numeric ids, one of them with a taken username.
+        legacy = [Credential(username=name, hashed_password="hash")
+                  for name in ["old0", "old1", "old2", self.users[0][0]]]
+        for credential in legacy:
+            credential.put()
+        self.run_job("credentials")
+        for credential in legacy[:3]:
+            moved = self.repo.credential_by_name(credential.username)
+            self.assertEqual(moved.key().name(), credential.username)
+            self.assertEqual(moved.uid, credential.key().id())
+            self.assertIsNone(Credential.get(credential.key()))
+        self.assertIsNotNone(Credential.get(legacy[3].key()))
+        self.assertEqual(self.repo.credential_by_name(self.users[0][0]).uid,
+                         int(self.users[0][1]))
+
+    def test_legacy_usernames_kept_from_signups(self):
+        from myapp.modelz import Credential, credential
+        self.addCleanup(setattr, credential, "LEGACY_LOOKUP",
+                        credential.LEGACY_LOOKUP)
+        credential.LEGACY_LOOKUP = True
+        legacy = Credential(username="old0", hashed_password="hash")
+        legacy.put()
+        response = self.request("/blog/signup", {
+            "username": "old0", "password": "secret", "verify": "secret",
+            "email": ""})
+        self.assertIn("That username already exists", response.body)
+        # Nor can a signup that got past that check take it.
+        self.assertIsNone(self.repo.reserve_credential("old0", "", "hash"))
+        self.run_job("credentials")
+        self.assertEqual(self.repo.credential_by_name("old0").uid,
+                         legacy.key().id())
+
+    def test_likes(self):
+        from myapp.modelz import Likez
+        name, uid = self.users[1]
+        # Legacy 'Likes' with auto-allocated ids: a duplicate, and one
+        # that no longer counts.
+        for post_id, does_like in [(self.post_id, True),
+                                   (self.post_id, True),
+                                   (str(self.posts[1].id), False)]:
+            Likez(post_id=post_id, creator=uid, name=name,
+                  does_like=does_like).put()
+        self.run_job("likes")
+        self.assertEqual([like.key().name() for like in Likez.all()],
+                         [Likez.key_name_for(self.post_id, uid)])
+        self.assertCounts(1, 0)
+
+    def test_orphans(self):
+        from google.appengine.ext import db
+        from myapp.modelz import Comment, LikeShard, Likez
+        name, uid = self.users[1]
+        for post_id in [self.post_id, "999"]:
+            Comment(parent=db.Key.from_path("Post", int(post_id)),
+                    content="A comment.", creator=uid,
+                    post_id=post_id).put()
+            Likez(key_name=Likez.key_name_for(post_id, uid), creator=uid,
+                  post_id=post_id, does_like=True).put()
+            LikeShard(key_name="%s-0" % post_id, post_id=post_id,
+                      count=1).put()
+        self.run_job("orphans")
+        for model in [Comment, Likez, LikeShard]:
+            self.assertEqual([entity.post_id for entity in model.all()],
+                             [self.post_id], model.kind())
+
+    def test_render(self):
+        from myapp.functions import rendering
+        from myapp.modelz import Comment, Post
+        post = Post(subject="Old", content="Some *old* words.",
+                    creator=self.users[0][1])
+        post.put()
+        comment = Comment(parent=post.key(), content="An old comment.",
+                          creator=self.users[1][1], post_id=str(post.id))
+        comment.put()
+        self.run_job("render")
+        post = Post.get(post.key())
+        self.assertEqual(post.content_html,
+                         rendering.body_html("Some *old* words."))
+        self.assertEqual(post.excerpt, rendering.excerpt("Some *old* words."))
+        self.assertEqual(Comment.get(comment.key()).content_html,
+                         rendering.body_html("An old comment."))
+
+    def test_search(self):
+        from google.appengine.ext import db
+        from myapp.modelz import SearchDocument, SearchPosting
+        for model in [SearchDocument, SearchPosting]:
+            db.delete(model.all(keys_only=True))
+        # A document left by a post that was deleted while it was queued.
+        SearchDocument(key_name="999", postings=[
+            SearchPosting.key_name_for("words", 999, 2)]).put()
+        SearchPosting(key_name=SearchPosting.key_name_for(
+            "words", 999, 2)).put()
+        self.run_job("search")
+        self.assertEqual(sorted(self.repo.postings("words")),
+                         sorted((post.id, 2) for post in self.posts))
+        self.assertEqual(self.repo.search_document_count(), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
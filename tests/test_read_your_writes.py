@@ -0,0 +1,110 @@
+"""A write's redirect shows the page with the write on it."""
+import re
+import unittest
+
+import apptest
+import seeding
+from myapp.functions import authors, frontpage, writethrough
+
+
+class ReadYourWritesTest(apptest.AppTestCase):
+
+    def setUp(self):
+        super(ReadYourWritesTest, self).setUp()
+        self.users = seeding.seed_users(self.repo, 2)
+        self.post = self.repo.create_post("A post", "Some words.",
+                                          self.users[0][1], self.users[0][0])
+
+    def follow(self, response, user):
+        """Assert response redirects, return the page it redirects to."""
+        self.assertEqual(response.status_int, 302)
+        page = self.request(response.location, user=user)
+        self.assertEqual(page.status_int, 200)
+        return page.body
+
+    def comment_id(self, user):
+        body = self.request("/blog/%s" % self.post.id, user=user).body
+        return re.search(r"editcomment/(\d+)", body).group(1)
+
+    def test_new_post(self):
+        response = self.request("/blog/newpost", {
+            "subject": "Fresh subject", "content": "Fresh words."},
+            user=self.users[0])
+        self.assertIn("Fresh words.", self.follow(response, self.users[0]))
+
+    def test_edited_post(self):
+        response = self.request("/blog/edit/%s" % self.post.id,
+                                {"post_update": "Edited words."},
+                                user=self.users[0])
+        self.assertIn("Edited words.", self.follow(response, self.users[0]))
+
+    def test_new_comment(self):
+        self.request("/blog")  # cache the front page's posts
+        response = self.request("/blog/%s" % self.post.id,
+                                {"comment": "First!"}, user=self.users[1])
+        body = self.follow(response, self.users[1])
+        self.assertIn("First!", body)
+        # The cached posts count it too.
+        self.assertIn("Comments: 1", self.request("/blog").body)
+
+    def test_edited_and_deleted_comment(self):
+        self.repo.add_comment(self.post.id, "First!", self.users[1][1],
+                              self.users[1][0])
+        path = "/blog/%s/%%scomment/%s" % (self.post.id,
+                                           self.comment_id(self.users[1]))
+        response = self.request(path % "edit", {"comment_update": "Second!"},
+                                user=self.users[1])
+        body = self.follow(response, self.users[1])
+        self.assertIn("Second!", body)
+        self.assertNotIn("First!", body)
+        response = self.request(path % "delete", user=self.users[1])
+        self.assertNotIn("Second!", self.follow(response, self.users[1]))
+
+    def test_like_and_unlike(self):
+        response = self.request("/blog/like/%s" % self.post.id,
+                                user=self.users[1])
+        self.assertIn("Likes: 1", self.follow(response, self.users[1]))
+        response = self.request("/blog/unlike/%s" % self.post.id,
+                                user=self.users[1])
+        self.assertIn("Likes: 0", self.follow(response, self.users[1]))
+
+    def test_many_new_posts(self):
+        owner = self.users[0]
+        author_page = "/blog/author/%s" % owner[1]
+        self.request("/blog")
+        self.request(author_page)
+        for i in range(writethrough.MAX_ENTRIES + 5):
+            self.request("/blog/newpost", {"subject": "Post %d" % i,
+                                           "content": "Words %d." % i},
+                         user=owner)
+        # The cached pages are read again rather than growing past
+        # MAX_ENTRIES, and still show the newest post first.
+        posts = frontpage.recent_posts(self.repo)[0]
+        self.assertLessEqual(len(posts), writethrough.MAX_ENTRIES)
+        self.assertEqual(posts[0].subject, "Post %d" % (
+            writethrough.MAX_ENTRIES + 4))
+        posts = authors.first_page(self.repo, owner[1])[0]
+        self.assertLessEqual(len(posts), writethrough.MAX_ENTRIES)
+        for page in ["/blog", author_page]:
+            self.assertIn("Post %d" % (writethrough.MAX_ENTRIES + 4),
+                          self.request(page).body)
+
+    def test_feeds(self):
+        owner = self.users[0]
+        feeds = ["/blog/feed.atom", "/blog/author/%s/feed.rss" % owner[1]]
+        for feed in feeds:
+            self.request(feed)  # cache the feed's posts
+        self.request("/blog/newpost", {"subject": "Fresh subject",
+                                       "content": "Fresh words."},
+                     user=owner)
+        for feed in feeds:
+            self.assertIn("Fresh subject", self.request(feed).body)
+        self.request("/blog/deletepost/%s" % self.post.id, user=owner)
+        for feed in feeds:
+            body = self.request(feed).body
+            self.assertIn("Fresh subject", body)
+            self.assertNotIn("A post", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
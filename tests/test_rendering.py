@@ -0,0 +1,31 @@
+"""Character and entity references in post and comment bodies."""
+import unittest
+
+import apptest
+from myapp.functions import rendering
+
+
+class ReferencesTest(unittest.TestCase):
+
+    def test_known_references(self):
+        self.assertEqual(rendering.body_html(u"&eacute; &#65; &#x42;"),
+                         u"\xe9 A B")
+
+    def test_unknown_entity_keeps_its_semicolon(self):
+        self.assertEqual(rendering.body_html(u"a &bogus; b"),
+                         u"a &amp;bogus; b")
+
+    def test_invalid_characters_are_replaced(self):
+        for reference in [u"&#0;", u"&#x1;", u"&#xD800;", u"&#xFFFF;",
+                          u"&#x110000;", u"&#99999999999999999999;"]:
+            self.assertEqual(rendering.body_html(reference), u"\ufffd",
+                             reference)
+            self.assertEqual(rendering.excerpt(reference), u"\ufffd",
+                             reference)
+
+    def test_astral_character(self):
+        self.assertEqual(rendering.body_html(u"&#x1F600;"), u"\U0001F600")
+
+
+if __name__ == "__main__":
+    unittest.main()
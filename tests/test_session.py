@@ -0,0 +1,47 @@
+"""Session cookies are verified once per request, however often they're read."""
+import unittest
+
+import apptest
+import seeding
+from myapp.functions import appfunctions
+
+
+class CookieVerificationTest(apptest.AppTestCase):
+
+    def setUp(self):
+        super(CookieVerificationTest, self).setUp()
+        self.users = seeding.seed_users(self.repo, 2)
+        self.post = self.repo.create_post("A post", "Some words.",
+                                          self.users[0][1], self.users[0][0])
+        # Sign the cookies before hash_str() is counted.
+        self.cookie = {"Cookie": seeding.cookie(*self.users[0])}
+        self.hashes = 0
+        hash_str = appfunctions.hash_str
+
+        def counted(s):
+            self.hashes += 1
+            return hash_str(s)
+        appfunctions.hash_str = counted
+        self.addCleanup(setattr, appfunctions, "hash_str", hash_str)
+
+    def hashes_per_request(self, path):
+        self.hashes = 0
+        response = self.request(path, headers=self.cookie)
+        self.assertEqual(response.status_int, 200)
+        return self.hashes
+
+    def test_each_cookie_is_hashed_once(self):
+        # Pages whose decorators, handler and template all ask who the
+        # user is still check the 'user' and 'user_id' cookies once each.
+        for path in ["/blog", "/blog/%s" % self.post.id,
+                     "/blog/edit/%s" % self.post.id,
+                     "/blog/author/%s" % self.users[0][1]]:
+            self.assertEqual(self.hashes_per_request(path), 2, path)
+
+    def test_visitors_without_cookies_are_not_hashed(self):
+        self.cookie = {}
+        self.assertEqual(self.hashes_per_request("/blog"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
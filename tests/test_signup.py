@@ -0,0 +1,68 @@
+"""Concurrent signups on a file database each get one username and user id."""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import apptest
+import seeding
+
+
+THREADS = 20
+
+
+class ConcurrentSignupTest(apptest.AppTestCase):
+
+    def setUp(self):
+        super(ConcurrentSignupTest, self).setUp()
+        # A file database gives each thread its own connection, so the
+        # signups really do run at the same time.
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.repo = seeding.reset(os.path.join(directory, "blog.sqlite3"))
+        self.addCleanup(seeding.reset)
+
+    def sign_up_at_once(self, usernames):
+        """Send a signup for each of usernames from its own thread, all
+        released together; return the responses in the same order."""
+        start = threading.Event()
+        responses = [None] * len(usernames)
+
+        def sign_up(i):
+            start.wait()
+            password = "secret%d" % i
+            responses[i] = self.request("/blog/signup", {
+                "username": usernames[i], "password": password,
+                "verify": password, "email": ""})
+        threads = [threading.Thread(target=sign_up, args=(i,))
+                   for i in range(len(usernames))]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+        return responses
+
+    def test_one_of_many_signups_for_a_name_succeeds(self):
+        responses = self.sign_up_at_once(["racer"] * THREADS)
+        signed_up = [r for r in responses if r.status_int == 302]
+        self.assertEqual(len(signed_up), 1)
+        for response in responses:
+            if response.status_int != 302:
+                self.assertEqual(response.status_int, 200)
+                self.assertIn("That username already exists", response.body)
+        credential = self.repo.credential_by_name("racer")
+        self.assertIn("user_id=%s|" % credential.uid,
+                      "; ".join(signed_up[0].headers.getall("Set-Cookie")))
+
+    def test_signups_for_different_names_all_succeed(self):
+        names = ["racer%d" % i for i in range(THREADS)]
+        responses = self.sign_up_at_once(names)
+        self.assertEqual([r.status_int for r in responses], [302] * THREADS)
+        uids = set(self.repo.credential_by_name(name).uid for name in names)
+        self.assertEqual(len(uids), THREADS)
+
+
+if __name__ == "__main__":
+    unittest.main()
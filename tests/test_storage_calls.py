@@ -0,0 +1,74 @@
+"""Each route makes a fixed number of storage calls.
+
+Posts and comments are fetched at most once per request, however many of
+the decorators and the handler use them; a request that fetched one twice
+would show up as an extra get. The exception is a post whose 'Like' or
+comment count changed, which is read again for each cached page it's put
+on (the front page and its author's page).
+
+"""
+import unittest
+
+import apptest
+import seeding
+
+
+class StorageCallsTest(apptest.AppTestCase):
+
+    longMessage = True
+
+    def setUp(self):
+        super(StorageCallsTest, self).setUp()
+        self.users = owner, commenter = seeding.seed_users(self.repo, 2)
+        self.post = self.repo.create_post("A post", "Some words.",
+                                          owner[1], owner[0])
+        self.comment = self.repo.add_comment(self.post.id, "A comment.",
+                                             commenter[1], commenter[0])
+        self.warm_caches()
+
+    def warm_caches(self):
+        """Read the cached pages, so writes only update them."""
+        self.request("/blog")
+        self.request("/blog/feed.atom")
+        for _, uid in self.users:
+            self.request("/blog/author/%s" % uid)
+            self.request("/blog/author/%s/feed.atom" % uid)
+
+    def assertCalls(self, path, calls, post=None, user=0):
+        response, stats = self.send(path, post, self.users[user])
+        self.assertLess(response.status_int, 400, path)
+        made = dict((kind, counted[0])
+                    for kind, counted in stats.storage.items()
+                    if counted[0] and kind != "transaction")
+        self.assertEqual(made, calls, "%s %s" % (post and "POST" or "GET",
+                                                 path))
+
+    def test_post_routes(self):
+        post_path = "/blog/%s" % self.post.id
+        self.assertCalls(post_path, {"get": 3, "query": 1}, user=1)
+        self.assertCalls(post_path, {"get": 4, "put": 1}, user=1,
+                         post={"comment": "Another."})
+        self.assertCalls("/blog/edit/%s" % self.post.id, {"get": 1})
+        self.assertCalls("/blog/edit/%s" % self.post.id,
+                         {"get": 1, "put": 1}, post={"post_update": "New."})
+        self.assertCalls("/blog/like/%s" % self.post.id,
+                         {"get": 3, "put": 1}, user=1)
+        self.assertCalls("/blog/unlike/%s" % self.post.id,
+                         {"get": 3, "delete": 1}, user=1)
+        self.assertCalls("/blog/deletepost/%s" % self.post.id,
+                         {"get": 1, "delete": 1})
+
+    def test_comment_routes(self):
+        path = "/blog/%s/%%scomment/%s" % (self.post.id, self.comment.id)
+        self.assertCalls(path % "edit", {"get": 1}, user=1)
+        self.assertCalls(path % "edit", {"get": 2, "put": 1}, user=1,
+                         post={"comment_update": "Edited."})
+        self.assertCalls(path % "delete", {"get": 4, "delete": 1}, user=1)
+
+    def test_cached_pages(self):
+        self.assertCalls("/blog", {})
+        self.assertCalls("/blog/author/%s" % self.users[0][1], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,259 @@
+"""Benchmark every route of the app, in-process, on seeded SQLite data.
+
+    python tools/benchmark.py [--scales 10,100,1000] [--requests 200]
+                              [--baseline FILE] [--save] [--threshold 0.25]
+
+For each scale (a number of posts) a fresh in-memory SQLite database is
+seeded with users, posts, comments and 'Likes', then every route in main.py's
+route table is sent --requests requests through main.app (after a few
+warm-up requests that aren't timed). For each route it prints the p50, p95
+and p99 latency, the requests per second, and the storage calls made per
+request (as counted by myapp/functions/instrumentation.py).
+
+With --save the results are written to the baseline file. Otherwise they're
+compared with it, and the script exits with status 1 if a route's p95 is
+more than --threshold (and at least MIN_SLOWDOWN_MS) slower than its
+baseline, or if it makes more storage calls per request than it did.
+Latencies depend on the machine, so only compare baselines saved on the
+same one.
+
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import seeding
+from seeding import PASSWORD, ROOT
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmark_baseline.json")
+WARMUP = 5
+MIN_SLOWDOWN_MS = 0.5  # smaller differences are noise, whatever the ratio
+
+
+# Each scenario returns the (path, POST data or None, user index or None) of
+# one request to its route. Scenarios that delete or create something make
+# what they need first, so every request does the same work.
+
+def _read_post(seed, i):
+    return "/blog/%s" % seed.random_post()[0], None, None
+
+
+def _own_post(path, post=None):
+    def scenario(seed, i):
+        post_id, user = seed.random_post()
+        return path % post_id, post, user
+    return scenario
+
+
+def _own_comment(path, post=None):
+    def scenario(seed, i):
+        post_id, comment_id, user = random.choice(seed.comments)
+        return path % (post_id, comment_id), post, user
+    return scenario
+
+
+def _like(seed, i):
+    post_id, owner = seed.random_post()
+    return "/blog/like/%s" % post_id, None, (owner + 1) % len(seed.users)
+
+
+def _unlike(seed, i):
+    post_id, owner = seed.random_post()
+    user = (owner + 1) % len(seed.users)
+    seed.repo.like(post_id, *reversed(seed.users[user]))
+    return "/blog/unlike/%s" % post_id, None, user
+
+
+def _delete_post(seed, i):
+    post_id, user = seed.add_post(0)
+    return "/blog/deletepost/%s" % post_id, None, user
+
+
+def _delete_comment(seed, i):
+    post_id, comment_id, user = seed.add_comment(seed.random_post()[0], 0)
+    return ("/blog/%s/deletecomment/%s" % (post_id, comment_id), None, user)
+
+
+def _second_page(seed, i):
+    from myapp.functions import frontpage
+    return ("/blog?cursor=%s" % frontpage.recent_posts(seed.repo)[1], None,
+            None)
+
+
+def _archive(seed, i):
+    from datetime import datetime
+    now = datetime.utcnow()
+    return "/blog/archive/%04d/%02d" % (now.year, now.month), None, None
+
+
+SCENARIOS = {
+    "/": [lambda seed, i: ("/", None, None)],
+    "/blog/signup": [
+        lambda seed, i: ("/blog/signup", None, None),
+        lambda seed, i: ("/blog/signup",
+                         dict(username="new%d_%d" % (os.getpid(), i),
+                              password=PASSWORD, verify=PASSWORD, email=""),
+                         None)],
+    "/blog/login": [
+        lambda seed, i: ("/blog/login", None, None),
+        lambda seed, i: ("/blog/login",
+                         dict(username=seed.users[0][0], password=PASSWORD),
+                         None)],
+    "/blog/logout": [lambda seed, i: ("/blog/logout", None, 0)],
+    "/blog": [lambda seed, i: ("/blog", None, None),
+              lambda seed, i: ("/blog", None, 0),
+              _second_page],
+    "/blog/search": [
+        lambda seed, i: ("/blog/search?q=words+user%d" % (i % 10), None,
+                         None),
+        lambda seed, i: ("/blog/search?q=comment", None, None)],
+    r"/blog/feed\.(atom|rss)": [
+        lambda seed, i: ("/blog/feed.atom", None, None),
+        lambda seed, i: ("/blog/feed.rss", None, None)],
+    "/blog/author/([0-9]+)": [
+        lambda seed, i: ("/blog/author/%s"
+                         % seed.users[seed.random_post()[1]][1], None, None)],
+    r"/blog/author/([0-9]+)/feed\.(atom|rss)": [
+        lambda seed, i: ("/blog/author/%s/feed.atom"
+                         % seed.users[seed.random_post()[1]][1], None, None)],
+    "/blog/archive/([0-9]{4})/([0-9]{2})": [_archive],
+    "/blog/newpost": [
+        lambda seed, i: ("/blog/newpost", None, 0),
+        lambda seed, i: ("/blog/newpost",
+                         dict(subject="New post", content="Words."), 0)],
+    "/blog/([0-9]+)": [
+        _read_post,
+        _own_post("/blog/%s"),
+        lambda seed, i: ("/blog/%s" % seed.random_post()[0],
+                         dict(comment="Another comment."), 0)],
+    "/blog/([0-9]+)/comments": [
+        lambda seed, i: ("/blog/%s/comments" % seed.random_post()[0], None,
+                         None)],
+    "/blog/unlike/([0-9]+)": [_unlike],
+    "/blog/like/([0-9]+)": [_like],
+    "/blog/edit/([0-9]+)": [
+        _own_post("/blog/edit/%s"),
+        _own_post("/blog/edit/%s", dict(post_update="Edited words."))],
+    "/blog/([0-9]+)/editcomment/([0-9]+)": [
+        _own_comment("/blog/%s/editcomment/%s"),
+        _own_comment("/blog/%s/editcomment/%s",
+                     dict(comment_update="Edited comment."))],
+    "/blog/([0-9]+)/deletecomment/([0-9]+)": [_delete_comment],
+    "/blog/deletepost/([0-9]+)": [_delete_post],
+}
+
+
+def run_route(app, seed, scenario, requests):
+    """Send a scenario's requests to the app, return their statistics."""
+    import webapp2
+    from myapp.functions.instrumentation import percentile
+    specs = [scenario(seed, i) for i in range(WARMUP + requests)]
+    latencies, calls, errors = [], 0, 0
+    for i, (path, post, user) in enumerate(specs):
+        request = webapp2.Request.blank(path, POST=post)
+        if user is not None:
+            request.headers["Cookie"] = seed.cookie(user)
+        start = time.time()
+        response = request.get_response(app)
+        elapsed = time.time() - start
+        if i < WARMUP:
+            continue
+        latencies.append(elapsed)
+        calls += request.environ["blog.request_stats"].storage_calls
+        errors += response.status_int >= 500
+    latencies.sort()
+    return dict(p50=percentile(latencies, 50) * 1000,
+                p95=percentile(latencies, 95) * 1000,
+                p99=percentile(latencies, 99) * 1000,
+                rps=len(latencies) / sum(latencies),
+                calls=float(calls) / requests,
+                errors=errors)
+
+
+def benchmark(num_posts, requests):
+    """Seed a fresh database with num_posts posts and time every route.
+
+    Return a dict of results keyed by route and scenario.
+
+    """
+    import main
+    # Each scale starts from an empty database and an empty cache.
+    repo = seeding.reset()
+    random.seed(num_posts)
+    seed = seeding.Seeded(repo, num_posts)
+    results = {}
+    for route in main.app.router.match_routes:
+        # webapp2 anchors a route's template once it has matched a request.
+        template = route.template.lstrip("^").rstrip("$")
+        scenarios = SCENARIOS.get(template)
+        if not scenarios:
+            print "  %-45s (no scenario, skipped)" % template
+            continue
+        for n, scenario in enumerate(scenarios):
+            name = template if n == 0 else "%s #%d" % (template, n + 1)
+            results[name] = run_route(main.app, seed, scenario, requests)
+    return results
+
+
+def regressions(results, baseline, threshold):
+    """Return descriptions of the results that are worse than the baseline."""
+    found = []
+    for scale, routes in sorted(results.items()):
+        for name, result in sorted(routes.items()):
+            base = baseline.get(scale, {}).get(name)
+            if not base:
+                continue
+            if (result["p95"] > base["p95"] * (1 + threshold) and
+                    result["p95"] > base["p95"] + MIN_SLOWDOWN_MS):
+                found.append("%s posts, %s: p95 %.1f ms (baseline %.1f ms)"
+                             % (scale, name, result["p95"], base["p95"]))
+            if result["calls"] > base["calls"] + 0.01:
+                found.append("%s posts, %s: %.1f storage calls (baseline %.1f)"
+                             % (scale, name, result["calls"], base["calls"]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", default="10,100,1000",
+                        help="comma separated numbers of posts to seed")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="timed requests per route and scenario")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true",
+                        help="save the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed p95 slowdown, as a fraction")
+    args = parser.parse_args()
+    seeding.use_sqlite()
+
+    results = {}
+    for scale in args.scales.split(","):
+        print "\n%s posts" % scale
+        print "  %-45s %8s %8s %8s %8s %6s" % ("route", "p50 ms", "p95 ms",
+                                              "p99 ms", "req/s", "calls")
+        results[scale] = benchmark(int(scale), args.requests)
+        for name, r in sorted(results[scale].items()):
+            print "  %-45s %8.2f %8.2f %8.2f %8.0f %6.1f%s" % (
+                name, r["p50"], r["p95"], r["p99"], r["rps"], r["calls"],
+                "  (%d errors)" % r["errors"] if r["errors"] else "")
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print "\nSaved the baseline to %s" % args.baseline
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.threshold)
+        for line in found:
+            print "REGRESSION %s" % line
+        if found:
+            sys.exit(1)
+        print "\nNo regressions against %s" % args.baseline
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""Build the minified, fingerprinted style sheet bundles.
+
+Run this before deploying (with compile_templates.py):
+
+    python tools/build_assets.py
+
+For each bundle in myapp/functions/assets.py it:
+
+* compiles static/main.scss to static/main.css, if libsass is installed
+  (pip install libsass); otherwise the checked-in main.css is used,
+* drops the Bootstrap rules whose selectors name a class, id or element
+  that no template uses (nor, for elements, any post or comment, whose
+  HTML can contain the tags in rendering.ALLOWED_TAGS),
+* minifies the sources and joins them into static/build/<name>.<hash>.<ext>,
+  where <hash> is taken from the contents,
+* records the bundle's URL in myapp/assets_manifest.json.
+
+It prints the size of the sources and of each bundle, plain and gzipped.
+
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from cStringIO import StringIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from myapp.functions import assets, rendering, templating
+
+STATIC_DIR = os.path.join(ROOT, "static")
+BUILD_DIR = os.path.join(STATIC_DIR, "build")
+# Sources whose unused rules are dropped (the site's own are all kept).
+PURGED = set(["bootstrap.min.css"])
+# Elements every page has, whether or not a template names them.
+ALWAYS_USED = set(["html", "body", "*"])
+
+ATTRIBUTE_RE = re.compile(r"\[[^\]]*\]")
+PSEUDO_RE = re.compile(r"::?[\w-]+(\([^)]*\))?")
+CLASS_RE = re.compile(r"\.([\w-]+)")
+ID_RE = re.compile(r"#([\w-]+)")
+ELEMENT_RE = re.compile(r"(?:^|[\s>+~])([a-zA-Z][\w-]*)")
+
+
+def compile_scss():
+    """Compile main.scss to main.css, if libsass is available."""
+    try:
+        import sass
+    except ImportError:
+        print "libsass isn't installed, using the checked-in main.css"
+        return
+    css = sass.compile(filename=os.path.join(STATIC_DIR, "main.scss"))
+    with open(os.path.join(STATIC_DIR, "main.css"), "w") as f:
+        f.write(css)
+
+
+def used_names():
+    """Return the classes, ids and elements the templates and the bodies
+    of posts and comments use."""
+    classes, ids, elements = set(), set(), set(ALWAYS_USED)
+    elements.update(rendering.ALLOWED_TAGS)
+    for name in os.listdir(templating.TEMPLATE_DIR):
+        with open(os.path.join(templating.TEMPLATE_DIR, name)) as f:
+            html = f.read()
+        for value in re.findall(r'class="([^"]*)"', html):
+            classes.update(value.split())
+        ids.update(re.findall(r'id="([^"]*)"', html))
+        elements.update(tag.lower() for tag in
+                        re.findall(r"<([a-zA-Z][a-zA-Z0-9]*)", html))
+    return classes, ids, elements
+
+
+def parse(css, pos=0):
+    """Return the rules of a style sheet, and where the block they're in
+    ended. A rule is a (prelude, body) pair, where body is a list of rules
+    for a block at-rule such as @media, and otherwise the declarations."""
+    rules = []
+    while True:
+        start, end = css.find("{", pos), css.find("}", pos)
+        if start == -1 or (end != -1 and end < start):
+            # The enclosing block (or the style sheet) ends here; keep any
+            # statement before it, such as @charset.
+            tail = css[pos:end if end != -1 else len(css)].strip()
+            if tail:
+                rules.append((tail, None))
+            return rules, (end + 1 if end != -1 else len(css))
+        prelude = css[pos:start]
+        # Statements ending in ';' (@charset, @import) precede the rule.
+        statements = prelude.split(";")
+        for statement in statements[:-1]:
+            if statement.strip():
+                rules.append((statement.strip() + ";", None))
+        prelude = statements[-1].strip()
+        if prelude.startswith("@") and not prelude.startswith(
+                ("@font-face", "@page", "@-ms-viewport", "@viewport")):
+            body, pos = parse(css, start + 1)
+        else:
+            pos = css.index("}", start) + 1
+            body = css[start + 1:pos - 1]
+        rules.append((prelude, body))
+
+
+def selector_used(selector, used):
+    """Return True if every class, id and element in selector is used."""
+    classes, ids, elements = used
+    bare = PSEUDO_RE.sub("", ATTRIBUTE_RE.sub("", selector))
+    return (set(CLASS_RE.findall(bare)) <= classes and
+            set(ID_RE.findall(bare)) <= ids and
+            set(e.lower() for e in ELEMENT_RE.findall(bare)) <= elements)
+
+
+def purge(rules, used):
+    """Return the rules with unused selectors dropped."""
+    kept = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            if "keyframes" not in prelude:  # its blocks aren't selectors
+                body = purge(body, used)
+                if not body:
+                    continue
+        elif body is not None and not prelude.startswith("@"):
+            selectors = [s for s in prelude.split(",")
+                         if selector_used(s.strip(), used)]
+            if not selectors:
+                continue
+            prelude = ",".join(selectors)
+        kept.append((prelude, body))
+    return drop_unreferenced(kept)
+
+
+def drop_unreferenced(rules):
+    """Drop @font-face and @keyframes rules nothing else refers to."""
+    text = serialize([(p, b) for p, b in rules
+                      if not p.startswith("@font-face") and
+                      "keyframes" not in p])
+    kept = []
+    for prelude, body in rules:
+        if "keyframes" in prelude:
+            if prelude.split()[-1] not in text:
+                continue
+        elif prelude.startswith("@font-face"):
+            family = re.search(r"font-family:\s*['\"]?([^;'\"]+)", body)
+            if family and family.group(1) not in text:
+                continue
+        kept.append((prelude, body))
+    return kept
+
+
+def minify_declarations(body):
+    body = re.sub(r"\s+", " ", body).strip()
+    body = re.sub(r"\s*([;:,])\s*", r"\1", body)
+    return body.rstrip(";")
+
+
+def minify_prelude(prelude):
+    prelude = re.sub(r"\s+", " ", prelude).strip()
+    return re.sub(r"\s*([>+~,])\s*", r"\1", prelude)
+
+
+def serialize(rules):
+    """Return rules as minified CSS."""
+    out = []
+    for prelude, body in rules:
+        if body is None:
+            out.append(minify_prelude(prelude))
+        elif isinstance(body, list):
+            out.append("%s{%s}" % (minify_prelude(prelude), serialize(body)))
+        else:
+            out.append("%s{%s}" % (minify_prelude(prelude),
+                                   minify_declarations(body)))
+    return "".join(out)
+
+
+def minify(css, used=None):
+    """Return css minified, without the rules 'used' says are unused."""
+    license = re.findall(r"/\*!.*?\*/", css, re.S)
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    rules = parse(css)[0]
+    if used:
+        rules = purge(rules, used)
+    return "\n".join(license + [serialize(rules)])
+
+
+def gzipped_size(data):
+    buf = StringIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb") as f:
+        f.write(data)
+    return len(buf.getvalue())
+
+
+def sizes(data):
+    return "%7d bytes (%6d gzipped)" % (len(data), gzipped_size(data))
+
+
+def main():
+    compile_scss()
+    used = used_names()
+    if os.path.isdir(BUILD_DIR):
+        shutil.rmtree(BUILD_DIR)
+    os.makedirs(BUILD_DIR)
+    manifest = {}
+    for bundle, sources in sorted(assets.BUNDLES.items()):
+        before, parts = [], []
+        for name in sources:
+            with open(os.path.join(STATIC_DIR, name)) as f:
+                css = f.read()
+            before.append(css)
+            parts.append(minify(css, used if name in PURGED else None))
+            print "  %-20s %s" % (name, sizes(css))
+        built = "\n".join(parts)
+        base, ext = os.path.splitext(bundle)
+        filename = "%s.%s%s" % (base, hashlib.sha1(built).hexdigest()[:12],
+                                ext)
+        with open(os.path.join(BUILD_DIR, filename), "w") as f:
+            f.write(built)
+        manifest[bundle] = "/static/build/" + filename
+        print "%-22s %s" % ("%s before" % bundle, sizes("".join(before)))
+        print "%-22s %s -> %s" % ("%s after" % bundle, sizes(built),
+                                   manifest[bundle])
+    with open(assets.MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    print "Wrote %s" % assets.MANIFEST
+
+
+if __name__ == "__main__":
+    main()
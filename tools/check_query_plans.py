@@ -0,0 +1,51 @@
+"""Check that every query of the SQLite storage backend uses an index.
+
+    python tools/check_query_plans.py
+
+Runs EXPLAIN QUERY PLAN for each statement in myapp.storage.sqlite.QUERIES
+against a fresh database, prints the plans, and exits with status 1 if any
+of them scans a whole table or sorts its results in a temporary b-tree
+instead of reading them in index order. The statements named in
+sqlite.FULL_SCANS are expected to, and are only reported.
+
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from myapp.storage import sqlite
+
+
+def problems(plan):
+    """Return the steps of a query plan that don't use an index."""
+    bad = []
+    for detail in plan:
+        if detail.startswith("SCAN") and "INDEX" not in detail:
+            bad.append(detail)
+        elif "TEMP B-TREE" in detail:
+            bad.append(detail)
+    return bad
+
+
+def main():
+    db = sqlite.Database(":memory:")
+    failed = False
+    for name, sql in sorted(sqlite.QUERIES.items()):
+        params = [None] * sql.count("?")
+        plan = [row[-1] for row in
+                db.query("EXPLAIN QUERY PLAN " + sql, params)]
+        bad = problems(plan)
+        if bad and name in sqlite.FULL_SCANS:
+            status = "scan"
+        else:
+            status = "FAIL" if bad else "ok"
+            failed = failed or bool(bad)
+        print "%-4s %s" % (status, name)
+        for detail in plan:
+            print "       %s" % detail
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Precompile the Jinja2 templates into importable Python modules.
+
+Run this before deploying:
+
+    python tools/compile_templates.py
+
+It writes one module per template to myapp/templates_compiled, which
+myapp/functions/templating.py loads in production instead of parsing the
+template sources. It then times a cold render of blog.html (a fresh
+environment, as on a new instance) from the sources and from the modules.
+
+Compiled modules import the runtime of the Jinja2 that compiled them, so
+they only load under the same version. The script refuses to run unless the
+installed Jinja2 is the version app.yaml asks App Engine for
+(`pip install jinja2==<version>`).
+
+"""
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import jinja2
+from myapp.functions import templating
+
+
+def pinned_version():
+    """Return the Jinja2 version app.yaml asks for, or None."""
+    with open(os.path.join(ROOT, "app.yaml")) as f:
+        match = re.search(r"^- name: jinja2\s*\n\s+version: \"?([^\"\s]+)",
+                          f.read(), re.M)
+    return match and match.group(1)
+
+
+def cold_render(loader):
+    """Return the seconds taken to load and render blog.html once."""
+    start = time.time()
+    env = templating.environment(loader, auto_reload=False)
+    env.get_template("blog.html").render(posts=[], page_url="/blog")
+    return time.time() - start
+
+
+def main():
+    pinned = pinned_version()
+    if jinja2.__version__ != pinned:
+        sys.exit("Jinja2 %s is installed, but app.yaml deploys %s; the "
+                 "compiled templates\nwouldn't load. Install it with "
+                 "'pip install jinja2==%s'." % (jinja2.__version__, pinned,
+                                                 pinned))
+    source_loader = jinja2.FileSystemLoader(templating.TEMPLATE_DIR)
+    env = templating.environment(source_loader)
+    env.compile_templates(templating.COMPILED_DIR, zip=None,
+                          ignore_errors=False)
+    print "Compiled %d templates to %s" % (len(env.list_templates()),
+                                           templating.COMPILED_DIR)
+    print "Cold render of blog.html from sources: %.1f ms" % (
+        cold_render(source_loader) * 1000)
+    print "Cold render of blog.html from modules: %.1f ms" % (
+        cold_render(jinja2.ModuleLoader(templating.COMPILED_DIR)) * 1000)
+
+
+if __name__ == "__main__":
+    main()
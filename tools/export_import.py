@@ -0,0 +1,286 @@
+"""Export the blog's data to gzipped NDJSON files, or import it back.
+
+    python tools/export_import.py export DIR [--db FILE] [--batch 1000]
+                                             [--resume]
+    python tools/export_import.py import DIR [--db FILE] [--batch 1000]
+                                             [--resume] [--reindex]
+    python tools/export_import.py roundtrip [--entities 1000000]
+
+Works on the SQLite backend's database (--db, default BLOG_SQLITE_PATH).
+Each kind (the credential, post, comment and likez tables) is written to
+DIR/<kind>.ndjson.gz, one JSON object per row holding all of its columns,
+ids included, so a comment's or 'Like''s post_id and every creator (a
+credential's user_id) still refer to the same rows once imported. The
+search index isn't exported; it's rebuilt from the posts (--reindex, or
+the 'search' migration job).
+
+Rows are read a batch at a time in primary key order, each batch starting
+after the last key of the one before, so memory use is constant and every
+batch costs the same however far into the table it is. Each batch is
+written as one gzip member and the import writes each batch in one
+transaction with INSERT OR REPLACE, so importing a row twice is harmless.
+Progress is saved in DIR after every batch: with --resume an interrupted
+run carries on from its last complete batch. Rows per second and MB per
+second are printed for each kind.
+
+roundtrip seeds a temporary database with --entities rows spread over the
+kinds, exports it, imports the export into a second database, and checks
+that every row of every kind arrived unchanged.
+
+"""
+import argparse
+import gzip
+import hashlib
+import itertools
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from myapp.storage import sqlite
+
+# Each exported kind and the columns of its primary key, in import order.
+KINDS = [
+    ("credential", ("username",)),
+    ("post", ("id",)),
+    ("comment", ("id",)),
+    ("likez", ("post_id", "creator")),
+]
+EXPORT_PROGRESS = "export-progress.json"
+IMPORT_PROGRESS = "import-progress.json"
+
+
+def _path(directory, kind):
+    return os.path.join(directory, "%s.ndjson.gz" % kind)
+
+
+def _load_progress(directory, name, resume):
+    if resume and os.path.exists(os.path.join(directory, name)):
+        with open(os.path.join(directory, name)) as f:
+            return json.load(f)
+    return {}
+
+
+def _save_progress(directory, name, progress):
+    # Write then rename, so an interruption can't leave half a file.
+    path = os.path.join(directory, name)
+    with open(path + ".tmp", "w") as f:
+        json.dump(progress, f)
+    os.rename(path + ".tmp", path)
+
+
+def read_batches(db, kind, key, batch, after=None):
+    """Yield the kind's rows in primary key order, a batch at a time,
+    starting after the key 'after' (a list of key column values)."""
+    columns = ", ".join(key)
+    first = "SELECT * FROM %s ORDER BY %s LIMIT ?" % (kind, columns)
+    following = "SELECT * FROM %s WHERE (%s) > (%s) ORDER BY %s LIMIT ?" % (
+        kind, columns, ", ".join("?" * len(key)), columns)
+    while True:
+        if after is None:
+            rows = db.query(first, (batch,))
+        else:
+            rows = db.query(following, list(after) + [batch])
+        if not rows:
+            return
+        yield rows
+        after = [rows[-1][column] for column in key]
+
+
+def _line(row):
+    return json.dumps(dict(zip(row.keys(), row)), default=str,
+                      sort_keys=True) + "\n"
+
+
+class Meter(object):
+
+    """Count the rows and bytes of one kind, and report their rate."""
+
+    def __init__(self, verb, kind):
+        self.verb, self.kind = verb, kind
+        self.rows = self.bytes = 0
+        self.start = time.time()
+
+    def add(self, rows, size):
+        self.rows += rows
+        self.bytes += size
+
+    def report(self):
+        elapsed = max(time.time() - self.start, 1e-6)
+        print ("  %s %-10s %9d rows %8.1f MB in %6.1f s: %8.0f rows/s "
+               "%6.1f MB/s" % (self.verb, self.kind, self.rows,
+                               self.bytes / 1e6, elapsed, self.rows / elapsed,
+                               self.bytes / 1e6 / elapsed))
+
+
+def export(db, directory, batch, resume=False):
+    """Write every kind to DIR/<kind>.ndjson.gz."""
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    progress = _load_progress(directory, EXPORT_PROGRESS, resume)
+    for kind, key in KINDS:
+        state = progress.setdefault(kind, dict(after=None, size=0))
+        if state.get("done"):
+            continue
+        meter = Meter("exported", kind)
+        with open(_path(directory, kind), "ab") as raw:
+            # Drop anything after the last complete batch.
+            raw.truncate(state["size"])
+        for rows in read_batches(db, kind, key, batch, state["after"]):
+            with open(_path(directory, kind), "ab") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="wb") as out:
+                    for row in rows:
+                        line = _line(row)
+                        out.write(line)
+                        meter.add(0, len(line))
+                state["size"] = raw.tell()
+            meter.add(len(rows), 0)
+            state["after"] = [rows[-1][column] for column in key]
+            _save_progress(directory, EXPORT_PROGRESS, progress)
+        state["done"] = True
+        _save_progress(directory, EXPORT_PROGRESS, progress)
+        meter.report()
+
+
+def _import_batch(db, kind, records):
+    columns = sorted(records[0])
+    sql = "INSERT OR REPLACE INTO %s (%s) VALUES (%s)" % (
+        kind, ", ".join(columns), ", ".join("?" * len(columns)))
+    with db.transaction() as conn:
+        conn.executemany(sql, [[record[column] for column in columns]
+                               for record in records])
+
+
+def import_(db, directory, batch, resume=False):
+    """Write the rows of every DIR/<kind>.ndjson.gz into the database."""
+    progress = _load_progress(directory, IMPORT_PROGRESS, resume)
+    for kind, _ in KINDS:
+        done = progress.get(kind, 0)
+        meter = Meter("imported", kind)
+        with gzip.open(_path(directory, kind)) as f:
+            lines = itertools.islice(f, done, None)
+            while True:
+                chunk = list(itertools.islice(lines, batch))
+                if not chunk:
+                    break
+                _import_batch(db, kind, [json.loads(line) for line in chunk])
+                done += len(chunk)
+                meter.add(len(chunk), sum(len(line) for line in chunk))
+                progress[kind] = done
+                _save_progress(directory, IMPORT_PROGRESS, progress)
+        meter.report()
+
+
+def checksum(db, kind, key, batch):
+    """Return the number of rows of a kind and a hash of their contents."""
+    digest, count = hashlib.sha1(), 0
+    for rows in read_batches(db, kind, key, batch):
+        for row in rows:
+            digest.update(_line(row).encode("utf-8"))
+        count += len(rows)
+    return count, digest.hexdigest()
+
+
+def seed(db, entities, batch):
+    """Fill db with about 'entities' rows: 1% credentials, 20% posts, 50%
+    comments and the rest 'Likes', all referring to each other."""
+    users = max(1, entities // 100)
+    posts = max(1, entities // 5)
+    comments = entities // 2
+    likes = entities - users - posts - comments
+    start = datetime(2017, 1, 1)
+
+    def when(i):
+        return start + timedelta(seconds=i * 7)
+
+    def insert(sql, rows):
+        for chunk in iter(lambda: list(itertools.islice(rows, batch)), []):
+            with db.transaction() as conn:
+                conn.executemany(sql, chunk)
+
+    insert("INSERT INTO credential (username, email, hashed_password, "
+           "user_id) VALUES (?, ?, ?, ?)",
+           (("user%d" % i, "user%d@example.com" % i, "%040x,salt" % i,
+             i + 1) for i in xrange(users)))
+    insert("INSERT INTO post (id, subject, content, created, last_modified, "
+           "creator, name, like_count, comment_count) "
+           "VALUES (?, ?, ?, ?, ?, ?, ?, 0, 0)",
+           ((i + 1, u"Post \u2116%d" % i, "Line one\nline <b>two</b> %d" % i,
+             when(i), when(i), str(i % users + 1), "user%d" % (i % users))
+            for i in xrange(posts)))
+    insert("INSERT INTO comment (id, post_id, content, created, "
+           "last_modified, creator, name, mod) "
+           "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+           ((i + 1, random.randint(1, posts), "Comment %d" % i, when(i),
+             when(i), str(i % users + 1), "user%d" % (i % users), i % 50 == 0)
+            for i in xrange(comments)))
+    insert("INSERT OR IGNORE INTO likez (post_id, creator, name, created, "
+           "last_modified) VALUES (?, ?, ?, ?, ?)",
+           ((i // users + 1, str(i % users + 1), "user%d" % (i % users),
+             when(i), when(i)) for i in xrange(likes)))
+
+
+def roundtrip(entities, batch):
+    """Seed, export, import and compare; return True if nothing changed."""
+    workdir = tempfile.mkdtemp(prefix="blog-roundtrip-")
+    try:
+        source = sqlite.Database(os.path.join(workdir, "source.sqlite3"))
+        target = sqlite.Database(os.path.join(workdir, "target.sqlite3"))
+        random.seed(entities)
+        started = time.time()
+        seed(source, entities, batch)
+        print "Seeded %d entities in %.1f s" % (entities,
+                                                 time.time() - started)
+        export(source, os.path.join(workdir, "export"), batch)
+        import_(target, os.path.join(workdir, "export"), batch)
+        ok = True
+        for kind, key in KINDS:
+            before = checksum(source, kind, key, batch)
+            after = checksum(target, kind, key, batch)
+            print "  %-4s %-10s %9d rows" % ("ok" if before == after
+                                             else "DIFF", kind, before[0])
+            ok = ok and before == after
+        return ok
+    finally:
+        shutil.rmtree(workdir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", choices=["export", "import", "roundtrip"])
+    parser.add_argument("directory", nargs="?",
+                        help="where the NDJSON files are written or read")
+    parser.add_argument("--db", default=os.environ.get("BLOG_SQLITE_PATH"),
+                        help="the SQLite database file")
+    parser.add_argument("--batch", type=int, default=1000,
+                        help="rows read or written at a time")
+    parser.add_argument("--resume", action="store_true",
+                        help="carry on from the last complete batch")
+    parser.add_argument("--reindex", action="store_true",
+                        help="rebuild the search index after importing")
+    parser.add_argument("--entities", type=int, default=1000000,
+                        help="rows to seed for roundtrip")
+    args = parser.parse_args()
+    if args.command == "roundtrip":
+        sys.exit(0 if roundtrip(args.entities, args.batch) else 1)
+    if not args.directory or not args.db:
+        parser.error("export and import need a directory and --db")
+    db = sqlite.Database(args.db)
+    if args.command == "export":
+        export(db, args.directory, args.batch, args.resume)
+    else:
+        import_(db, args.directory, args.batch, args.resume)
+        if args.reindex:
+            os.environ["BLOG_SQLITE_PATH"] = args.db
+            sqlite.rebuild_search_index()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare fetching a post page's data in sequence and concurrently.
+
+    python tools/fetch_benchmark.py [--requests 200] [--latency 0,2,10]
+
+Seeds a SQLite database file with posts, comments and 'Likes', then times
+Repository.post_page, which reads everything PostPage shows (the post, its
+'Like' count, the viewer's 'Like' and the first page of comments), both as
+the base Repository does it, one read after another, and as the SQLite
+backend does it, on a thread pool. Each read is delayed by --latency ms to
+stand in for a datastore RPC's round trip (a local SQLite read takes a few
+microseconds, too little for concurrency to matter). It prints the p50 and
+p95 of each, in ms.
+
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import seeding
+
+POSTS = 100
+USERS = 8
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", default="0,2,10",
+                        help="comma separated delays per read, in ms")
+    args = parser.parse_args()
+    workdir = tempfile.mkdtemp(prefix="blog-fetch-")
+    seeding.use_sqlite(os.path.join(workdir, "blog.sqlite3"))
+    from myapp.functions.instrumentation import percentile
+    from myapp.storage import sqlite
+    from myapp.storage.base import Repository
+
+    try:
+        random.seed(0)
+        seeded = seeding.Seeded(sqlite.SqliteRepository(), POSTS,
+                                num_users=USERS, max_comments=15, max_likes=5)
+        query = sqlite.Database.query
+        print "%10s %14s %14s %14s %14s" % (
+            "latency", "sequential p50", "sequential p95", "concurrent p50",
+            "concurrent p95")
+        for latency in args.latency.split(","):
+            delay = float(latency) / 1000
+
+            def delayed_query(self, sql, params=()):
+                time.sleep(delay)
+                return query(self, sql, params)
+            sqlite.Database.query = delayed_query
+            timings = {}
+            for name, post_page in [("sequential", Repository.post_page),
+                                    ("concurrent",
+                                     sqlite.SqliteRepository.post_page)]:
+                timings[name] = []
+                for _ in range(args.requests):
+                    repo = sqlite.SqliteRepository()
+                    start = time.time()
+                    post_page(repo, seeded.random_post()[0],
+                              random.choice(seeded.users)[1])
+                    timings[name].append((time.time() - start) * 1000)
+                timings[name].sort()
+            sqlite.Database.query = query
+            print "%8s ms %14.2f %14.2f %14.2f %14.2f" % (
+                latency, percentile(timings["sequential"], 50),
+                percentile(timings["sequential"], 95),
+                percentile(timings["concurrent"], 50),
+                percentile(timings["concurrent"], 95))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Report how long the app's modules take to import.
+
+    python tools/import_profile.py [--sdk PATH_TO_APP_ENGINE_SDK]
+
+Imports main.py the way a new instance does, then imports the handler of
+each route in its route table in turn (as webapp2 does on the first request
+to that route). Every module that gets imported is listed with its own
+import time and its time including the modules it imported, grouped by the
+step that first needed it.
+
+"""
+import __builtin__
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ImportTimer(object):
+
+    """Time every module import made while it is installed."""
+
+    def __init__(self):
+        self.timings = []  # (depth, name, inclusive, self) in import order
+        self._children = []
+        self._import = __builtin__.__import__
+
+    def __enter__(self):
+        __builtin__.__import__ = self._timed_import
+        return self
+
+    def __exit__(self, *exc):
+        __builtin__.__import__ = self._import
+
+    def _timed_import(self, name, *a, **kw):
+        before = len(sys.modules)
+        index = len(self.timings)
+        self._children.append(0.0)
+        start = time.time()
+        try:
+            return self._import(name, *a, **kw)
+        finally:
+            elapsed = time.time() - start
+            children = self._children.pop()
+            if self._children:
+                self._children[-1] += elapsed
+            if len(sys.modules) > before:
+                self.timings.insert(index, (len(self._children), name,
+                                            elapsed, elapsed - children))
+
+    def report(self, title):
+        """Print the timings recorded so far under 'title', then reset."""
+        total = sum(t[2] for t in self.timings if t[0] == 0)
+        print "\n%s: %.1f ms" % (title, total * 1000)
+        for depth, name, inclusive, own in self.timings:
+            print "  %8.1f ms %8.1f ms  %s%s" % (inclusive * 1000, own * 1000,
+                                                 "  " * depth, name)
+        self.timings = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sdk", help="path to the App Engine Python SDK")
+    args = parser.parse_args()
+    if args.sdk:
+        sys.path.insert(0, args.sdk)
+        import dev_appserver
+        dev_appserver.fix_sys_path()
+    sys.path.insert(0, ROOT)
+
+    timer = ImportTimer()
+    print "%11s %11s  %s" % ("inclusive", "self", "module")
+    with timer:
+        import main as app_module
+    timer.report("import main")
+    import webapp2
+    for route in app_module.app.router.match_routes:
+        title = "%s -> %s" % (route.template, route.handler)
+        try:
+            with timer:
+                webapp2.import_string(route.handler)
+        except (ImportError, webapp2.ImportStringError) as e:
+            title += " (failed: %s)" % getattr(e, "exception", e)
+        timer.report(title)
+
+
+if __name__ == "__main__":
+    main()
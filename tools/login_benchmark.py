@@ -0,0 +1,73 @@
+"""Measure login latency as the number of users grows.
+
+    python tools/login_benchmark.py [--scales 1000,10000,100000,1000000]
+                                    [--requests 500]
+
+For each scale a fresh in-memory SQLite database is given that many users
+(inserted in bulk, see seeding.insert_users), then --requests logins of
+random users with the right password, and as many of names that don't
+exist, are sent through main.app. It prints the p50, p95 and p99 latency
+of each kind of login, in ms, and the storage calls each made. A login is
+a single get by username, so neither should grow with the number of users.
+
+"""
+import argparse
+import random
+import time
+
+import seeding
+from seeding import PASSWORD
+
+
+def time_logins(app, logins, status):
+    """Post each (username, password) pair to /blog/login, check each
+    response has the given status, return the sorted latencies and the
+    storage calls per login."""
+    import webapp2
+    latencies, calls = [], 0
+    for username, password in logins:
+        request = webapp2.Request.blank("/blog/login", POST=dict(
+            username=username, password=password))
+        start = time.time()
+        response = request.get_response(app)
+        latencies.append((time.time() - start) * 1000)
+        assert response.status_int == status, (username, response.status)
+        calls += request.environ["blog.request_stats"].storage_calls
+    latencies.sort()
+    return latencies, float(calls) / len(logins)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scales", default="1000,10000,100000,1000000",
+                        help="comma separated numbers of users to seed")
+    parser.add_argument("--requests", type=int, default=500,
+                        help="timed logins of each kind per scale")
+    args = parser.parse_args()
+    seeding.use_sqlite()
+    import main
+    from myapp.functions.instrumentation import percentile
+
+    print "%10s %-8s %8s %8s %8s %6s" % ("users", "login", "p50 ms",
+                                         "p95 ms", "p99 ms", "calls")
+    for scale in [int(scale) for scale in args.scales.split(",")]:
+        repo = seeding.reset()
+        start = time.time()
+        seeding.insert_users(repo, scale)
+        print "%10d (seeded in %.0f s)" % (scale, time.time() - start)
+        random.seed(scale)
+        users = ["user%d" % random.randrange(scale)
+                 for _ in range(args.requests)]
+        for kind, logins, status in [
+                ("valid", [(name, PASSWORD) for name in users], 302),
+                ("unknown", [("nobody%s" % name, PASSWORD)
+                             for name in users], 200)]:
+            time_logins(main.app, logins[:5], status)  # warm up
+            latencies, calls = time_logins(main.app, logins, status)
+            print "%10d %-8s %8.2f %8.2f %8.2f %6.1f" % (
+                scale, kind, percentile(latencies, 50),
+                percentile(latencies, 95), percentile(latencies, 99), calls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compare the latency of early and deep pages of the blog.
+
+    python tools/page_benchmark.py [--posts 100000] [--pages 1,10,100,1000]
+                                   [--requests 200]
+
+Seeds a fresh in-memory SQLite database with --posts posts (inserted in
+bulk, see seeding.insert_posts), follows the "Older Posts" cursors to each
+of --pages, and then times --requests requests for each page through
+main.app, and the query of its posts alone. Page 1 is requested as /blog
+with the front page cache emptied first, so its posts are read like any
+other page's (it also pays for filling the cache). It prints the p50, p95
+and p99 of each, in ms, and the storage calls per request. Pages are
+keyset paginated, so the query for page 1000 should cost what page 1's
+does.
+
+"""
+import argparse
+import random
+import time
+
+import seeding
+
+
+def time_calls(call, requests):
+    """Call call() requests times, return the sorted latencies in ms."""
+    latencies = []
+    for _ in range(requests):
+        start = time.time()
+        call()
+        latencies.append((time.time() - start) * 1000)
+    latencies.sort()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--pages", default="1,10,100,1000",
+                        help="comma separated page numbers to time")
+    parser.add_argument("--requests", type=int, default=200,
+                        help="timed requests per page")
+    args = parser.parse_args()
+    seeding.use_sqlite()
+    import webapp2
+    import main
+    from myapp.functions.cache import memcache
+    from myapp.functions.instrumentation import percentile
+    from myapp.storage import sqlite
+
+    repo = seeding.reset()
+    random.seed(0)
+    start = time.time()
+    seeding.insert_posts(repo, args.posts, seeding.seed_users(repo, 100))
+    print "Seeded %d posts in %.0f s" % (args.posts, time.time() - start)
+
+    pages = sorted(int(page) for page in args.pages.split(","))
+    cursors = {1: None}
+    cursor = None
+    for page in range(2, pages[-1] + 1):
+        cursor = repo.recent_posts(cursor)[1]
+        if not cursor:
+            parser.error("there are fewer than %d pages" % pages[-1])
+        cursors[page] = cursor
+
+    print "%6s %10s %10s %10s %10s %10s" % (
+        "page", "page p50", "page p95", "page p99", "query p95", "calls")
+    for page in pages:
+        cursor = cursors[page]
+        path = "/blog?cursor=%s" % cursor if cursor else "/blog"
+        calls = []
+
+        def request():
+            memcache.flush_all()
+            request = webapp2.Request.blank(path)
+            response = request.get_response(main.app)
+            assert response.status_int == 200, response.status
+            calls.append(request.environ["blog.request_stats"].storage_calls)
+        requested = time_calls(request, args.requests)
+        queried = time_calls(
+            lambda: sqlite.SqliteRepository().recent_posts(cursor),
+            args.requests)
+        print "%6d %10.2f %10.2f %10.2f %10.2f %10.1f" % (
+            page, percentile(requested, 50), percentile(requested, 95),
+            percentile(requested, 99), percentile(queried, 95),
+            float(sum(calls)) / len(calls))
+
+
+if __name__ == "__main__":
+    main()
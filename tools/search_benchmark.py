@@ -0,0 +1,148 @@
+"""Measure search latency on a large seeded SQLite index.
+
+    python tools/search_benchmark.py [--posts 100000] [--queries 200]
+                                     [--db FILE]
+
+Seeds --posts posts whose words are drawn from a made-up vocabulary with a
+Zipf-like distribution (a few words are in most posts, most words in only
+a few), each with a couple of comments, and indexes them. Then, for
+queries of one and of three words that are common, middling or rare, it
+prints the p50, p95 and p99 latency of ranking the matches (reading the
+posting lists, uncached) and of a whole /blog/search request (with the
+results cache emptied first), and how many postings each query read.
+
+Seeding 100,000 posts takes over ten minutes; with --db the seeded
+database is kept in FILE and reused by later runs.
+
+"""
+import argparse
+import bisect
+import random
+import time
+
+import seeding
+
+VOCABULARY_SIZE = 20000
+WORDS_PER_POST = 80
+WORDS_PER_COMMENT = 15
+COMMENTS_PER_POST = 2
+SYLLABLES = [c + v for c in "bdfgklmnprstvz" for v in "aeiou"]
+
+# The vocabulary ranks the words of each query class are drawn from.
+QUERY_CLASSES = [
+    ("common", 1, 20),
+    ("middling", 200, 1000),
+    ("rare", 5000, VOCABULARY_SIZE),
+]
+
+
+class Vocabulary(object):
+
+    """Made-up words, drawn with probability proportional to 1 / rank."""
+
+    def __init__(self, size):
+        words = set()
+        while len(words) < size:
+            words.add("".join(random.choice(SYLLABLES)
+                              for _ in range(random.randint(2, 4))))
+        self.words = sorted(words, key=lambda word: random.random())
+        self.cumulative = []
+        total = 0.0
+        for rank in range(1, size + 1):
+            total += 1.0 / rank
+            self.cumulative.append(total)
+
+    def text(self, length):
+        total = self.cumulative[-1]
+        return " ".join(
+            self.words[bisect.bisect(self.cumulative, random.random() * total)]
+            for _ in range(length))
+
+
+def seed(num_posts, vocabulary):
+    """Store and index num_posts posts with comments, printing progress."""
+    from myapp.storage import sqlite
+    repo = sqlite.SqliteRepository()
+    start = time.time()
+    for i in range(num_posts):
+        post = repo.create_post(vocabulary.text(6),
+                                vocabulary.text(WORDS_PER_POST),
+                                "1", "seeder")
+        for _ in range(COMMENTS_PER_POST):
+            repo.add_comment(post.id, vocabulary.text(WORDS_PER_COMMENT),
+                             "1", "seeder")
+        repo.entities.clear()
+        if (i + 1) % 10000 == 0:
+            print "  seeded %d posts (%.0f s)" % (i + 1, time.time() - start)
+
+
+def queries(vocabulary, words, low, high, count):
+    """Return count queries of 'words' words ranked from low to high."""
+    return [" ".join(vocabulary.words[random.randint(low, high) - 1]
+                     for _ in range(words))
+            for _ in range(count)]
+
+
+def measure(vocabulary, count):
+    """Time ranking and whole requests for each class of query."""
+    import urllib
+    import webapp2
+    import main
+    from myapp.functions import search
+    from myapp.functions.cache import memcache
+    from myapp.functions.instrumentation import percentile
+    from myapp.storage import sqlite
+    print "  %-18s %10s %10s %10s %10s %10s" % (
+        "query", "rank p50", "rank p95", "rank p99", "page p95", "postings")
+    for name, low, high in QUERY_CLASSES:
+        for words in (1, 3):
+            ranked, pages, postings = [], [], 0
+            for query in queries(vocabulary, words, low, high, count):
+                repo = sqlite.SqliteRepository()
+                terms = search.query_terms(query)
+                postings += sum(len(repo.postings(term)) for term in terms)
+                start = time.time()
+                search.rank(repo, terms)
+                ranked.append((time.time() - start) * 1000)
+                memcache.flush_all()
+                request = webapp2.Request.blank(
+                    "/blog/search?q=" + urllib.quote_plus(query))
+                start = time.time()
+                response = request.get_response(main.app)
+                pages.append((time.time() - start) * 1000)
+                assert response.status_int == 200, response.status
+            ranked.sort()
+            pages.sort()
+            print "  %-18s %10.2f %10.2f %10.2f %10.2f %10d" % (
+                "%s, %d word%s" % (name, words, "s" if words > 1 else ""),
+                percentile(ranked, 50), percentile(ranked, 95),
+                percentile(ranked, 99), percentile(pages, 95),
+                postings / count)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200,
+                        help="timed queries per class of query")
+    parser.add_argument("--db", default=":memory:",
+                        help="SQLite file to seed, or reuse if seeded")
+    args = parser.parse_args()
+    seeding.use_sqlite(args.db)
+    from myapp.storage import sqlite
+
+    random.seed(0)  # the same vocabulary every run, so --db can be reused
+    vocabulary = Vocabulary(VOCABULARY_SIZE)
+    indexed = sqlite.database().query(
+        sqlite.QUERIES["search_document_count"])[0][0]
+    if indexed:
+        print "Using the %d posts already in %s" % (indexed, args.db)
+    else:
+        print "Seeding %d posts" % args.posts
+        seed(args.posts, vocabulary)
+    print "Latency in ms, postings read per query"
+    measure(vocabulary, args.queries)
+
+
+if __name__ == "__main__":
+    main()
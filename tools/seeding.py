@@ -0,0 +1,142 @@
+"""Seed the SQLite backend with users, posts, comments and 'Likes'.
+
+Shared by the benchmarks in tools/ and the tests in tests/. use_sqlite()
+points the app at a SQLite database, and must be called before the app is
+imported; reset() empties the database and the cache between runs. Seeded
+fills the database through the repository, as the handlers would.
+
+"""
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "benchmark"
+
+
+def use_sqlite(path=":memory:"):
+    """Make the app store its data in the SQLite database at path."""
+    os.environ["BLOG_STORAGE"] = "sqlite"
+    os.environ["BLOG_SQLITE_PATH"] = path
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+
+def reset(path=":memory:"):
+    """Replace the app's database with a new one at path, empty the cache,
+    and return a repository of the new database."""
+    from myapp.functions.cache import memcache
+    from myapp.storage import sqlite
+    sqlite._database = sqlite.Database(path)
+    memcache.flush_all()
+    return sqlite.SqliteRepository()
+
+
+def seed_users(repo, count, prefix="user"):
+    """Sign up count users, return their (name, user id) pairs."""
+    from myapp.functions import appfunctions
+    users = []
+    for i in range(count):
+        name = "%s%d" % (prefix, i)
+        credential = repo.reserve_credential(
+            name, "", appfunctions.make_pw_hash(name, PASSWORD))
+        users.append((name, str(credential.uid)))
+    return users
+
+
+def insert_users(repo, count, prefix="user", batch=10000):
+    """Add count users to an empty SQLite database with bulk inserts.
+
+    They're named and numbered as seed_users() would sign them up, but a
+    million are added in seconds rather than minutes.
+
+    """
+    from myapp.functions import appfunctions
+    for start in range(0, count, batch):
+        rows = []
+        for i in range(start, min(start + batch, count)):
+            name = "%s%d" % (prefix, i)
+            rows.append((name, "", appfunctions.make_pw_hash(name, PASSWORD),
+                         i + 1))
+        with repo.db.transaction() as conn:
+            conn.executemany("INSERT INTO credential (username, email, "
+                             "hashed_password, user_id) VALUES (?, ?, ?, ?)",
+                             rows)
+
+
+def insert_posts(repo, count, users, batch=10000):
+    """Add count posts by random users (name, user id pairs) to a SQLite
+    database with bulk inserts, created a minute apart up to now."""
+    from datetime import datetime, timedelta
+    from myapp.functions import rendering
+    content = "Some words.\n" * 20
+    content_html = rendering.body_html(content)
+    excerpt = rendering.excerpt(content)
+    first = datetime.utcnow() - timedelta(minutes=count)
+    for start in range(0, count, batch):
+        rows = []
+        for i in range(start, min(start + batch, count)):
+            name, uid = random.choice(users)
+            created = first + timedelta(minutes=i)
+            rows.append(("Post by %s" % name, content, content_html, excerpt,
+                         created, created, created, uid, name))
+        with repo.db.transaction() as conn:
+            conn.executemany("INSERT INTO post (subject, content, "
+                             "content_html, excerpt, created, last_modified, "
+                             "edited, creator, name) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+def cookie(name, uid):
+    """Return the Cookie header of a logged in user."""
+    from myapp.functions import appfunctions
+    return "user=%s; user_id=%s" % (appfunctions.make_secure_val(name),
+                                    appfunctions.make_secure_val(uid))
+
+
+class Seeded(object):
+
+    """The users, posts and comments seeded into a database.
+
+    Each post gets up to max_comments comments and 'Likes' from up to
+    max_likes users (by default, from up to all of them), all by random
+    users.
+
+    """
+
+    def __init__(self, repo, num_posts, num_users=None, max_comments=10,
+                 max_likes=None):
+        self.repo = repo
+        self.users = seed_users(repo, num_users or max(5, num_posts // 10))
+        if max_likes is None:
+            max_likes = len(self.users)
+        self.posts = []  # (post id, creator's index in users)
+        for i in range(num_posts):
+            self.posts.append(self.add_post(random.randrange(len(self.users))))
+        self.comments = []  # (post id, comment id, creator's index in users)
+        for post_id, _ in self.posts:
+            for _ in range(random.randint(0, max_comments)):
+                self.comments.append(
+                    self.add_comment(post_id, random.randrange(len(self.users))))
+            for name, uid in random.sample(
+                    self.users, random.randint(0, min(max_likes,
+                                                      len(self.users)))):
+                repo.like(post_id, uid, name)
+
+    def add_post(self, user):
+        name, uid = self.users[user]
+        post = self.repo.create_post("Post by %s" % name,
+                                     "Some words.\n" * 20, uid, name)
+        return post.id, user
+
+    def add_comment(self, post_id, user):
+        name, uid = self.users[user]
+        comment = self.repo.add_comment(post_id, "A comment.", uid, name)
+        return post_id, comment.id, user
+
+    def cookie(self, user):
+        """Return the Cookie header of a logged in user."""
+        return cookie(*self.users[user])
+
+    def random_post(self):
+        return random.choice(self.posts)
@@ -0,0 +1,65 @@
+"""Run the blog under a plain WSGI server, storing its data in SQLite.
+
+    python tools/serve.py [--host localhost] [--port 8080]
+                          [--db blog.sqlite3] [--admin]
+
+Needs webapp2, WebOb and Jinja2 (pip install webapp2 webob jinja2), but not
+the App Engine SDK. Files under /static are served from the static
+directory, as app.yaml does on App Engine. There is no App Engine sign
+in, so the /admin pages refuse every visitor unless --admin is given,
+which lets every visitor in: only use it on a host no one else can reach.
+
+"""
+import argparse
+import mimetypes
+import os
+import sys
+from wsgiref.simple_server import make_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_DIR = os.path.join(ROOT, "static")
+
+
+def with_static_files(app):
+    """Wrap a WSGI app so that it also serves the files in STATIC_DIR."""
+    def serve(environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if path.startswith("/static/"):
+            name = os.path.normpath(os.path.join(ROOT, path.lstrip("/")))
+            if name.startswith(STATIC_DIR + os.sep) and os.path.isfile(name):
+                content_type = (mimetypes.guess_type(name)[0] or
+                                "application/octet-stream")
+                start_response("200 OK", [("Content-Type", content_type)])
+                with open(name, "rb") as f:
+                    return [f.read()]
+            start_response("404 Not Found", [("Content-Type", "text/plain")])
+            return ["Not Found"]
+        return app(environ, start_response)
+    return serve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="localhost",
+                        help="address to listen on (default: localhost)")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", default=os.path.join(ROOT, "blog.sqlite3"),
+                        help="SQLite database file (created if missing)")
+    parser.add_argument("--admin", action="store_true",
+                        help="treat every visitor as an administrator")
+    args = parser.parse_args()
+    os.environ["BLOG_STORAGE"] = "sqlite"
+    os.environ["BLOG_SQLITE_PATH"] = args.db
+    if args.admin:
+        os.environ["BLOG_LOCAL_ADMIN"] = "1"
+    sys.path.insert(0, ROOT)
+    import main as app_module
+    server = make_server(args.host, args.port,
+                         with_static_files(app_module.app))
+    print "Serving http://%s:%d/ (data in %s)" % (args.host, args.port,
+                                                  args.db)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()